@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import numpy as np
 import pandas as pd
 from ta.momentum import RSIIndicator
 from ta.volatility import AverageTrueRange
@@ -9,15 +10,116 @@ from ta.volatility import BollingerBands
 import matplotlib.pyplot as plt
 import os
 from binance.client import Client
-import time
 import logging
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 # Import the sentiment data loader
 from data_acquisition.fetch_sentiment import load_historical_sentiment
-from bot.strategy import get_data, apply_indicators, generate_signal
+from data_acquisition.candle_store import CandleStore
+from data_acquisition.kline_downloader import KlineDownloader
+from data_acquisition.resampler import CandleResampler
+from bot.strategy import apply_indicators, generate_signal
 from bot.trading import calculate_trade_size
-from bot.exchange_info import get_symbol_info, format_quantity, get_min_notional
+from bot.exchange_info import ExchangeFilters, get_exchange_filters, save_exchange_filters_snapshot
+from indicator_store import IndicatorStore
+from result_cache import BacktestResultCache, array_digest, candle_fingerprint
+
+# Columns the array engine reads as contiguous float arrays
+ARRAY_ENGINE_COLUMNS = ('open', 'high', 'low', 'close', 'ATR', 'RSI', 'macd', 'macd_signal', 'bb_bbl', 'bb_bbh')
+
+# strategy_backtest parameters the array engine takes as keyword arguments
+ARRAY_ENGINE_PARAMETERS = (
+    'starting_balance', 'fee_rate', 'base_slippage_pct', 'volume_factor', 'latency_seconds',
+    'max_drawdown_percent', 'max_trades', 'sentiment_sizing_multiplier', 'atr_trend_threshold',
+    'breakout_rr_ratio', 'grid_levels', 'grid_step_percent', 'grid_profit_target_percent',
+    'grid_invalidation_percent', 'risk_per_trade_percent', 'trade_mode', 'fixed_trade_amount_usdt',
+    'sentiment_threshold_positive', 'sentiment_threshold_negative', 'base_rsi_oversold',
+    'base_rsi_overbought', 'use_bollinger_bands'
+)
+
+def warmup_candles(atr_period: int = 14, use_bollinger_bands: bool = False, bb_window: int = 20) -> int:
+    """
+    Number of leading candles strategy_backtest skips so indicators are valid:
+    the longest indicator period (e.g., MACD's 26 or ATR's 14), adjusted for the BB window.
+    """
+    return max(atr_period, 26, bb_window if use_bollinger_bands else 0)
+
+def checkpoint_indices(n: int, start_index: int, checkpoints: int) -> dict:
+    """
+    Maps candle index -> checkpoint step for a progress callback. Checkpoints split the whole
+    history into equal parts, so step k falls on the same candle in every trial regardless of
+    the indicator warm-up (start_index).
+    """
+    if checkpoints <= 1:
+        return {}
+    return {n * k // checkpoints: k for k in range(1, checkpoints) if n * k // checkpoints >= start_index}
+
+def _as_ns(timestamps) -> np.ndarray:
+    return timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64) if hasattr(timestamps, 'to_numpy') else np.asarray(timestamps)
+
+def intrabar_bounds(timestamps, end=None) -> np.ndarray:
+    """
+    Open times (epoch ns) of the candles plus the end of the last one: end when given, otherwise
+    the last candle is assumed to span the same time as the one before it.
+    """
+    parent_ns = _as_ns(timestamps)
+    if len(parent_ns) == 0:
+        return parent_ns
+    if end is not None:
+        last_end = pd.Timestamp(end).value
+    else:
+        last_end = parent_ns[-1] + (parent_ns[-1] - parent_ns[-2] if len(parent_ns) > 1 else 0)
+    return np.r_[parent_ns, last_end]
+
+def intrabar_offsets(timestamps, sub_timestamps, end=None) -> np.ndarray:
+    """
+    Offsets into the sub-candles for each candle: sub-candles offsets[i]:offsets[i + 1] open inside
+    candle i, i.e. at or after its open and before the next candle's (or end, for the last one).
+    """
+    bounds = intrabar_bounds(timestamps, end)
+    if len(bounds) == 0:
+        return np.zeros(1, dtype=np.int64)
+    return np.searchsorted(_as_ns(sub_timestamps), bounds, side='left').astype(np.int64)
+
+def intrabar_arrays(timestamps, sub_candles, end=None) -> dict:
+    """
+    The array engine's intrabar dict for the candles at timestamps. Only the sub-candles inside
+    the candles' span are kept (as views where the columns are already float64), so passing a
+    longer 1m history costs no copy of it.
+    """
+    bounds = intrabar_bounds(timestamps, end)
+    if len(bounds) == 0:
+        lo = hi = 0
+    else:
+        lo, hi = np.searchsorted(_as_ns(sub_candles['timestamp']), bounds[[0, -1]], side='left')
+    sub_candles = sub_candles.iloc[lo:hi]
+    return {
+        'offsets': intrabar_offsets(timestamps, sub_candles['timestamp'], end).tolist(),
+        'highs': sub_candles['high'].to_numpy(dtype=float),
+        'lows': sub_candles['low'].to_numpy(dtype=float),
+        'timestamps': sub_candles['timestamp']
+    }
+
+def _first_intrabar_exit(lows: np.ndarray, highs: np.ndarray, stop: Optional[float], target: Optional[float], strict_stop: bool = False):
+    """
+    ('sl' or 'tp', offset) of the first sub-candle whose low reaches the stop or whose high reaches the
+    target, or None. A sub-candle touching both is resolved as the stop, the conservative assumption.
+    """
+    n = len(lows)
+    stop_at = target_at = n
+    if stop:
+        hits = lows < stop if strict_stop else lows <= stop
+        k = int(hits.argmax()) if n else 0
+        if n and hits[k]:
+            stop_at = k
+    if target:
+        hits = highs[:stop_at] >= target # Only a target reached strictly before the stop matters
+        k = int(hits.argmax()) if len(hits) else 0
+        if len(hits) and hits[k]:
+            target_at = k
+    if stop_at == n and target_at == n:
+        return None
+    return ('sl', stop_at) if stop_at <= target_at else ('tp', target_at)
 
 def load_data(csv_file):
     df = pd.read_csv(csv_file)
@@ -27,6 +129,63 @@ def load_data(csv_file):
     df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
     return df
 
+def load_candles(symbol: str, interval: str = '1h', start=None, end=None, columns=None, dtype=None,
+                 csv_file: Optional[str] = None, store: Optional[CandleStore] = None,
+                 resampler: Optional[CandleResampler] = None):
+    """
+    Loads candles from the memory-mapped CandleStore, optionally limited to [start, end) and a subset
+    of columns. Intervals not stored directly are resampled from the stored 1m candles; otherwise,
+    if the store has no data for the symbol yet, csv_file is imported into it once.
+    """
+    store = store or CandleStore()
+    resampler = resampler or CandleResampler(store)
+    if not store.exists(symbol, interval) and resampler.can_resample(symbol, interval):
+        return resampler.load(symbol, interval, start=start, end=end, columns=columns, dtype=dtype)
+    if not store.exists(symbol, interval):
+        if not csv_file or not os.path.exists(csv_file):
+            raise FileNotFoundError(f"No {symbol} {interval} candles in {store.root} and no CSV to import.")
+        logging.info(f"Importing {csv_file} into the candle store...")
+        store.import_csv(symbol, interval, csv_file)
+    return store.load(symbol, interval, columns=columns, start=start, end=end, dtype=dtype)
+
+def load_exchange_filters(client: Optional[Client], symbol: str, snapshot_file: str) -> ExchangeFilters:
+    """
+    Loads the symbol's exchange filters from a JSON snapshot, creating the snapshot
+    with a single symbol-info request if it does not exist yet.
+    """
+    if not os.path.exists(snapshot_file):
+        if client is None:
+            raise FileNotFoundError(f"Exchange filter snapshot {snapshot_file} not found and no client to create it.")
+        logging.info(f"Exchange filter snapshot not found. Fetching filters for {symbol}...")
+        save_exchange_filters_snapshot(client, [symbol], snapshot_file)
+    return ExchangeFilters.from_snapshot(snapshot_file, symbol)
+
+def attach_sentiment(df, sentiment_csv_file: str, max_staleness: Optional[str] = None):
+    """
+    Merges historical sentiment onto the candle frame as a 'sentiment' column, so repeated
+    backtests over the same frame skip loading and aligning the sentiment CSV.
+    """
+    df = df.copy()
+    if sentiment_csv_file and os.path.exists(sentiment_csv_file):
+        df['sentiment'] = load_historical_sentiment(sentiment_csv_file, candle_index=df['timestamp'], max_staleness=max_staleness).to_numpy()
+    else:
+        logging.warning(f"Historical sentiment data not found at {sentiment_csv_file}. Sentiment will be neutral.")
+        df['sentiment'] = 0.0
+    return df
+
+def candle_sentiments(df, sentiment_csv_file: Optional[str] = None, max_staleness: Optional[str] = None) -> np.ndarray:
+    """
+    Returns one sentiment value per candle. A 'sentiment' column already on the frame
+    (see attach_sentiment) takes precedence over the CSV; without either, sentiment is neutral.
+    """
+    if 'sentiment' in df.columns:
+        return df['sentiment'].to_numpy(dtype=float)
+    if sentiment_csv_file and os.path.exists(sentiment_csv_file):
+        logging.info(f"Loaded historical sentiment data from {sentiment_csv_file}")
+        return load_historical_sentiment(sentiment_csv_file, candle_index=df['timestamp'], max_staleness=max_staleness).to_numpy()
+    logging.warning(f"Historical sentiment data not found at {sentiment_csv_file}. Sentiment will be neutral in backtest.")
+    return np.zeros(len(df))
+
 def calculate_dynamic_slippage(quantity: float, price: float, base_slippage_pct: float = 0.0005, volume_factor: float = 0.000001) -> float:
     """
     Calculates dynamic slippage based on quantity and a base percentage.
@@ -66,8 +225,43 @@ def strategy_backtest(client: Client,
                       bb_window: int = 20,
                       bb_window_dev: float = 2.0,
                       sentiment_csv_file: Optional[str] = None, # New parameter for historical sentiment
-                      symbol: str = "BTCUSDT" # Pass symbol to get exchange info
+                      sentiment_max_staleness: Optional[str] = None, # e.g. '6h'; older sentiment counts as neutral
+                      symbol: str = "BTCUSDT", # Pass symbol to get exchange info
+                      exchange_filters: Optional[ExchangeFilters] = None, # Offline filter snapshot; fetched once via client if omitted
+                      engine: str = 'array', # 'array' runs the NumPy-backed kernel, 'pandas' the reference per-row loop
+                      indicator_store: Optional[IndicatorStore] = None, # Shared, precomputed indicator columns for df
+                      progress_callback: Optional[Callable[[int, float], None]] = None, # Called as (step, equity) at each checkpoint; raise to abort
+                      progress_checkpoints: int = 10,
+                      result_cache: Optional[BacktestResultCache] = None, # Serves repeated runs from disk
+                      sub_candles=None # 1m timestamp/high/low candles covering df; resolves SL/TP fill order inside each candle
                      ):
+    call_params = dict(locals())
+    if engine not in ('array', 'pandas'):
+        raise ValueError(f"Unknown backtest engine '{engine}'. Expected 'array' or 'pandas'.")
+    if sub_candles is not None and engine != 'array':
+        raise ValueError("Intrabar fills (sub_candles) are only supported by the array engine.")
+
+    if result_cache is not None:
+        if exchange_filters is None:
+            exchange_filters = get_exchange_filters(client, symbol)
+        if indicator_store is not None:
+            data_fingerprint = indicator_store.indicator_fingerprint(atr_period, use_bollinger_bands, bb_window, bb_window_dev)
+        else:
+            data_fingerprint = candle_fingerprint(df)
+        if sub_candles is not None:
+            # Only the sub-candles inside df's span affect the run
+            intrabar = intrabar_arrays(df['timestamp'], sub_candles)
+            data_fingerprint = f"{data_fingerprint}|{array_digest(np.asarray(intrabar['offsets']), intrabar['highs'], intrabar['lows'], _as_ns(intrabar['timestamps']))}"
+        sentiments = candle_sentiments(df, sentiment_csv_file, sentiment_max_staleness)
+        key = result_cache.make_key(data_fingerprint, sentiments, exchange_filters, call_params)
+        result = result_cache.get(key)
+        if result is None:
+            if 'sentiment' not in df.columns:
+                df = df.assign(sentiment=sentiments) # Skip loading the sentiment CSV a second time
+            result = strategy_backtest(**{**call_params, 'df': df, 'exchange_filters': exchange_filters, 'result_cache': None})
+            result_cache.put(key, result)
+        return result
+
     balance = starting_balance
     peak_balance = starting_balance
     trade_log = []
@@ -85,22 +279,66 @@ def strategy_backtest(client: Client,
     # For grid, 'open_orders' could track individual limit orders
     current_position = {'quantity': 0, 'entry_price': 0, 'strategy': None, 'sl_price': None, 'tp_price': None, 'invalidation_price': None, 'open_orders': []}
 
-    min_notional = get_min_notional(client, symbol)
+    # Parse the symbol's exchange filters once; quantity rounding in the loop is then pure arithmetic
+    if exchange_filters is None:
+        exchange_filters = get_exchange_filters(client, symbol)
+    min_notional = exchange_filters.min_notional
 
-    # Load historical sentiment data if provided
-    sentiment_df = None
-    if sentiment_csv_file and os.path.exists(sentiment_csv_file):
-        sentiment_df = load_historical_sentiment(sentiment_csv_file)
-        logging.info(f"Loaded historical sentiment data from {sentiment_csv_file}")
-    else:
-        logging.warning(f"Historical sentiment data not found at {sentiment_csv_file}. Sentiment will be neutral in backtest.")
+    # Sentiment is as-of joined onto the candles once; the loop then indexes a plain array.
+    sentiments = candle_sentiments(df, sentiment_csv_file, sentiment_max_staleness)
 
-    # Pre-calculate all necessary indicators
-    df = apply_indicators(df, atr_period=atr_period, use_bollinger_bands=use_bollinger_bands, bb_window=bb_window, bb_window_dev=bb_window_dev)
+    # Pre-calculate all necessary indicators, or take them from the shared store
+    indicator_columns = {}
+    if indicator_store is not None:
+        if len(indicator_store) != len(df):
+            raise ValueError(f"Indicator store covers {len(indicator_store)} candles but df has {len(df)}.")
+        indicator_columns = indicator_store.indicator_columns(atr_period=atr_period, use_bollinger_bands=use_bollinger_bands, bb_window=bb_window, bb_window_dev=bb_window_dev)
+        if engine == 'pandas':
+            df = df.assign(**indicator_columns)
+    else:
+        df = apply_indicators(df, atr_period=atr_period, use_bollinger_bands=use_bollinger_bands, bb_window=bb_window, bb_window_dev=bb_window_dev)
 
     # Ensure we have enough data for indicators to be valid
-    # Start loop after the longest indicator period (e.g., MACD's 26 or ATR's 14)
-    start_index = max(atr_period, 26, bb_window if use_bollinger_bands else 0) # Adjust for BB window
+    start_index = warmup_candles(atr_period, use_bollinger_bands, bb_window)
+    # Running equity (balance plus open position at the close) is reported at these candles
+    checkpoints = checkpoint_indices(len(df), start_index, progress_checkpoints) if progress_callback is not None else {}
+
+    if engine == 'array':
+        if indicator_store is not None:
+            columns = {col: indicator_store.price(col) for col in ('open', 'high', 'low', 'close')}
+        else:
+            columns = {col: df[col].to_numpy(dtype=float) for col in ARRAY_ENGINE_COLUMNS if col in df.columns}
+        columns.update(indicator_columns)
+        # Offsets are computed once; the loop then addresses each candle's sub-candles by index
+        intrabar = intrabar_arrays(df['timestamp'], sub_candles) if sub_candles is not None else None
+        chunk = {'offset': 0, 'columns': columns, 'timestamps': df['timestamp'], 'sentiments': sentiments, 'intrabar': intrabar}
+        return _run_array_engine(
+            exchange_filters, [chunk], len(df), min_notional, start_index,
+            progress_callback=progress_callback,
+            checkpoints=checkpoints,
+            starting_balance=starting_balance,
+            fee_rate=fee_rate,
+            base_slippage_pct=base_slippage_pct,
+            volume_factor=volume_factor,
+            latency_seconds=latency_seconds,
+            max_drawdown_percent=max_drawdown_percent,
+            max_trades=max_trades,
+            sentiment_sizing_multiplier=sentiment_sizing_multiplier,
+            atr_trend_threshold=atr_trend_threshold,
+            breakout_rr_ratio=breakout_rr_ratio,
+            grid_levels=grid_levels,
+            grid_step_percent=grid_step_percent,
+            grid_profit_target_percent=grid_profit_target_percent,
+            grid_invalidation_percent=grid_invalidation_percent,
+            risk_per_trade_percent=risk_per_trade_percent,
+            trade_mode=trade_mode,
+            fixed_trade_amount_usdt=fixed_trade_amount_usdt,
+            sentiment_threshold_positive=sentiment_threshold_positive,
+            sentiment_threshold_negative=sentiment_threshold_negative,
+            base_rsi_oversold=base_rsi_oversold,
+            base_rsi_overbought=base_rsi_overbought,
+            use_bollinger_bands=use_bollinger_bands
+        )
 
     for i in range(start_index, len(df)):
         current_candle = df.iloc[i]
@@ -110,6 +348,9 @@ def strategy_backtest(client: Client,
         high_price = current_candle['high']
         low_price = current_candle['low']
 
+        if i in checkpoints:
+            progress_callback(checkpoints[i], balance + current_position['quantity'] * price)
+
         # Update peak balance
         peak_balance = max(peak_balance, balance)
 
@@ -123,7 +364,7 @@ def strategy_backtest(client: Client,
                 exit_price = price * (1 - slippage_amount) # Apply slippage on final exit
                 
                 # Apply step size and min notional checks for final exit
-                exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                 if float(exit_quantity) * exit_price < min_notional:
                     logging.warning(f"Skipping final exit sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                     # If it can't meet min notional, assume position is stuck or closed at 0 for backtest simplicity
@@ -163,7 +404,7 @@ def strategy_backtest(client: Client,
                 exit_price = price * (1 - slippage_amount) # Apply slippage on final exit
                 
                 # Apply step size and min notional checks for final exit
-                exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                 if float(exit_quantity) * exit_price < min_notional:
                     logging.warning(f"Skipping final exit sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                     balance = 0
@@ -211,25 +452,8 @@ def strategy_backtest(client: Client,
         current_drawdown = (peak_balance - balance) / peak_balance * 100
         max_drawdown = max(max_drawdown, current_drawdown)
 
-        # --- Get current sentiment ---
-        current_sentiment = 0.0 # Default to neutral if no sentiment data
-        if sentiment_df is not None:
-            # Find the sentiment score for the current timestamp or the closest preceding one
-            # This is a simplification; more robust alignment might be needed
-            try:
-                current_sentiment = sentiment_df.loc[timestamp]['sentiment_score']
-            except KeyError:
-                # If exact timestamp not found, try to find the nearest one
-                # This requires sentiment_df to be sorted by index
-                if not sentiment_df.empty:
-                    # Find the closest sentiment data point before or at the current timestamp
-                    closest_sentiment_idx = sentiment_df.index.asof(timestamp)
-                    if pd.notna(closest_sentiment_idx):
-                        current_sentiment = sentiment_df.loc[closest_sentiment_idx]['sentiment_score']
-                    else:
-                        current_sentiment = 0.0
-                else:
-                    current_sentiment = 0.0 # Default to neutral if no sentiment data
+        # --- Get current sentiment (pre-aligned to this candle) ---
+        current_sentiment = sentiments[i]
 
         # --- Grid Invalidation Check (from main.py) ---
         if current_position['strategy'] == 'grid' and current_position['quantity'] > 0:
@@ -242,7 +466,7 @@ def strategy_backtest(client: Client,
                     exit_price = price * (1 - slippage_amount) # Apply slippage on exit
                     
                     # Apply step size and min notional checks for exit
-                    exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                    exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                     if float(exit_quantity) * exit_price < min_notional:
                         logging.warning(f"Skipping grid invalidation sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                         # In a real scenario, you might be stuck or forced to market sell at any price.
@@ -273,7 +497,7 @@ def strategy_backtest(client: Client,
                 exit_price = current_position['sl_price'] * (1 - slippage_amount) # Simulate exit at SL with slippage
                 
                 # Apply step size and min notional checks for exit
-                exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                 if float(exit_quantity) * exit_price < min_notional:
                     logging.warning(f"Skipping breakout SL sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                     current_position = {'quantity': 0, 'entry_price': 0, 'strategy': None, 'sl_price': None, 'tp_price': None, 'invalidation_price': None, 'open_orders': []}
@@ -299,7 +523,7 @@ def strategy_backtest(client: Client,
                 exit_price = current_position['tp_price'] * (1 - slippage_amount) # Simulate exit at TP with slippage
                 
                 # Apply step size and min notional checks for exit
-                exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                 if float(exit_quantity) * exit_price < min_notional:
                     logging.warning(f"Skipping breakout TP sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                     current_position = {'quantity': 0, 'entry_price': 0, 'strategy': None, 'sl_price': None, 'tp_price': None, 'invalidation_price': None, 'open_orders': []}
@@ -359,7 +583,7 @@ def strategy_backtest(client: Client,
                     if pd.isna(total_quantity) or total_quantity <= 0:
                         logging.warning(f"Skipping grid buy due to invalid total_quantity (NaN or <= 0) at {timestamp}. Calculated: {total_quantity}")
                         continue
-                    total_quantity = format_quantity(client, symbol, total_quantity)
+                    total_quantity = exchange_filters.format_quantity(total_quantity)
                     total_quantity = float(total_quantity)
                     if total_quantity * avg_entry_price < min_notional:
                         logging.warning(f"Skipping grid buy due to min notional at {timestamp}. Qty: {total_quantity}, Price: {avg_entry_price}")
@@ -420,7 +644,7 @@ def strategy_backtest(client: Client,
                     quantity = amount_to_risk / entry_price # Simple quantity calculation for backtest
                     
                     # Apply step size and min notional checks for entry
-                    quantity = format_quantity(client, symbol, quantity)
+                    quantity = exchange_filters.format_quantity(quantity)
                     if float(quantity) * entry_price < min_notional:
                         logging.warning(f"Skipping breakout buy due to min notional at {timestamp}. Qty: {quantity}, Price: {entry_price}")
                         continue
@@ -463,7 +687,7 @@ def strategy_backtest(client: Client,
                     exit_price = tp_price_for_grid * (1 - slippage_amount) # Simulate exit at TP with slippage
                     
                     # Apply step size and min notional checks for exit
-                    exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+                    exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
                     if float(exit_quantity) * exit_price < min_notional:
                         logging.warning(f"Skipping grid TP sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
                         current_position = {'quantity': 0, 'entry_price': 0, 'strategy': None, 'sl_price': None, 'tp_price': None, 'invalidation_price': None, 'open_orders': []}
@@ -490,7 +714,7 @@ def strategy_backtest(client: Client,
         final_price = df['close'].iloc[-1] * (1 - slippage_amount) # Apply slippage on final exit
         
         # Apply step size and min notional checks for final exit
-        exit_quantity = format_quantity(client, symbol, current_position['quantity'])
+        exit_quantity = exchange_filters.format_quantity(current_position['quantity'])
         if float(exit_quantity) * final_price < min_notional:
             logging.warning(f"Skipping final exit sell due to min notional at {df['timestamp'].iloc[-1]}. Qty: {exit_quantity}, Price: {final_price}")
             # If it can't meet min notional, assume position is stuck or closed at 0 for backtest simplicity
@@ -517,6 +741,377 @@ def strategy_backtest(client: Client,
         'avg_loss': avg_loss
     }
 
+def _run_array_engine(exchange_filters: ExchangeFilters, chunks: Iterable[dict], n: int, min_notional: float, start_index: int, *,
+                      progress_callback: Optional[Callable[[int, float], None]], checkpoints: dict,
+                      starting_balance: float, fee_rate: float, base_slippage_pct: float, volume_factor: float,
+                      latency_seconds: int, max_drawdown_percent: float, max_trades: int,
+                      sentiment_sizing_multiplier: float, atr_trend_threshold: float, breakout_rr_ratio: float,
+                      grid_levels: int, grid_step_percent: float, grid_profit_target_percent: float,
+                      grid_invalidation_percent: float, risk_per_trade_percent: float, trade_mode: str,
+                      fixed_trade_amount_usdt: float, sentiment_threshold_positive: float,
+                      sentiment_threshold_negative: float, base_rsi_oversold: float, base_rsi_overbought: float,
+                      use_bollinger_bands: bool):
+    """
+    Array-backed version of the strategy_backtest loop.
+    Price and indicator columns arrive as contiguous arrays and are converted once to plain float
+    lists, and the position state lives in local variables, so each candle costs a handful of float operations
+    instead of a df.iloc row lookup. The trade log and metrics match the pandas engine exactly.
+    The n candles arrive as consecutive chunks (see array_engine_chunks), each a dict of the columns,
+    timestamps, sentiments and optional intrabar arrays for candles offset onwards. Every chunk but the
+    last ends with one lookahead candle, the next chunk's first, whose open latency fills use.
+    With intrabar sub-candle arrays, open positions are checked sub-candle by sub-candle instead:
+    breakout SL/TP and grid invalidation/TP fill at their levels on the first sub-candle that reaches
+    them, with the stop winning when one sub-candle reaches both.
+    """
+
+    balance = starting_balance
+    peak_balance = starting_balance
+    trade_log = []
+    trade_count = 0
+
+    gross_profit = 0
+    gross_loss = 0
+    winning_trades = 0
+    losing_trades = 0
+    max_drawdown = 0
+
+    # Open position state, unpacked from the current_position dict used by the pandas engine
+    pos_quantity = 0
+    pos_entry_price = 0
+    pos_strategy = None
+    pos_sl_price = None
+    pos_tp_price = None
+    pos_invalidation_price = None
+
+    drawdown_floor_ratio = 1 - max_drawdown_percent / 100
+    grid_tp_ratio = 1 + grid_profit_target_percent / 100
+    for chunk in chunks:
+        offset = chunk['offset']
+        columns = chunk['columns']
+        timestamps = chunk['timestamps']
+        opens = columns['open'].tolist()
+        highs = columns['high'].tolist()
+        lows = columns['low'].tolist()
+        closes = columns['close'].tolist()
+        atrs = columns['ATR'].tolist()
+        rsis = columns['RSI'].tolist()
+        macds = columns['macd'].tolist()
+        macd_signals = columns['macd_signal'].tolist()
+        # Mirrors current_candle.get('bb_bbl') in the pandas engine: None when the bands were not computed
+        bb_bbls = columns['bb_bbl'].tolist() if 'bb_bbl' in columns else None
+        bb_bbhs = columns['bb_bbh'].tolist() if 'bb_bbh' in columns else None
+        sentiment_values = chunk['sentiments'].tolist()
+        intrabar = chunk.get('intrabar')
+        if intrabar is not None:
+            sub_offsets, sub_highs, sub_lows, sub_timestamps = intrabar['offsets'], intrabar['highs'], intrabar['lows'], intrabar['timestamps']
+        chunk_end = offset + len(closes)
+        if chunk_end < n:
+            chunk_end -= 1 # The lookahead candle is processed with the next chunk
+
+        for i in range(max(start_index, offset), chunk_end):
+            j = i - offset # Position within the chunk
+            price = closes[j]
+
+            if i in checkpoints:
+                progress_callback(checkpoints[i], balance + pos_quantity * price)
+
+            if balance > peak_balance:
+                peak_balance = balance
+
+            # Global Drawdown Check
+            if balance < peak_balance * drawdown_floor_ratio:
+                timestamp = timestamps.iat[j]
+                logging.warning(f"🚨 GLOBAL DRAWDOWN HIT at {timestamp}: Balance {balance:.2f} dropped below {max_drawdown_percent}% of peak balance {peak_balance:.2f}. Stopping backtest.")
+                if pos_quantity > 0:
+                    slippage_amount = calculate_dynamic_slippage(pos_quantity, price, base_slippage_pct, volume_factor)
+                    exit_price = price * (1 - slippage_amount)
+                    exit_quantity = exchange_filters.format_quantity(pos_quantity)
+                    if float(exit_quantity) * exit_price < min_notional:
+                        logging.warning(f"Skipping final exit sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
+                        balance = 0
+                    else:
+                        trade_value = float(exit_quantity) * exit_price
+                        fee = trade_value * fee_rate
+                        balance += (trade_value - fee)
+                        trade_log.append({'type': 'global_drawdown_exit', 'price': exit_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': timestamp, 'profit_loss': balance - (pos_quantity * pos_entry_price)})
+                return pd.DataFrame(trade_log), 0, {
+                    'profit_factor': 0,
+                    'max_drawdown': max_drawdown,
+                    'win_rate': 0,
+                    'avg_win': 0,
+                    'avg_loss': 0
+                }
+
+            # Trade Count Limit Check
+            if max_trades > 0 and trade_count >= max_trades:
+                timestamp = timestamps.iat[j]
+                logging.info(f"📈 MAX TRADES ({max_trades}) REACHED at {timestamp}. Stopping backtest.")
+                if pos_quantity > 0:
+                    slippage_amount = calculate_dynamic_slippage(pos_quantity, price, base_slippage_pct, volume_factor)
+                    exit_price = price * (1 - slippage_amount)
+                    exit_quantity = exchange_filters.format_quantity(pos_quantity)
+                    if float(exit_quantity) * exit_price < min_notional:
+                        logging.warning(f"Skipping final exit sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
+                        balance = 0
+                    else:
+                        trade_value = float(exit_quantity) * exit_price
+                        fee = trade_value * fee_rate
+                        balance += (trade_value - fee)
+                        trade_log.append({'type': 'max_trades_exit', 'price': exit_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': timestamp, 'profit_loss': balance - (pos_quantity * pos_entry_price)})
+
+                final_profit_loss = balance - starting_balance
+                if final_profit_loss > 0: gross_profit += final_profit_loss
+                else: gross_loss += abs(final_profit_loss)
+
+                return pd.DataFrame(trade_log), balance, {
+                    'profit_factor': gross_profit / gross_loss if gross_loss > 0 else float('inf'),
+                    'max_drawdown': max_drawdown,
+                    'win_rate': winning_trades / trade_count if trade_count > 0 else 0,
+                    'avg_win': gross_profit / winning_trades if winning_trades > 0 else 0,
+                    'avg_loss': gross_loss / losing_trades if losing_trades > 0 else 0
+                }
+
+            # Determine execution candle based on latency
+            execution_candle_index = j
+            if latency_seconds > 0:
+                if i + 1 < n:
+                    execution_candle_index = j + 1
+                else:
+                    continue
+
+            current_drawdown = (peak_balance - balance) / peak_balance * 100
+            if current_drawdown > max_drawdown:
+                max_drawdown = current_drawdown
+
+            current_sentiment = sentiment_values[j]
+
+            intrabar_exit = None
+            if intrabar is not None and pos_quantity > 0:
+                lo, hi = sub_offsets[j], sub_offsets[j + 1]
+                if hi > lo:
+                    if pos_strategy == 'breakout':
+                        intrabar_exit = _first_intrabar_exit(sub_lows[lo:hi], sub_highs[lo:hi], pos_sl_price, pos_tp_price)
+                    else:
+                        intrabar_exit = _first_intrabar_exit(sub_lows[lo:hi], sub_highs[lo:hi], pos_invalidation_price, pos_entry_price * grid_tp_ratio, strict_stop=True)
+                else:
+                    # No sub-candles for this candle: treat it as a single sub-candle
+                    stop, target = (pos_sl_price, pos_tp_price) if pos_strategy == 'breakout' else (pos_invalidation_price, pos_entry_price * grid_tp_ratio)
+                    intrabar_exit = _first_intrabar_exit(np.array([lows[j]]), np.array([highs[j]]), stop, target, strict_stop=pos_strategy == 'grid')
+                    lo = None
+                if intrabar_exit is not None:
+                    exit_timestamp = sub_timestamps.iat[lo + intrabar_exit[1]] if lo is not None else timestamps.iat[j]
+
+            # --- Grid Invalidation Check ---
+            if pos_strategy == 'grid' and pos_quantity > 0:
+                if intrabar is not None:
+                    invalidated = intrabar_exit is not None and intrabar_exit[0] == 'sl'
+                else:
+                    invalidated = pos_invalidation_price and price < pos_invalidation_price
+                if invalidated:
+                    timestamp = timestamps.iat[j] if intrabar is None else exit_timestamp
+                    # Intrabar fills happen at the stop level rather than the candle close
+                    fill_price = price if intrabar is None else pos_invalidation_price
+                    logging.info(f"🚨 GRID INVALIDATION at {timestamp}: Price {fill_price:.2f} dropped below stop-loss {pos_invalidation_price:.2f}. Closing position.")
+                    slippage_amount = calculate_dynamic_slippage(pos_quantity, fill_price, base_slippage_pct, volume_factor)
+                    exit_price = fill_price * (1 - slippage_amount)
+                    exit_quantity = exchange_filters.format_quantity(pos_quantity)
+                    if float(exit_quantity) * exit_price < min_notional:
+                        logging.warning(f"Skipping grid invalidation sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
+                    else:
+                        trade_value = float(exit_quantity) * exit_price
+                        fee = trade_value * fee_rate
+                        balance += (trade_value - fee)
+                        profit_loss = (exit_price - pos_entry_price) * pos_quantity - fee
+                        trade_log.append({'type': 'grid_invalidation_sell', 'price': exit_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': timestamp, 'profit_loss': profit_loss})
+                        if profit_loss > 0: gross_profit += profit_loss; winning_trades += 1
+                        else: gross_loss += abs(profit_loss); losing_trades += 1
+                    pos_quantity, pos_entry_price, pos_strategy = 0, 0, None
+                    pos_sl_price = pos_tp_price = pos_invalidation_price = None
+                    continue
+
+            # --- Check for open position exit conditions (SL/TP for breakout) ---
+            if pos_strategy == 'breakout' and pos_quantity > 0:
+                exit_type = None
+                if intrabar is not None:
+                    if intrabar_exit is not None:
+                        exit_type = intrabar_exit[0]
+                        level = pos_sl_price if exit_type == 'sl' else pos_tp_price
+                        price = level
+                elif pos_sl_price and price <= pos_sl_price:
+                    exit_type, level = 'sl', pos_sl_price
+                elif pos_tp_price and price >= pos_tp_price:
+                    exit_type, level = 'tp', pos_tp_price
+                if exit_type is not None:
+                    timestamp = timestamps.iat[j] if intrabar is None else exit_timestamp
+                    if exit_type == 'sl':
+                        logging.info(f"📉 BREAKOUT STOP-LOSS HIT at {timestamp}: Price {price:.2f} hit SL {level:.2f}.")
+                    else:
+                        logging.info(f"📈 BREAKOUT TAKE-PROFIT HIT at {timestamp}: Price {price:.2f} hit TP {level:.2f}.")
+                    slippage_amount = calculate_dynamic_slippage(pos_quantity, level, base_slippage_pct, volume_factor)
+                    exit_price = level * (1 - slippage_amount)
+                    exit_quantity = exchange_filters.format_quantity(pos_quantity)
+                    if float(exit_quantity) * exit_price < min_notional:
+                        logging.warning(f"Skipping breakout {exit_type.upper()} sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
+                    else:
+                        trade_value = float(exit_quantity) * exit_price
+                        fee = trade_value * fee_rate
+                        balance += (trade_value - fee)
+                        profit_loss = (exit_price - pos_entry_price) * pos_quantity - fee
+                        trade_log.append({'type': f'sell(breakout_{exit_type})', 'price': exit_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': timestamp, 'profit_loss': profit_loss})
+                        if profit_loss > 0: gross_profit += profit_loss; winning_trades += 1
+                        else: gross_loss += abs(profit_loss); losing_trades += 1
+                    pos_quantity, pos_entry_price, pos_strategy = 0, 0, None
+                    pos_sl_price = pos_tp_price = pos_invalidation_price = None
+                    continue
+
+            # --- Strategy Execution ---
+            if pos_quantity == 0:
+                amount_to_risk = calculate_trade_size(balance, trade_mode, risk_per_trade_percent, current_sentiment, fixed_trade_amount_usdt, sentiment_sizing_multiplier)
+                atr = atrs[j]
+
+                if not atr / price > atr_trend_threshold:
+                    # --- Simulate Grid Strategy ---
+                    low_price = lows[j]
+                    grid_buy_prices = []
+                    for level in range(1, grid_levels + 1):
+                        grid_buy_prices.append(price * (1 - (level * grid_step_percent / 100)))
+
+                    filled_levels_count = 0
+                    for buy_p in grid_buy_prices:
+                        if low_price <= buy_p:
+                            filled_levels_count += 1
+
+                    if filled_levels_count > 0:
+                        timestamp = timestamps.iat[j]
+                        avg_entry_price = sum(grid_buy_prices[:filled_levels_count]) / filled_levels_count
+                        if avg_entry_price <= 0:
+                            logging.warning(f"Skipping grid buy due to invalid avg_entry_price ({avg_entry_price:.2f}) at {timestamp}.")
+                            continue
+
+                        amount_per_level_usdt = amount_to_risk / grid_levels
+                        total_quantity_usdt = amount_per_level_usdt * filled_levels_count
+                        total_quantity = total_quantity_usdt / avg_entry_price
+
+                        if pd.isna(total_quantity) or total_quantity <= 0:
+                            logging.warning(f"Skipping grid buy due to invalid total_quantity (NaN or <= 0) at {timestamp}. Calculated: {total_quantity}")
+                            continue
+                        total_quantity = float(exchange_filters.format_quantity(total_quantity))
+                        if total_quantity * avg_entry_price < min_notional:
+                            logging.warning(f"Skipping grid buy due to min notional at {timestamp}. Qty: {total_quantity}, Price: {avg_entry_price}")
+                            continue
+
+                        slippage_amount = calculate_dynamic_slippage(total_quantity, avg_entry_price, base_slippage_pct, volume_factor)
+                        entry_price_with_slippage = avg_entry_price * (1 + slippage_amount)
+                        fee = total_quantity * entry_price_with_slippage * fee_rate
+                        balance -= (total_quantity * entry_price_with_slippage + fee)
+
+                        last_buy_price = price * (1 - (grid_levels * grid_step_percent / 100))
+                        execution_timestamp = timestamps.iat[execution_candle_index]
+                        pos_quantity = total_quantity
+                        pos_entry_price = entry_price_with_slippage
+                        pos_strategy = 'grid'
+                        pos_sl_price = pos_tp_price = None
+                        pos_invalidation_price = last_buy_price * (1 - grid_invalidation_percent / 100)
+                        trade_log.append({'type': 'buy(grid)', 'price': entry_price_with_slippage, 'quantity': total_quantity, 'balance': balance, 'timestamp': execution_timestamp, 'profit_loss': 0.0})
+                        logging.info(f"📊 GRID BUY at {execution_timestamp}: Price {entry_price_with_slippage:.2f}, Qty {total_quantity:.4f}, Levels Filled: {filled_levels_count}")
+                        trade_count += 1
+
+                else:
+                    signal = generate_signal(rsi=rsis[j],
+                                             macd=macds[j],
+                                             macd_signal=macd_signals[j],
+                                             sentiment=current_sentiment,
+                                             sentiment_threshold_positive=sentiment_threshold_positive,
+                                             sentiment_threshold_negative=sentiment_threshold_negative,
+                                             base_rsi_oversold=base_rsi_oversold,
+                                             base_rsi_overbought=base_rsi_overbought,
+                                             use_bollinger_bands=use_bollinger_bands,
+                                             bb_bbl=bb_bbls[j] if bb_bbls is not None else None,
+                                             bb_bbh=bb_bbhs[j] if bb_bbhs is not None else None,
+                                             current_close=price)
+
+                    if signal == 'buy':
+                        timestamp = timestamps.iat[j]
+                        execution_price = opens[execution_candle_index]
+                        quantity_for_slippage_calc = amount_to_risk / execution_price
+                        slippage_amount = calculate_dynamic_slippage(quantity_for_slippage_calc, execution_price, base_slippage_pct, volume_factor)
+                        entry_price = execution_price * (1 + slippage_amount)
+
+                        sl_price = entry_price - (2 * atr)
+                        tp_price = entry_price + (breakout_rr_ratio * (entry_price - sl_price))
+
+                        quantity = exchange_filters.format_quantity(amount_to_risk / entry_price)
+                        if float(quantity) * entry_price < min_notional:
+                            logging.warning(f"Skipping breakout buy due to min notional at {timestamp}. Qty: {quantity}, Price: {entry_price}")
+                            continue
+
+                        if float(quantity) > 0 and balance >= (float(quantity) * entry_price):
+                            fee = float(quantity) * entry_price * fee_rate
+                            balance -= (float(quantity) * entry_price + fee)
+                            execution_timestamp = timestamps.iat[execution_candle_index]
+                            pos_quantity = float(quantity)
+                            pos_entry_price = entry_price
+                            pos_strategy = 'breakout'
+                            pos_sl_price = sl_price
+                            pos_tp_price = tp_price
+                            pos_invalidation_price = None
+                            trade_log.append({'type': 'buy(breakout)', 'price': entry_price, 'quantity': quantity, 'balance': balance, 'timestamp': execution_timestamp, 'profit_loss': 0.0})
+                            logging.info(f"📈 BREAKOUT BUY at {execution_timestamp}: Price {entry_price:.2f}, Qty {float(quantity):.4f}, SL {sl_price:.2f}, TP {tp_price:.2f}")
+                            trade_count += 1
+                        else:
+                            logging.warning(f"Skipping breakout buy due to insufficient funds or invalid quantity at {timestamp}.")
+
+            elif pos_strategy == 'grid' and pos_quantity > 0:
+                # --- Simulate grid take-profit on the average entry of the filled levels ---
+                tp_price_for_grid = pos_entry_price * grid_tp_ratio
+                high_price = highs[j]
+                if intrabar is not None:
+                    take_profit = intrabar_exit is not None and intrabar_exit[0] == 'tp'
+                else:
+                    take_profit = high_price >= tp_price_for_grid
+                if take_profit:
+                    timestamp = timestamps.iat[j] if intrabar is None else exit_timestamp
+                    logging.info(f"✅ GRID TAKE-PROFIT HIT at {timestamp}: Price {high_price:.2f} hit TP {tp_price_for_grid:.2f}.")
+                    slippage_amount = calculate_dynamic_slippage(pos_quantity, tp_price_for_grid, base_slippage_pct, volume_factor)
+                    exit_price = tp_price_for_grid * (1 - slippage_amount)
+                    exit_quantity = exchange_filters.format_quantity(pos_quantity)
+                    if float(exit_quantity) * exit_price < min_notional:
+                        logging.warning(f"Skipping grid TP sell due to min notional at {timestamp}. Qty: {exit_quantity}, Price: {exit_price}")
+                    else:
+                        trade_value = float(exit_quantity) * exit_price
+                        fee = trade_value * fee_rate
+                        balance += (trade_value - fee)
+                        profit_loss = (exit_price - pos_entry_price) * pos_quantity - fee
+                        trade_log.append({'type': 'sell(grid_tp)', 'price': exit_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': timestamp, 'profit_loss': profit_loss})
+                        if profit_loss > 0: gross_profit += profit_loss; winning_trades += 1
+                        else: gross_loss += abs(profit_loss); losing_trades += 1
+                    pos_quantity, pos_entry_price, pos_strategy = 0, 0, None
+                    pos_sl_price = pos_tp_price = pos_invalidation_price = None
+
+    # If still in a position at the end of the backtest, exit at the last known price
+    if pos_quantity > 0:
+        last_close = closes[-1]
+        last_timestamp = timestamps.iat[-1]
+        slippage_amount = calculate_dynamic_slippage(pos_quantity, last_close, base_slippage_pct, volume_factor)
+        final_price = last_close * (1 - slippage_amount)
+        exit_quantity = exchange_filters.format_quantity(pos_quantity)
+        if float(exit_quantity) * final_price < min_notional:
+            logging.warning(f"Skipping final exit sell due to min notional at {last_timestamp}. Qty: {exit_quantity}, Price: {final_price}")
+            balance = 0
+        else:
+            trade_value = float(exit_quantity) * final_price
+            fee = trade_value * fee_rate
+            balance += (trade_value - fee)
+            trade_log.append({'type': 'final_exit', 'price': final_price, 'quantity': exit_quantity, 'balance': balance, 'timestamp': last_timestamp, 'profit_loss': (final_price - pos_entry_price) * pos_quantity - fee})
+
+    return pd.DataFrame(trade_log), balance, {
+        'profit_factor': gross_profit / gross_loss if gross_loss > 0 else float('inf'),
+        'max_drawdown': max_drawdown,
+        'win_rate': winning_trades / trade_count if trade_count > 0 else 0,
+        'avg_win': gross_profit / winning_trades if winning_trades > 0 else 0,
+        'avg_loss': gross_loss / losing_trades if losing_trades > 0 else 0
+    }
+
 def plot_performance(trades, df):
     plt.figure(figsize=(14, 6))
     plt.plot(df['timestamp'], df['close'], label='Price', alpha=0.5)
@@ -545,13 +1140,12 @@ if __name__ == "__main__":
     api_key = os.getenv("BINANCE_API_KEY")
     api_secret = os.getenv("BINANCE_API_SECRET")
     client = Client(api_key, api_secret)
-    if not os.path.exists(csv_file):
+    if not CandleStore().exists(symbol, interval) and not CandleResampler().can_resample(symbol, interval) and not os.path.exists(csv_file):
         logging.info("Fetching historical data...")
-        df = get_data(client, symbol, interval, limit=1000) # Fetch more data for backtest
-        df.to_csv(csv_file, index=False)
-        logging.info(f"Saved historical data to {csv_file}")
-        time.sleep(1) # Give a moment for file to be written
-    df = load_data(csv_file)
+        # Pages through the full range instead of the latest 1000 candles
+        KlineDownloader().sync(symbol, interval, start=os.getenv("BACKTEST_HISTORY_START", "2021-01-01"))
+    df = load_candles(symbol, interval, csv_file=csv_file)
+    exchange_filters = load_exchange_filters(client, symbol, "backtest/exchange_filters.json")
     # Load historical sentiment data (assuming you have a CSV named 'historical_sentiment.csv')
     # You would need to create this file from your data acquisition process
     historical_sentiment_csv = "data_acquisition/historical_sentiment.csv"
@@ -589,7 +1183,9 @@ if __name__ == "__main__":
         use_bollinger_bands=False,
         bb_window=20,
         bb_window_dev=2.0,
-        sentiment_csv_file=historical_sentiment_csv # Pass the sentiment CSV file
+        sentiment_csv_file=historical_sentiment_csv, # Pass the sentiment CSV file
+        symbol=symbol,
+        exchange_filters=exchange_filters
     )
     logging.info(trades)
     logging.info(f"Final Balance (with fees & slippage): ${final_balance:.2f}")
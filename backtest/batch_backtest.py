@@ -0,0 +1,321 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import inspect
+import logging
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from bot.exchange_info import ExchangeFilters
+from bot.strategy import buy_signals
+from indicator_store import IndicatorStore
+
+# strategy_backtest parameters that may differ between the rows of a batch. Anything missing
+# from the parameter table takes the strategy_backtest default.
+BATCH_PARAMETERS = (
+    'starting_balance', 'fee_rate', 'base_slippage_pct', 'volume_factor', 'latency_seconds',
+    'max_drawdown_percent', 'max_trades', 'sentiment_sizing_multiplier', 'atr_period',
+    'atr_trend_threshold', 'breakout_rr_ratio', 'grid_levels', 'grid_step_percent',
+    'grid_profit_target_percent', 'grid_invalidation_percent', 'risk_per_trade_percent',
+    'fixed_trade_amount_usdt', 'sentiment_threshold_positive', 'sentiment_threshold_negative',
+    'base_rsi_oversold', 'base_rsi_overbought', 'use_bollinger_bands', 'bb_window', 'bb_window_dev'
+)
+
+METRIC_COLUMNS = ['final_balance', 'trade_count', 'profit_factor', 'max_drawdown', 'win_rate', 'avg_win', 'avg_loss']
+
+# Position strategies, stored per set as small ints
+FLAT, GRID, BREAKOUT = 0, 1, 2
+
+def batch_parameter_table(param_sets: Union[pd.DataFrame, Iterable[dict]]) -> pd.DataFrame:
+    """
+    Normalizes a list of parameter dicts (or a DataFrame) into one row per set with every
+    BATCH_PARAMETERS column filled in.
+    """
+    params = pd.DataFrame(param_sets).reset_index(drop=True)
+    unknown = set(params.columns) - set(BATCH_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Parameters {sorted(unknown)} cannot vary in a batch backtest.")
+    defaults = inspect.signature(backtest.strategy_backtest).parameters
+    for name in BATCH_PARAMETERS:
+        if name not in params.columns:
+            params[name] = defaults[name].default
+        elif params[name].isna().any():
+            # Dicts that leave a parameter out get its default too
+            params[name] = params[name].astype(object).where(params[name].notna(), defaults[name].default).infer_objects()
+    return params
+
+def batch_strategy_backtest(df: pd.DataFrame,
+                            param_sets: Union[pd.DataFrame, Iterable[dict]],
+                            exchange_filters: ExchangeFilters,
+                            trade_mode: str = 'PERCENTAGE',
+                            sentiment_csv_file: Optional[str] = None,
+                            sentiment_max_staleness: Optional[str] = None,
+                            indicator_store: Optional[IndicatorStore] = None) -> pd.DataFrame:
+    """
+    Runs strategy_backtest for every row of param_sets in a single sweep over the candles.
+    Balances and open positions of all sets are NumPy vectors advanced together; per-set ATR and
+    Bollinger columns are gathered from the indicator store. Returns param_sets with the final
+    balance, trade count and the strategy_backtest metrics appended, one row per set.
+    """
+    params = batch_parameter_table(param_sets)
+    k = len(params)
+    n = len(df)
+    if indicator_store is None:
+        indicator_store = IndicatorStore(df)
+    elif len(indicator_store) != n:
+        raise ValueError(f"Indicator store covers {len(indicator_store)} candles but df has {n}.")
+    if k == 0:
+        return params.assign(**{col: pd.Series(dtype=float) for col in METRIC_COLUMNS})
+
+    def column(name, dtype=float):
+        return params[name].to_numpy(dtype=dtype)
+
+    starting_balance = column('starting_balance')
+    fee_rate = column('fee_rate')
+    base_slippage_pct = column('base_slippage_pct')
+    volume_factor = column('volume_factor')
+    has_latency = column('latency_seconds') > 0
+    max_drawdown_percent = column('max_drawdown_percent')
+    max_trades = column('max_trades', int)
+    sentiment_sizing_multiplier = column('sentiment_sizing_multiplier')
+    atr_trend_threshold = column('atr_trend_threshold')
+    breakout_rr_ratio = column('breakout_rr_ratio')
+    grid_levels = column('grid_levels', int)
+    grid_step_percent = column('grid_step_percent')
+    grid_invalidation_percent = column('grid_invalidation_percent')
+    risk_per_trade_percent = column('risk_per_trade_percent')
+    fixed_trade_amount_usdt = column('fixed_trade_amount_usdt')
+    sentiment_threshold_positive = column('sentiment_threshold_positive')
+    base_rsi_oversold = column('base_rsi_oversold')
+    use_bollinger_bands = column('use_bollinger_bands', bool)
+    atr_periods = column('atr_period', int)
+    bb_windows = column('bb_window', int)
+    bb_window_devs = column('bb_window_dev')
+
+    drawdown_floor_ratio = 1 - max_drawdown_percent / 100
+    grid_tp_ratio = 1 + column('grid_profit_target_percent') / 100
+    start_index = np.maximum(np.maximum(atr_periods, 26), np.where(use_bollinger_bands, bb_windows, 0))
+    # Grid buy levels as price multipliers, (sets, max levels); levels beyond a set's grid_levels are masked
+    level_numbers = np.arange(1, grid_levels.max() + 1)
+    grid_level_ratios = 1 - (level_numbers[None, :] * grid_step_percent[:, None] / 100)
+    grid_level_valid = level_numbers[None, :] <= grid_levels[:, None]
+    last_level_ratio = 1 - (grid_levels * grid_step_percent / 100)
+
+    # Per-set indicator columns, stacked as (candles, distinct settings) so row i is contiguous
+    unique_atr, atr_slot = np.unique(atr_periods, return_inverse=True)
+    atr_rows = np.stack([indicator_store.atr(int(period)) for period in unique_atr], axis=1)
+    bb_settings = sorted({(int(w), float(d)) for w, d, use in zip(bb_windows, bb_window_devs, use_bollinger_bands) if use})
+    bb_slot = np.array([bb_settings.index((int(w), float(d))) if use else 0
+                        for w, d, use in zip(bb_windows, bb_window_devs, use_bollinger_bands)], dtype=int)
+    bbl_rows = np.stack([indicator_store.bollinger_bands(w, d)[0] for w, d in bb_settings], axis=1) if bb_settings else None
+
+    opens = indicator_store.price('open')
+    highs = indicator_store.price('high')
+    lows = indicator_store.price('low')
+    closes = indicator_store.price('close')
+    rsis = indicator_store.rsi()
+    macds, macd_signals = indicator_store.macd()
+    sentiments = backtest.candle_sentiments(df, sentiment_csv_file, sentiment_max_staleness)
+    min_notional = exchange_filters.min_notional
+    floor_quantity = exchange_filters.floor_quantity
+
+    balance = starting_balance.copy()
+    peak_balance = starting_balance.copy()
+    trade_count = np.zeros(k, dtype=int)
+    gross_profit = np.zeros(k)
+    gross_loss = np.zeros(k)
+    winning_trades = np.zeros(k, dtype=int)
+    losing_trades = np.zeros(k, dtype=int)
+    max_drawdown = np.zeros(k)
+    # Sets stopped by the drawdown or trade-count limit finish with a fixed final balance
+    running = np.ones(k, dtype=bool)
+    drawdown_stopped = np.zeros(k, dtype=bool)
+    final_balance = np.zeros(k)
+
+    # Open positions; 0.0 stands in for a None SL/TP/invalidation price, as both are falsy in the scalar loop
+    pos_quantity = np.zeros(k)
+    pos_entry_price = np.zeros(k)
+    pos_strategy = np.zeros(k, dtype=np.int8)
+    pos_sl_price = np.zeros(k)
+    pos_tp_price = np.zeros(k)
+    pos_invalidation_price = np.zeros(k)
+
+    def close_positions(idx, level, stop_exit):
+        # Sells the positions of sets idx at level with slippage, exactly as the scalar exits do.
+        # Stop exits (drawdown, trade limit, end of data) zero the balance when below min notional
+        # and are not counted as wins or losses.
+        quantity = pos_quantity[idx]
+        exit_price = level * (1 - (base_slippage_pct[idx] + (quantity * volume_factor[idx])))
+        trade_value = floor_quantity(quantity) * exit_price
+        filled = trade_value >= min_notional
+        fee = trade_value * fee_rate[idx]
+        balance[idx] = np.where(filled, balance[idx] + (trade_value - fee), 0.0 if stop_exit else balance[idx])
+        if not stop_exit:
+            profit_loss = (exit_price - pos_entry_price[idx]) * quantity - fee
+            won = filled & (profit_loss > 0)
+            lost = filled & ~(profit_loss > 0)
+            gross_profit[idx] += np.where(won, profit_loss, 0.0)
+            winning_trades[idx] += won
+            gross_loss[idx] += np.where(lost, np.abs(profit_loss), 0.0)
+            losing_trades[idx] += lost
+        pos_quantity[idx] = 0
+        pos_entry_price[idx] = 0
+        pos_strategy[idx] = FLAT
+        pos_sl_price[idx] = pos_tp_price[idx] = pos_invalidation_price[idx] = 0.0
+
+    for i in range(int(start_index.min()), n):
+        live = running & (start_index <= i)
+        if not live.any():
+            if not running.any():
+                break
+            continue
+        price = closes[i]
+        np.maximum(peak_balance, balance, out=peak_balance)
+
+        # Global drawdown stop: close at the close price and finish with a zero balance
+        stopped = live & (balance < peak_balance * drawdown_floor_ratio)
+        if stopped.any():
+            idx = np.flatnonzero(stopped & (pos_quantity > 0))
+            if len(idx):
+                close_positions(idx, price, stop_exit=True)
+            running &= ~stopped
+            drawdown_stopped |= stopped
+            live &= ~stopped
+
+        # Trade count limit: close at the close price and book the overall result as one trade
+        stopped = live & (max_trades > 0) & (trade_count >= max_trades)
+        if stopped.any():
+            idx = np.flatnonzero(stopped & (pos_quantity > 0))
+            if len(idx):
+                close_positions(idx, price, stop_exit=True)
+            idx = np.flatnonzero(stopped)
+            final_profit_loss = balance[idx] - starting_balance[idx]
+            gross_profit[idx] += np.where(final_profit_loss > 0, final_profit_loss, 0.0)
+            gross_loss[idx] += np.where(final_profit_loss > 0, 0.0, np.abs(final_profit_loss))
+            final_balance[idx] = balance[idx]
+            running &= ~stopped
+            live &= ~stopped
+
+        # With latency, orders execute on the next candle; the last candle has none
+        execution_index = np.full(k, i)
+        if i + 1 < n:
+            execution_index[has_latency] = i + 1
+        else:
+            live &= ~has_latency
+
+        current_drawdown = (peak_balance - balance) / peak_balance * 100
+        max_drawdown = np.where(live & (current_drawdown > max_drawdown), current_drawdown, max_drawdown)
+        current_sentiment = sentiments[i]
+
+        # Grid invalidation
+        exiting = live & (pos_strategy == GRID) & (pos_quantity > 0) & (pos_invalidation_price != 0) & (price < pos_invalidation_price)
+        if exiting.any():
+            close_positions(np.flatnonzero(exiting), price, stop_exit=False)
+            live &= ~exiting
+
+        # Breakout stop-loss / take-profit on the close; the stop-loss is checked first
+        in_breakout = live & (pos_strategy == BREAKOUT) & (pos_quantity > 0)
+        if in_breakout.any():
+            sl_hit = in_breakout & (pos_sl_price != 0) & (price <= pos_sl_price)
+            tp_hit = in_breakout & ~sl_hit & (pos_tp_price != 0) & (price >= pos_tp_price)
+            exiting = sl_hit | tp_hit
+            if exiting.any():
+                idx = np.flatnonzero(exiting)
+                close_positions(idx, np.where(sl_hit[idx], pos_sl_price[idx], pos_tp_price[idx]), stop_exit=False)
+                live &= ~exiting
+
+        in_grid = live & (pos_strategy == GRID) & (pos_quantity > 0)
+        flat = live & (pos_quantity == 0)
+        if flat.any():
+            # calculate_trade_size, vectorized
+            if trade_mode == 'FIXED':
+                base_amount = fixed_trade_amount_usdt
+            else:
+                base_amount = np.maximum(balance * (risk_per_trade_percent / 100), fixed_trade_amount_usdt)
+            amount_to_risk = np.maximum(base_amount * (1 + current_sentiment * sentiment_sizing_multiplier), fixed_trade_amount_usdt)
+            atr = atr_rows[i][atr_slot]
+            trending = atr / price > atr_trend_threshold
+
+            # --- Grid entries ---
+            idx = np.flatnonzero(flat & ~trending)
+            if len(idx):
+                grid_buy_prices = price * grid_level_ratios[idx]
+                filled_levels = ((lows[i] <= grid_buy_prices) & grid_level_valid[idx]).sum(axis=1)
+                has_fill = filled_levels > 0
+                idx, grid_buy_prices, filled_levels = idx[has_fill], grid_buy_prices[has_fill], filled_levels[has_fill]
+            if len(idx):
+                avg_entry_price = np.cumsum(grid_buy_prices, axis=1)[np.arange(len(idx)), filled_levels - 1] / filled_levels
+                total_quantity = amount_to_risk[idx] / grid_levels[idx] * filled_levels / avg_entry_price
+                valid = (avg_entry_price > 0) & (total_quantity > 0)
+                idx, avg_entry_price, total_quantity = idx[valid], avg_entry_price[valid], total_quantity[valid]
+                total_quantity = floor_quantity(total_quantity)
+                valid = total_quantity * avg_entry_price >= min_notional
+                idx, avg_entry_price, total_quantity = idx[valid], avg_entry_price[valid], total_quantity[valid]
+                if len(idx):
+                    entry_price = avg_entry_price * (1 + (base_slippage_pct[idx] + (total_quantity * volume_factor[idx])))
+                    fee = total_quantity * entry_price * fee_rate[idx]
+                    balance[idx] -= (total_quantity * entry_price + fee)
+                    pos_quantity[idx] = total_quantity
+                    pos_entry_price[idx] = entry_price
+                    pos_strategy[idx] = GRID
+                    pos_sl_price[idx] = pos_tp_price[idx] = 0.0
+                    pos_invalidation_price[idx] = price * last_level_ratio[idx] * (1 - grid_invalidation_percent[idx] / 100)
+                    trade_count[idx] += 1
+
+            # --- Breakout entries (generate_signal 'buy', vectorized) ---
+            buy = flat & trending & buy_signals(rsis[i], macds[i], macd_signals[i], current_sentiment, sentiment_threshold_positive,
+                                                base_rsi_oversold, use_bollinger_bands,
+                                                bbl_rows[i][bb_slot] if bbl_rows is not None else None, price)
+            idx = np.flatnonzero(buy)
+            if len(idx):
+                execution_price = opens[execution_index[idx]]
+                amount = amount_to_risk[idx]
+                entry_price = execution_price * (1 + (base_slippage_pct[idx] + ((amount / execution_price) * volume_factor[idx])))
+                sl_price = entry_price - (2 * atr[idx])
+                tp_price = entry_price + (breakout_rr_ratio[idx] * (entry_price - sl_price))
+                quantity = floor_quantity(amount / entry_price)
+                valid = (quantity * entry_price >= min_notional) & (quantity > 0) & (balance[idx] >= quantity * entry_price)
+                idx, entry_price, quantity = idx[valid], entry_price[valid], quantity[valid]
+                if len(idx):
+                    fee = quantity * entry_price * fee_rate[idx]
+                    balance[idx] -= (quantity * entry_price + fee)
+                    pos_quantity[idx] = quantity
+                    pos_entry_price[idx] = entry_price
+                    pos_strategy[idx] = BREAKOUT
+                    pos_sl_price[idx] = sl_price[valid]
+                    pos_tp_price[idx] = tp_price[valid]
+                    pos_invalidation_price[idx] = 0.0
+                    trade_count[idx] += 1
+
+        # Grid take-profit on positions that were open before this candle
+        if in_grid.any():
+            tp_price_for_grid = pos_entry_price * grid_tp_ratio
+            exiting = in_grid & (highs[i] >= tp_price_for_grid)
+            if exiting.any():
+                idx = np.flatnonzero(exiting)
+                close_positions(idx, tp_price_for_grid[idx], stop_exit=False)
+
+    # Sets that ran to the end exit any open position at the last close
+    idx = np.flatnonzero(running & (pos_quantity > 0))
+    if len(idx):
+        close_positions(idx, closes[-1], stop_exit=True)
+    final_balance = np.where(running, balance, np.where(drawdown_stopped, 0.0, final_balance))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {
+            'final_balance': final_balance,
+            'trade_count': trade_count,
+            'profit_factor': np.where(gross_loss > 0, gross_profit / gross_loss, np.inf),
+            'max_drawdown': max_drawdown,
+            'win_rate': np.where(trade_count > 0, winning_trades / trade_count, 0.0),
+            'avg_win': np.where(winning_trades > 0, gross_profit / winning_trades, 0.0),
+            'avg_loss': np.where(losing_trades > 0, gross_loss / losing_trades, 0.0)
+        }
+    for name in ('profit_factor', 'win_rate', 'avg_win', 'avg_loss'):
+        metrics[name] = np.where(drawdown_stopped, 0.0, metrics[name])
+    logging.info(f"Batch backtest of {k} parameter sets over {n} candles finished.")
+    return params.assign(**metrics)
@@ -0,0 +1,185 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from result_cache import array_digest
+from bot.strategy import calculate_rsi, calculate_macd, calculate_atr, calculate_bollinger_bands
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class IndicatorStore:
+    """
+    Computes each distinct (indicator, params) column once over a fixed candle history and
+    serves it as a read-only NumPy array. Computed columns are kept in an LRU bounded by
+    max_bytes, so Optuna trials that repeat an atr_period or Bollinger setting skip the work.
+    The caller's DataFrame is never modified.
+    """
+    def __init__(self, df: pd.DataFrame, max_bytes: int = 512 * 1024 * 1024):
+        self.timestamps = df['timestamp'].reset_index(drop=True)
+        self._prices = {col: _read_only(df[col].to_numpy(dtype=float, copy=True)) for col in PRICE_COLUMNS if col in df.columns}
+        self._columns: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._fingerprint = None
+        self._indicator_fingerprints = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_arrays(cls, timestamps: pd.Series, prices: Dict[str, np.ndarray], columns: Optional[Dict[Tuple, np.ndarray]] = None,
+                    max_bytes: int = 512 * 1024 * 1024) -> "IndicatorStore":
+        """
+        Builds a store around existing arrays without copying them, e.g. views onto shared memory
+        filled by another process. columns pre-populates computed indicators by cache key.
+        """
+        store = cls.__new__(cls)
+        store.timestamps = timestamps
+        store._prices = {col: _read_only(values) for col, values in prices.items()}
+        store._columns = OrderedDict()
+        store._bytes = 0
+        store.max_bytes = max_bytes
+        store.hits = 0
+        store.misses = 0
+        store._fingerprint = None
+        store._indicator_fingerprints = {}
+        store._lock = threading.Lock()
+        for key, values in (columns or {}).items():
+            store._store(key, _read_only(values))
+        return store
+
+    def cached_columns(self) -> Dict[Tuple, np.ndarray]:
+        """
+        Returns every computed column currently held, keyed by its cache key.
+        """
+        with self._lock:
+            return dict(self._columns)
+
+    def window(self, start: int, end: int) -> "IndicatorStore":
+        """
+        Zero-copy store over candles [start, end) with every cached column sliced alongside, so
+        walk-forward windows keep the warm-up of the full history. Columns that were not cached
+        yet are computed on the window alone.
+        """
+        return IndicatorStore.from_arrays(self.timestamps.iloc[start:end].reset_index(drop=True),
+                                          {col: values[start:end] for col, values in self._prices.items()},
+                                          {key: values[start:end] for key, values in self.cached_columns().items()},
+                                          max_bytes=self.max_bytes)
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the timestamps and prices, computed once since the arrays are read-only.
+        Equal to result_cache.candle_fingerprint of the source frame.
+        """
+        if self._fingerprint is None:
+            timestamps = self.timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            self._fingerprint = array_digest(timestamps, *(self._prices[col] for col in PRICE_COLUMNS if col in self._prices))
+        return self._fingerprint
+
+    def indicator_fingerprint(self, atr_period: int = 14, use_bollinger_bands: bool = False,
+                              bb_window: int = 20, bb_window_dev: float = 2.0) -> str:
+        """
+        fingerprint() plus a hash of the indicator columns a run with these settings reads. Windows
+        keep the warm-up of the full history, so their columns differ from a store built on the
+        window's candles alone even though the prices match. Memoized per setting, as the columns are read-only.
+        """
+        key = (int(atr_period), True, int(bb_window), float(bb_window_dev)) if use_bollinger_bands else (int(atr_period), False)
+        fingerprint = self._indicator_fingerprints.get(key)
+        if fingerprint is None:
+            columns = self.indicator_columns(atr_period, use_bollinger_bands, bb_window, bb_window_dev)
+            fingerprint = f"{self.fingerprint()}|{array_digest(*(columns[name] for name in sorted(columns)))}"
+            self._indicator_fingerprints[key] = fingerprint
+        return fingerprint
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def price(self, column: str) -> np.ndarray:
+        return self._prices[column]
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        return self._get(('RSI', period))
+
+    def macd(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._get(('macd',)), self._get(('macd_signal',))
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self._get(('ATR', period))
+
+    def bollinger_bands(self, window: int = 20, window_dev: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        window_dev = float(window_dev)
+        return (self._get(('bb_bbl', window, window_dev)),
+                self._get(('bb_bbm', window, window_dev)),
+                self._get(('bb_bbh', window, window_dev)))
+
+    def indicator_columns(self, atr_period: int = 14, use_bollinger_bands: bool = False,
+                          bb_window: int = 20, bb_window_dev: float = 2.0) -> Dict[str, np.ndarray]:
+        """
+        Returns the same columns apply_indicators would add, keyed by their column names.
+        """
+        macd, macd_signal = self.macd()
+        columns = {'RSI': self.rsi(), 'macd': macd, 'macd_signal': macd_signal, 'ATR': self.atr(atr_period)}
+        if use_bollinger_bands:
+            columns['bb_bbl'], columns['bb_bbm'], columns['bb_bbh'] = self.bollinger_bands(bb_window, bb_window_dev)
+        return columns
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'columns': len(self._columns), 'bytes': self._bytes}
+
+    def _get(self, key: Tuple) -> np.ndarray:
+        with self._lock:
+            column = self._columns.get(key)
+            if column is not None:
+                self._columns.move_to_end(key)
+                self.hits += 1
+                return column
+            self.misses += 1
+        computed = self._compute(key)
+        with self._lock:
+            for computed_key, values in computed.items():
+                self._store(computed_key, values)
+            return computed[key]
+
+    def _store(self, key: Tuple, values: np.ndarray):
+        if key in self._columns:
+            return
+        self._columns[key] = values
+        self._bytes += values.nbytes
+        while self._bytes > self.max_bytes and len(self._columns) > 1:
+            evicted_key, evicted = self._columns.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            logging.debug(f"Evicted indicator column {evicted_key} from the indicator store.")
+
+    def _compute(self, key: Tuple) -> Dict[Tuple, np.ndarray]:
+        # Indicators are computed with the bot.strategy functions on a scratch frame, so the
+        # values are identical to apply_indicators.
+        name = key[0]
+        frame = pd.DataFrame({col: values for col, values in self._prices.items()})
+        if name == 'RSI':
+            return {key: _read_only(calculate_rsi(frame, period=key[1]).to_numpy(dtype=float))}
+        if name in ('macd', 'macd_signal'):
+            frame = calculate_macd(frame)
+            return {('macd',): _read_only(frame['macd'].to_numpy(dtype=float)),
+                    ('macd_signal',): _read_only(frame['macd_signal'].to_numpy(dtype=float))}
+        if name == 'ATR':
+            return {key: _read_only(calculate_atr(frame, period=key[1]).to_numpy(dtype=float))}
+        if name in ('bb_bbl', 'bb_bbm', 'bb_bbh'):
+            window, window_dev = key[1], key[2]
+            frame = calculate_bollinger_bands(frame, window=window, window_dev=window_dev)
+            return {(band, window, window_dev): _read_only(frame[band].to_numpy(dtype=float))
+                    for band in ('bb_bbl', 'bb_bbm', 'bb_bbh')}
+        raise KeyError(f"Unknown indicator {name}")
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values = np.ascontiguousarray(values)
+    values.flags.writeable = False
+    return values
@@ -1,23 +1,35 @@
 import pandas as pd
 import os
 import sys
+import time
+import argparse
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import optuna  # Import Optuna
 from analyze_trades import analyze_trades
 
 # Add the parent directory to the sys.path to allow importing backtest.py
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import backtest
+from indicator_store import IndicatorStore
+from shared_data import SharedCandleData
+from result_cache import BacktestResultCache
 from binance.client import Client
 
 # Configure logging for optimization script
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Indicator parameter ranges searched by objective; precompute_indicators fills the store for all of them
+ATR_PERIOD_RANGE = (10, 20)
+BB_WINDOW_RANGE = (15, 25)
+BB_WINDOW_DEV_CHOICES = (1.5, 2.0, 2.5)
 
-def objective(trial, df, historical_sentiment_csv, client):  # Pass data as arguments
+
+def objective(trial, df, historical_sentiment_csv, client, exchange_filters=None, indicator_store=None, result_cache=None):  # Pass data as arguments
     """Objective function for Optuna to optimize."""
     # --- Define Parameter Search Space using Optuna ---
-    atr_period = trial.suggest_int('atr_period', 10, 20)
+    atr_period = trial.suggest_int('atr_period', *ATR_PERIOD_RANGE)
     atr_trend_threshold = trial.suggest_float('atr_trend_threshold', 0.01, 0.03, step=0.01)
     breakout_rr_ratio = trial.suggest_float('breakout_rr_ratio', 2.0, 3.5, step=0.5)
     grid_levels = trial.suggest_int('grid_levels', 3, 5)
@@ -35,8 +47,14 @@ def objective(trial, df, historical_sentiment_csv, client):  # Pass data as argu
     base_rsi_oversold = trial.suggest_int('base_rsi_oversold', 20, 40)
     base_rsi_overbought = trial.suggest_int('base_rsi_overbought', 60, 80)
     use_bollinger_bands = trial.suggest_categorical('use_bollinger_bands', [True, False])
-    bb_window = trial.suggest_int('bb_window', 15, 25) if use_bollinger_bands else 20
-    bb_window_dev = trial.suggest_float('bb_window_dev', 1.5, 2.5, step=0.5) if use_bollinger_bands else 2.0
+    bb_window = trial.suggest_int('bb_window', *BB_WINDOW_RANGE) if use_bollinger_bands else 20
+    bb_window_dev = trial.suggest_float('bb_window_dev', BB_WINDOW_DEV_CHOICES[0], BB_WINDOW_DEV_CHOICES[-1], step=0.5) if use_bollinger_bands else 2.0
+
+    def report_progress(step, equity):
+        # Intermediate equity lets the pruner stop trials that are clearly losing
+        trial.report(equity, step)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
 
     try:
         # Run the backtest with the suggested parameters
@@ -69,18 +87,118 @@ def objective(trial, df, historical_sentiment_csv, client):  # Pass data as argu
             bb_window=bb_window,
             bb_window_dev=bb_window_dev,
             sentiment_csv_file=historical_sentiment_csv,
-            symbol="BTCUSDT"
+            symbol="BTCUSDT",
+            exchange_filters=exchange_filters,
+            indicator_store=indicator_store,
+            progress_callback=report_progress,
+            result_cache=result_cache
         )
         return final_balance
+    except optuna.TrialPruned:
+        raise
     except Exception as e:
         logging.error(f"Error during Optuna trial {trial.number} with params {trial.params}: {e}")
         raise
 
 
+def precompute_indicators(indicator_store):
+    """Fills the store with every indicator column the search space can ask for."""
+    indicator_store.rsi()
+    indicator_store.macd()
+    for atr_period in range(ATR_PERIOD_RANGE[0], ATR_PERIOD_RANGE[1] + 1):
+        indicator_store.atr(atr_period)
+    indicator_store.bollinger_bands()
+    for bb_window in range(BB_WINDOW_RANGE[0], BB_WINDOW_RANGE[1] + 1):
+        for bb_window_dev in BB_WINDOW_DEV_CHOICES:
+            indicator_store.bollinger_bands(bb_window, bb_window_dev)
+
+
+def create_pruner(name):
+    """Pruner for --pruner: 'median', 'halving' or 'none'."""
+    if name == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=2)
+    if name == 'halving':
+        return optuna.pruners.SuccessiveHalvingPruner()
+    if name == 'none':
+        return optuna.pruners.NopPruner()
+    raise ValueError(f"Unknown pruner '{name}'. Expected 'median', 'halving' or 'none'.")
+
+
+def create_journal_storage(journal_file):
+    """Local file-based Optuna storage that several processes can share without a database server."""
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:  # Optuna < 4.0
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(journal_file))
+
+
+def _run_worker_trials(shared, study_name, journal_file, n_trials, historical_sentiment_csv, exchange_filters, pruner, result_cache):
+    df = shared.frame()
+    indicator_store = shared.indicator_store(df)
+    study = optuna.load_study(study_name=study_name, storage=create_journal_storage(journal_file), pruner=create_pruner(pruner))
+    study.optimize(lambda trial: objective(trial, df, historical_sentiment_csv, None, exchange_filters, indicator_store, result_cache), n_trials=n_trials)
+    return indicator_store.get_stats()
+
+
+def optimize_worker(spec, study_name, journal_file, n_trials, historical_sentiment_csv, exchange_filters, pruner='median', result_cache=None):
+    """Runs n_trials of the shared study in a worker process on top of the shared candle data."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    shared = SharedCandleData.attach(spec)
+    try:
+        # Views onto the block must be released before it can be closed, hence the inner call
+        return _run_worker_trials(shared, study_name, journal_file, n_trials, historical_sentiment_csv, exchange_filters, pruner, result_cache)
+    finally:
+        shared.close()
+
+
+def optimize_parallel(df, indicator_store, exchange_filters, historical_sentiment_csv, n_trials, n_workers, journal_dir, pruner='median',
+                      result_cache=None):
+    """
+    Runs the study across n_workers processes. Candles and precomputed indicators are placed in
+    shared memory once; workers coordinate through a journal file in journal_dir, named after the
+    study. The finished study is returned in memory and its journal file deleted.
+    """
+    precompute_indicators(indicator_store)
+    study_name = f"optimize_params_{int(time.time())}_{os.getpid()}"
+    journal_file = os.path.join(journal_dir, f"{study_name}.journal.log")
+    storage = create_journal_storage(journal_file)
+    optuna.create_study(study_name=study_name, direction='maximize', storage=storage)
+    shared = SharedCandleData.create(df, indicator_store)
+    trials_per_worker = [n_trials // n_workers + (1 if i < n_trials % n_workers else 0) for i in range(n_workers)]
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(optimize_worker, shared.spec, study_name, journal_file, worker_trials,
+                                       historical_sentiment_csv, exchange_filters, pruner, result_cache)
+                       for worker_trials in trials_per_worker if worker_trials > 0]
+            for future in futures:
+                logging.info(f"Worker indicator store: {future.result()}")
+        # Keep the results in memory so the journal does not outlive the run
+        study = optuna.create_study(study_name=study_name, direction='maximize', pruner=create_pruner(pruner))
+        study.add_trials(optuna.load_study(study_name=study_name, storage=storage).trials)
+    finally:
+        shared.close()
+        shared.unlink()
+        for path in (journal_file, f"{journal_file}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+    return study
+
+
 from dotenv import load_dotenv
 load_dotenv()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize strategy parameters with Optuna.")
+    parser.add_argument('--trials', type=int, default=100, help="Number of Optuna trials.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes; above 1 runs trials in parallel over shared memory.")
+    parser.add_argument('--pruner', choices=['median', 'halving', 'none'], default='median', help="Pruner that stops losing trials early.")
+    parser.add_argument('--no-result-cache', action='store_true', help="Disable the on-disk cache of backtest results.")
+    parser.add_argument('--start', default=None, help="Only optimize on candles from this date (UTC).")
+    parser.add_argument('--end', default=None, help="Only optimize on candles before this date (UTC).")
+    args = parser.parse_args()
+
     # Create Binance client
     api_key = os.getenv("BINANCE_API_KEY")
     api_secret = os.getenv("BINANCE_API_SECRET")
@@ -90,21 +208,39 @@ if __name__ == "__main__":
     interval = "1h"
     csv_file = f"backtest/{symbol}_{interval}.csv"
 
-    if not os.path.exists(csv_file):
-        logging.error(f"Historical data not found at {csv_file}. Please run backtest.py first to generate it.")
+    try:
+        # Memory-mapped from the candle store; the CSV is only imported the first time
+        df = backtest.load_candles(symbol, interval, start=args.start, end=args.end, csv_file=csv_file)
+    except FileNotFoundError as e:
+        logging.error(f"Historical data not found: {e} Please run backtest.py first to generate it.")
         sys.exit(1)  # Exit if data is missing
-
-    df = backtest.load_data(csv_file)
+    # Exchange filters come from an on-disk snapshot so trials make no exchange-info requests
+    exchange_filters = backtest.load_exchange_filters(client, symbol, "backtest/exchange_filters.json")
 
     historical_sentiment_csv = "data_acquisition/historical_sentiment.csv"
-    if not os.path.exists(historical_sentiment_csv):
-        logging.warning(f"Historical sentiment data not found at {historical_sentiment_csv}. Sentiment will be neutral.")
+    # Align sentiment onto the candles once instead of in every trial
+    df = backtest.attach_sentiment(df, historical_sentiment_csv)
+    # Indicator columns are computed once per distinct parameter set and shared by all trials
+    indicator_store = IndicatorStore(df)
+    # Duplicate parameter sets and the best-trial rerun are served from disk
+    result_cache = None if args.no_result_cache else BacktestResultCache()
+
+    output_dir = "backtest/optimization_results"
+    os.makedirs(output_dir, exist_ok=True)
 
     # --- Run Optimization ---
-    study = optuna.create_study(direction='maximize')
-    logging.info("Starting Optuna optimization...")
-    # Use a lambda function to pass additional arguments to the objective
-    study.optimize(lambda trial: objective(trial, df, historical_sentiment_csv, client), n_trials=100)
+    logging.info(f"Starting Optuna optimization ({args.trials} trials, {args.workers} worker(s))...")
+    start_time = time.perf_counter()
+    if args.workers > 1:
+        study = optimize_parallel(df, indicator_store, exchange_filters, historical_sentiment_csv, args.trials, args.workers,
+                                  output_dir, args.pruner, result_cache)
+    else:
+        study = optuna.create_study(direction='maximize', pruner=create_pruner(args.pruner))
+        # Use a lambda function to pass additional arguments to the objective
+        study.optimize(lambda trial: objective(trial, df, historical_sentiment_csv, client, exchange_filters, indicator_store, result_cache), n_trials=args.trials)
+    elapsed = time.perf_counter() - start_time
+    pruned = len(study.get_trials(states=(optuna.trial.TrialState.PRUNED,)))
+    logging.info(f"Ran {len(study.trials)} trials ({pruned} pruned) in {elapsed:.1f}s ({len(study.trials) / elapsed * 60:.1f} trials/min)")
 
     # --- Print Best Results ---
     logging.info("\n--- Optuna Optimization Finished ---")
@@ -113,6 +249,9 @@ if __name__ == "__main__":
     for key, value in best_params.items():
         logging.info(f"  {key}: {value}")
     logging.info(f"Best final balance: ${study.best_value:.2f}")
+    logging.info(f"Indicator store: {indicator_store.get_stats()}")
+    if result_cache is not None:
+        logging.info(f"Backtest result cache: {result_cache.get_stats()}")
 
     # --- Re-run and Analyze the Best Trial ---
     logging.info("\n--- Re-running backtest with best parameters to generate analysis ---")
@@ -127,12 +266,13 @@ if __name__ == "__main__":
         fixed_trade_amount_usdt=5.0,
         sentiment_csv_file=historical_sentiment_csv,
         symbol=symbol,
+        exchange_filters=exchange_filters,
+        indicator_store=indicator_store,
+        result_cache=result_cache,
         **best_params
     )
 
     # --- Save the Best Trades ---
-    output_dir = "backtest/optimization_results"
-    os.makedirs(output_dir, exist_ok=True)
     filename = os.path.join(output_dir, f"best_trades_balance_{final_balance:.2f}.csv")
     best_trades_df.to_csv(filename, index=False)
     logging.info(f"Saved trades from best trial to {filename}")
@@ -0,0 +1,156 @@
+import os
+import logging
+import pickle
+import threading
+import zlib
+import json
+from hashlib import blake2b
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever a change to the backtest engine changes results, so stale entries are never served
+RESULT_CACHE_VERSION = 1
+
+# strategy_backtest arguments that do not change the result, or are covered by the data fingerprint
+# (an indicator_store contributes its prices and the indicator columns the run reads)
+UNKEYED_PARAMETERS = ('client', 'df', 'engine', 'indicator_store', 'progress_callback', 'progress_checkpoints', 'sub_candles',
+                      'result_cache', 'symbol', 'exchange_filters', 'sentiment_csv_file', 'sentiment_max_staleness')
+
+def array_digest(*arrays: np.ndarray) -> str:
+    """blake2b over the raw bytes of each array."""
+    digest = blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(str(values.dtype).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+def candle_fingerprint(df: pd.DataFrame) -> str:
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    prices = [df[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close', 'volume') if col in df.columns]
+    return array_digest(timestamps, *prices)
+
+def normalize_parameters(params: dict) -> dict:
+    """
+    Canonical form of the backtest parameters: unkeyed arguments dropped, numbers as floats
+    (so 2 and 2.0 hash alike) and Bollinger settings dropped when the bands are off.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name in UNKEYED_PARAMETERS:
+            continue
+        if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+            value = float(value)
+        elif isinstance(value, np.bool_):
+            value = bool(value)
+        normalized[name] = value
+    if not normalized.get('use_bollinger_bands'):
+        normalized.pop('bb_window', None)
+        normalized.pop('bb_window_dev', None)
+    return normalized
+
+class BacktestResultCache:
+    """
+    On-disk cache of strategy_backtest results. Entries are keyed by a blake2b hash of the candle
+    and sentiment data, the exchange filters and the normalized parameters, and are stored as
+    zlib-compressed pickles of (trade log, final balance, metrics). Once the directory grows past
+    max_bytes, the least recently used entries (by file mtime) are evicted. Safe to share between
+    processes: entries are written to a temporary file and renamed into place.
+    """
+    def __init__(self, cache_dir: str = "backtest/.result_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def make_key(self, data_fingerprint: str, sentiments: np.ndarray, exchange_filters, params: dict) -> str:
+        filters = (exchange_filters.symbol, exchange_filters.step_size, exchange_filters.tick_size,
+                   exchange_filters.min_qty, exchange_filters.min_notional)
+        digest = blake2b(digest_size=20)
+        digest.update(f"v{RESULT_CACHE_VERSION}|{data_fingerprint}|{array_digest(sentiments)}|{filters!r}|".encode())
+        digest.update(json.dumps(normalize_parameters(params), sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, float, dict]]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path) # Mark as recently used for eviction
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable backtest cache entry {path}: {e}")
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Tuple[pd.DataFrame, float, dict]):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.bin'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue # Evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.cache_dir, name))
+            total -= size
+            logging.debug(f"Evicted backtest cache entry {name}")
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for _, _, name in self._entries():
+            self._remove(os.path.join(self.cache_dir, name))
+
+    def get_stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries),
+                    'bytes': sum(size for _, size, _ in entries)}
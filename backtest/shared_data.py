@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import logging
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicator_store import IndicatorStore, PRICE_COLUMNS
+
+class SharedCandleData:
+    """
+    Packs candle prices, timestamps, the aligned sentiment column and every precomputed
+    indicator column into one shared memory block. Worker processes attach by name and get
+    read-only NumPy views onto the same pages, so no DataFrame is pickled per trial.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, spec: dict, owner: bool):
+        self._shm = shm
+        self.spec = spec
+        self._owner = owner
+
+    @classmethod
+    def create(cls, df: pd.DataFrame, indicator_store: Optional[IndicatorStore] = None) -> "SharedCandleData":
+        """
+        Copies the candles (and the store's cached columns) into a new shared memory block.
+        """
+        unit = df['timestamp'].dt.unit
+        arrays: Dict[Tuple, np.ndarray] = {('timestamp',): df['timestamp'].to_numpy(dtype=f'datetime64[{unit}]').view(np.int64)}
+        for col in PRICE_COLUMNS + ['sentiment']:
+            if col in df.columns:
+                arrays[(col,)] = df[col].to_numpy(dtype=float)
+        if indicator_store is not None:
+            if len(indicator_store) != len(df):
+                raise ValueError(f"Indicator store covers {len(indicator_store)} candles but the DataFrame has {len(df)}.")
+            for key, values in indicator_store.cached_columns().items():
+                arrays[('indicator',) + key] = values
+
+        layout = []
+        offset = 0
+        for key, values in arrays.items():
+            layout.append((key, values.dtype.str, offset))
+            offset += values.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (key, dtype, start), values in zip(layout, arrays.values()):
+            np.ndarray(len(df), dtype=dtype, buffer=shm.buf, offset=start)[:] = values
+
+        tz = df['timestamp'].dt.tz
+        spec = {'name': shm.name, 'n': len(df), 'layout': layout, 'unit': unit, 'tz': str(tz) if tz else None}
+        logging.info(f"Shared {len(layout)} candle/indicator columns ({offset / 1e6:.1f} MB) in {shm.name}.")
+        return cls(shm, spec, owner=True)
+
+    @classmethod
+    def attach(cls, spec: dict) -> "SharedCandleData":
+        """
+        Attaches to a block created by another process from its picklable spec.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=spec['name'], track=False)
+        except TypeError:
+            # Python < 3.13 has no track flag. Pool workers share the parent's resource tracker,
+            # where registration is idempotent, so the block is still unlinked only by its owner.
+            shm = shared_memory.SharedMemory(name=spec['name'])
+        return cls(shm, spec, owner=False)
+
+    def arrays(self) -> Dict[Tuple, np.ndarray]:
+        """
+        Read-only views onto the shared block, keyed like the layout.
+        """
+        views = {}
+        for key, dtype, start in self.spec['layout']:
+            view = np.ndarray(self.spec['n'], dtype=dtype, buffer=self._shm.buf, offset=start)
+            view.flags.writeable = False
+            views[tuple(key)] = view
+        return views
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Rebuilds the candle DataFrame (timestamp, prices, sentiment) on top of the shared views.
+        """
+        views = self.arrays()
+        timestamps = pd.to_datetime(views[('timestamp',)].view(f"datetime64[{self.spec['unit']}]"))
+        if self.spec['tz']:
+            timestamps = timestamps.tz_localize('UTC').tz_convert(self.spec['tz'])
+        data = {'timestamp': timestamps}
+        data.update({key[0]: values for key, values in views.items() if len(key) == 1 and key[0] != 'timestamp'})
+        return pd.DataFrame(data, copy=False)
+
+    def indicator_store(self, df: Optional[pd.DataFrame] = None) -> IndicatorStore:
+        """
+        Returns an IndicatorStore prepopulated with the shared indicator columns. Columns not in
+        the block are computed locally in the worker on first use.
+        """
+        views = self.arrays()
+        if df is None:
+            df = self.frame()
+        prices = {key[0]: values for key, values in views.items() if len(key) == 1 and key[0] in PRICE_COLUMNS}
+        columns = {key[1:]: values for key, values in views.items() if key[0] == 'indicator'}
+        return IndicatorStore.from_arrays(df['timestamp'], prices, columns)
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,126 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import inspect
+import logging
+import time
+import tracemalloc
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from bot.exchange_info import ExchangeFilters, get_exchange_filters
+from bot.indicators import IndicatorSet
+from data_acquisition.candle_store import INTERVAL_MS, CandleStore
+from data_acquisition.fetch_sentiment import load_historical_sentiment, align_sentiment
+
+def array_engine_chunks(store: CandleStore, symbol: str, interval: str, start, end, chunk_size: int,
+                        indicators: IndicatorSet, sentiment_df: Optional[pd.DataFrame] = None,
+                        sentiment_max_staleness: Optional[str] = None, sub_interval: Optional[str] = None) -> Iterator[dict]:
+    """
+    Reads candles from the store chunk by chunk and yields them in the form the array engine expects.
+    Each chunk overlaps the next by one candle (the lookahead latency fills need); indicators are
+    updated with the non-overlapping candles only, so none is counted twice. With sub_interval,
+    each chunk also carries the stored sub_interval candles opening inside its candles, read
+    per chunk, for the intrabar SL/TP fills.
+    """
+    carried = None # Indicator values of the previous chunk's lookahead candle
+    for offset, chunk in store.iter_chunks(symbol, interval, chunk_size, start, end, columns=['open', 'high', 'low', 'close'], overlap=1):
+        new = chunk.iloc[0 if carried is None else 1:]
+        computed = indicators.update_chunk(new['high'].to_numpy(), new['low'].to_numpy(), new['close'].to_numpy())
+        if carried is not None:
+            computed = {col: np.r_[carried[col], values] for col, values in computed.items()}
+        columns = {col: chunk[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close')}
+        columns.update(computed)
+        if sentiment_df is not None:
+            sentiments = align_sentiment(sentiment_df, chunk['timestamp'], max_staleness=sentiment_max_staleness).to_numpy()
+        else:
+            sentiments = np.zeros(len(chunk))
+        intrabar = None
+        if sub_interval is not None:
+            end_ms = int(chunk['timestamp'].iat[-1].value // 1_000_000) + INTERVAL_MS[interval]
+            sub_candles = store.load(symbol, sub_interval, columns=['high', 'low'], start=chunk['timestamp'].iat[0], end=end_ms)
+            intrabar = backtest.intrabar_arrays(chunk['timestamp'], sub_candles, end=pd.Timestamp(end_ms, unit='ms', tz='UTC'))
+        yield {'offset': offset, 'columns': columns, 'timestamps': chunk['timestamp'], 'sentiments': sentiments, 'intrabar': intrabar}
+        # The lookahead candle starts the next chunk; its indicators are already known
+        carried = {col: values[-1:] for col, values in computed.items()}
+
+def streaming_backtest(symbol: str,
+                       interval: str = '1h',
+                       start=None,
+                       end=None,
+                       chunk_size: int = 100_000,
+                       store: Optional[CandleStore] = None,
+                       exchange_filters: Optional[ExchangeFilters] = None,
+                       client=None,
+                       sentiment_csv_file: Optional[str] = None,
+                       sentiment_max_staleness: Optional[str] = None,
+                       progress_callback: Optional[Callable[[int, float], None]] = None,
+                       progress_checkpoints: int = 10,
+                       sub_interval: Optional[str] = None,
+                       **params):
+    """
+    Runs strategy_backtest's array engine over stored candles without loading the whole history:
+    candles are memory-mapped chunk_size at a time and indicators are carried across chunks, so
+    peak memory is bounded by the chunk size. Takes the strategy_backtest parameters as keywords
+    and returns the same (trade log, final balance, metrics), matching an in-memory run.
+    sub_interval (e.g. '1m') resolves fills inside each candle from the stored candles of that
+    interval, like strategy_backtest's sub_candles, reading them chunk by chunk as well.
+    """
+    store = store or CandleStore()
+    signature = inspect.signature(backtest.strategy_backtest).parameters
+    indicator_parameters = ('atr_period', 'use_bollinger_bands', 'bb_window', 'bb_window_dev')
+    unknown = set(params) - set(backtest.ARRAY_ENGINE_PARAMETERS) - set(indicator_parameters)
+    if unknown:
+        raise TypeError(f"Unsupported streaming_backtest parameters {sorted(unknown)}.")
+    params = {name: params.get(name, signature[name].default) for name in backtest.ARRAY_ENGINE_PARAMETERS + indicator_parameters}
+
+    if exchange_filters is None:
+        exchange_filters = get_exchange_filters(client, symbol)
+    sentiment_df = None
+    if sentiment_csv_file and os.path.exists(sentiment_csv_file):
+        sentiment_df = load_historical_sentiment(sentiment_csv_file)
+    else:
+        logging.warning(f"Historical sentiment data not found at {sentiment_csv_file}. Sentiment will be neutral in backtest.")
+
+    lo, hi = store.row_range(symbol, interval, start, end)
+    n = hi - lo
+    start_index = backtest.warmup_candles(params['atr_period'], params['use_bollinger_bands'], params['bb_window'])
+    checkpoints = backtest.checkpoint_indices(n, start_index, progress_checkpoints) if progress_callback is not None else {}
+    indicators = IndicatorSet(params['atr_period'], params['use_bollinger_bands'], params['bb_window'], params['bb_window_dev'])
+    chunks = array_engine_chunks(store, symbol, interval, start, end, chunk_size, indicators, sentiment_df, sentiment_max_staleness,
+                                 sub_interval)
+    return backtest._run_array_engine(
+        exchange_filters, chunks, n, exchange_filters.min_notional, start_index,
+        progress_callback=progress_callback,
+        checkpoints=checkpoints,
+        **{name: params[name] for name in backtest.ARRAY_ENGINE_PARAMETERS}
+    )
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Backtest stored candles chunk by chunk.")
+    parser.add_argument('--symbol', default=os.getenv("TRADE_SYMBOL", "BTCUSDT"))
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--sub-interval', default=None, help="Stored interval (e.g. 1m) that resolves SL/TP fills inside each candle.")
+    args = parser.parse_args()
+
+    exchange_filters = backtest.load_exchange_filters(None, args.symbol, "backtest/exchange_filters.json")
+    logging.getLogger().setLevel(logging.WARNING) # Per-trade logs would dominate the run time
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    trades, final_balance, metrics = streaming_backtest(
+        args.symbol, args.interval, args.start, args.end, chunk_size=args.chunk_size, sub_interval=args.sub_interval,
+        exchange_filters=exchange_filters, sentiment_csv_file="data_acquisition/historical_sentiment.csv")
+    elapsed = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    logging.getLogger().setLevel(logging.INFO)
+    logging.info(f"{len(trades)} trades, final balance {final_balance:.2f}, metrics {metrics}")
+    logging.info(f"Finished in {elapsed:.1f}s with {peak / 1e6:.0f} MB peak traced memory.")
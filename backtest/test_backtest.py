@@ -0,0 +1,134 @@
+import unittest
+import logging
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import backtest
+from indicator_store import IndicatorStore
+from bot.exchange_info import SymbolInfoCache
+
+class FakeClient:
+    """
+    Minimal stand-in for binance.client.Client that serves BTCUSDT-style symbol filters.
+    """
+    def __init__(self):
+        self.symbol_info_calls = 0
+
+    def get_symbol_info(self, symbol):
+        self.symbol_info_calls += 1
+        return {'symbol': symbol, 'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.01', 'maxPrice': '1000000.00', 'tickSize': '0.01'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00001', 'maxQty': '9000.00', 'stepSize': '0.00001'},
+            {'filterType': 'NOTIONAL', 'minNotional': '5.00'}
+        ]}
+
+def make_candles(n: int = 1500, seed: int = 0) -> pd.DataFrame:
+    """
+    Random-walk hourly candles that alternate between calm and volatile regimes,
+    so both the grid and breakout branches of the backtest get exercised.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, n) * (1 + 2 * (np.sin(np.arange(n) / 200) > 0.5))
+    close = 30000 * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2022-01-01', periods=n, freq='1h', tz='UTC'),
+        'open': open_, 'high': high, 'low': low, 'close': close,
+        'volume': rng.uniform(1, 10, n)
+    })
+
+class TestBacktestEngines(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        SymbolInfoCache().clear()
+        self.df = make_candles()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def assert_engines_match(self, **params):
+        client = FakeClient()
+        trades_pd, balance_pd, metrics_pd = backtest.strategy_backtest(client, self.df.copy(), engine='pandas', **params)
+        trades_np, balance_np, metrics_np = backtest.strategy_backtest(client, self.df.copy(), engine='array', **params)
+        self.assertGreater(len(trades_pd), 0)
+        pd.testing.assert_frame_equal(trades_pd, trades_np)
+        self.assertEqual(balance_pd, balance_np)
+        self.assertEqual(metrics_pd, metrics_np)
+
+    def test_array_engine_matches_pandas_engine(self):
+        self.assert_engines_match(max_drawdown_percent=90.0, risk_per_trade_percent=50.0,
+                                  base_rsi_oversold=45, sentiment_threshold_positive=-1)
+
+    def test_array_engine_matches_with_latency_and_bollinger_bands(self):
+        self.assert_engines_match(max_drawdown_percent=90.0, latency_seconds=60, use_bollinger_bands=True,
+                                  base_rsi_oversold=45, sentiment_threshold_positive=-1)
+
+    def test_array_engine_matches_on_early_stops(self):
+        self.assert_engines_match(max_trades=5, base_rsi_oversold=45, sentiment_threshold_positive=-1)
+        self.assert_engines_match(max_drawdown_percent=10.0, risk_per_trade_percent=50.0,
+                                  base_rsi_oversold=45, sentiment_threshold_positive=-1)
+
+    def test_symbol_info_is_fetched_once_per_process(self):
+        client = FakeClient()
+        for _ in range(2):
+            backtest.strategy_backtest(client, self.df.copy(), max_drawdown_percent=90.0,
+                                       base_rsi_oversold=45, sentiment_threshold_positive=-1)
+        self.assertEqual(client.symbol_info_calls, 1)
+
+    def test_filter_snapshot_runs_without_client(self):
+        client = FakeClient()
+        params = dict(max_drawdown_percent=90.0, base_rsi_oversold=45, sentiment_threshold_positive=-1)
+        trades_live, balance_live, _ = backtest.strategy_backtest(client, self.df.copy(), **params)
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_file = os.path.join(tmp, 'exchange_filters.json')
+            with open(snapshot_file, 'w') as f:
+                json.dump({'BTCUSDT': client.get_symbol_info('BTCUSDT')}, f)
+            filters = backtest.load_exchange_filters(None, 'BTCUSDT', snapshot_file)
+        trades_offline, balance_offline, _ = backtest.strategy_backtest(None, self.df.copy(), exchange_filters=filters, **params)
+        pd.testing.assert_frame_equal(trades_live, trades_offline)
+        self.assertEqual(balance_live, balance_offline)
+
+    def test_indicator_store_matches_apply_indicators(self):
+        client = FakeClient()
+        store = IndicatorStore(self.df)
+        original = self.df.copy()
+        for engine in ('array', 'pandas'):
+            for use_bollinger_bands in (False, True):
+                params = dict(max_drawdown_percent=90.0, atr_period=12, use_bollinger_bands=use_bollinger_bands,
+                              base_rsi_oversold=45, sentiment_threshold_positive=-1, engine=engine)
+                trades_direct, balance_direct, _ = backtest.strategy_backtest(client, self.df.copy(), **params)
+                trades_store, balance_store, _ = backtest.strategy_backtest(client, self.df, indicator_store=store, **params)
+                pd.testing.assert_frame_equal(trades_direct, trades_store)
+                self.assertEqual(balance_direct, balance_store)
+        pd.testing.assert_frame_equal(self.df, original)
+        self.assertGreater(store.get_stats()['hits'], 0)
+
+    def test_progress_callback_reports_same_equity_for_both_engines(self):
+        client = FakeClient()
+        params = dict(max_drawdown_percent=90.0, risk_per_trade_percent=50.0, base_rsi_oversold=45, sentiment_threshold_positive=-1)
+        reports = {}
+        for engine in ('array', 'pandas'):
+            reports[engine] = []
+            _, balance, _ = backtest.strategy_backtest(client, self.df.copy(), engine=engine, progress_checkpoints=5,
+                                                       progress_callback=lambda step, equity: reports[engine].append((step, equity)), **params)
+        self.assertEqual(reports['array'], reports['pandas'])
+        self.assertEqual([step for step, _ in reports['array']], [1, 2, 3, 4])
+
+    def test_progress_callback_can_abort_backtest(self):
+        class Abort(Exception):
+            pass
+        def abort(step, equity):
+            raise Abort()
+        with self.assertRaises(Abort):
+            backtest.strategy_backtest(FakeClient(), self.df, progress_callback=abort)
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            backtest.strategy_backtest(FakeClient(), self.df, engine='gpu')
+
+if __name__ == '__main__':
+    unittest.main()
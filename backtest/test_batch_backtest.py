@@ -0,0 +1,62 @@
+import unittest
+import logging
+import itertools
+import numpy as np
+import backtest
+from batch_backtest import batch_strategy_backtest
+from indicator_store import IndicatorStore
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+from bot.strategy import buy_signals, generate_signal
+
+class TestBatchBacktest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.df = make_candles()
+        self.df['sentiment'] = 0.05
+        self.store = IndicatorStore(self.df)
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def assert_batch_matches_scalar(self, param_sets, **kwargs):
+        results = batch_strategy_backtest(self.df, param_sets, self.filters, indicator_store=self.store, **kwargs)
+        self.assertEqual(len(results), len(param_sets))
+        for row, params in zip(results.itertuples(), param_sets):
+            trades, final_balance, metrics = backtest.strategy_backtest(None, self.df, exchange_filters=self.filters,
+                                                                       indicator_store=self.store, **kwargs, **params)
+            self.assertEqual(row.final_balance, final_balance, params)
+            self.assertEqual({name: getattr(row, name) for name in metrics}, metrics, params)
+
+    def test_batch_matches_scalar_engine(self):
+        grid = itertools.product([10, 16], [0.005, 0.02], [3, 5], [0.5, 1.5], [30, 50], [False, True])
+        param_sets = [dict(atr_period=atr_period, atr_trend_threshold=threshold, grid_levels=levels, grid_step_percent=step,
+                           base_rsi_oversold=oversold, use_bollinger_bands=use_bb, bb_window=18, sentiment_threshold_positive=0.0,
+                           risk_per_trade_percent=40.0, max_drawdown_percent=60.0)
+                      for atr_period, threshold, levels, step, oversold, use_bb in grid]
+        self.assert_batch_matches_scalar(param_sets)
+
+    def test_batch_matches_scalar_on_stops_and_latency(self):
+        param_sets = [dict(max_trades=3, base_rsi_oversold=45, sentiment_threshold_positive=-1),
+                      dict(max_drawdown_percent=5.0, risk_per_trade_percent=80.0, base_rsi_oversold=45, sentiment_threshold_positive=-1),
+                      dict(latency_seconds=60, volume_factor=1e-3, base_rsi_oversold=45, sentiment_threshold_positive=-1),
+                      dict(sentiment_sizing_multiplier=1.0, fixed_trade_amount_usdt=50.0)]
+        self.assert_batch_matches_scalar(param_sets)
+        self.assert_batch_matches_scalar(param_sets, trade_mode='FIXED')
+
+    def test_vectorized_buy_rule_matches_generate_signal(self):
+        rng = np.random.default_rng(0)
+        rsi, macd, macd_signal, sentiment, close, bbl = rng.uniform(0, 100, 6), rng.normal(0, 1, 6), rng.normal(0, 1, 6), 0.2, 100.0, rng.uniform(95, 105, 6)
+        oversold, use_bb = np.array([30.0, 60, 60, 45, 80, 60]), np.array([False, False, True, True, False, True])
+        expected = [generate_signal(rsi[j], macd[j], macd_signal[j], sentiment, 0.1, -0.1, oversold[j], 70, use_bb[j], bbl[j], None, close) == 'buy'
+                    for j in range(6)]
+        self.assertTrue(any(expected) and not all(expected))
+        np.testing.assert_array_equal(buy_signals(rsi, macd, macd_signal, sentiment, 0.1, oversold, use_bb, bbl, close), expected)
+
+    def test_unknown_parameter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            batch_strategy_backtest(self.df, [{'symbol': 'ETHUSDT'}], self.filters, indicator_store=self.store)
+
+if __name__ == '__main__':
+    unittest.main()
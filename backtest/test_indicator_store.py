@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from indicator_store import IndicatorStore
+from bot.strategy import apply_indicators
+from test_backtest import make_candles
+
+class TestIndicatorStore(unittest.TestCase):
+    def setUp(self):
+        self.df = make_candles(500)
+
+    def test_columns_match_apply_indicators(self):
+        store = IndicatorStore(self.df)
+        expected = apply_indicators(self.df, atr_period=17, use_bollinger_bands=True, bb_window=22, bb_window_dev=1.5)
+        columns = store.indicator_columns(atr_period=17, use_bollinger_bands=True, bb_window=22, bb_window_dev=1.5)
+        for name, values in columns.items():
+            np.testing.assert_array_equal(values, expected[name].to_numpy())
+        self.assertNotIn('ATR', self.df.columns)
+
+    def test_repeated_requests_are_cache_hits(self):
+        store = IndicatorStore(self.df)
+        first = store.atr(14)
+        second = store.atr(14)
+        self.assertIs(first, second)
+        self.assertEqual(store.get_stats()['misses'], 1)
+        self.assertEqual(store.get_stats()['hits'], 1)
+
+    def test_columns_are_read_only(self):
+        store = IndicatorStore(self.df)
+        with self.assertRaises(ValueError):
+            store.atr(14)[0] = 1.0
+
+    def test_size_bound_evicts_least_recently_used(self):
+        column_bytes = len(self.df) * 8
+        store = IndicatorStore(self.df, max_bytes=2 * column_bytes)
+        store.atr(10)
+        store.atr(11)
+        store.atr(10)
+        store.atr(12)
+        self.assertEqual(store.get_stats()['columns'], 2)
+        misses = store.get_stats()['misses']
+        store.atr(10)
+        self.assertEqual(store.get_stats()['misses'], misses)
+        store.atr(11)
+        self.assertEqual(store.get_stats()['misses'], misses + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+import backtest
+from streaming_backtest import streaming_backtest
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+from bot.strategy import apply_indicators
+from data_acquisition.candle_store import CandleStore
+from data_acquisition.resampler import resample_ohlcv
+
+def make_sub_candles(hours: int = 1500, seed: int = 0) -> pd.DataFrame:
+    """1m candles whose hourly aggregation behaves like make_candles."""
+    minutes = make_candles(hours * 60, seed)
+    returns = np.diff(np.log(minutes['close'].to_numpy()), prepend=np.log(30000)) / np.sqrt(60)
+    close = 30000 * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(np.random.default_rng(seed + 1).normal(0, 0.0015, len(close)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2022-01-01', periods=len(close), freq='1min', tz='UTC'),
+        'open': open_, 'high': np.maximum(open_, close) * (1 + spread), 'low': np.minimum(open_, close) * (1 - spread),
+        'close': close, 'volume': minutes['volume'].to_numpy() / 60
+    })
+
+def hourly(sub_candles: pd.DataFrame) -> pd.DataFrame:
+    epoch_ms = sub_candles['timestamp'].dt.tz_localize(None).to_numpy(dtype='datetime64[ms]').view(np.int64)
+    columns = resample_ohlcv(epoch_ms, *(sub_candles[col].to_numpy() for col in ('open', 'high', 'low', 'close', 'volume')), '1h')
+    df = pd.DataFrame(columns)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+    return df
+
+class TestIntrabarHelpers(unittest.TestCase):
+    def test_first_exit_resolves_order_and_ties(self):
+        lows = np.array([99.0, 97.0, 94.0, 96.0])
+        highs = np.array([101.0, 106.0, 99.0, 110.0])
+        self.assertEqual(backtest._first_intrabar_exit(lows, highs, 95.0, 105.0), ('tp', 1))
+        self.assertEqual(backtest._first_intrabar_exit(lows, highs, 95.0, 108.0), ('sl', 2))
+        self.assertEqual(backtest._first_intrabar_exit(lows, highs, 97.0, 106.0), ('sl', 1)) # Same sub-candle: stop wins
+        self.assertEqual(backtest._first_intrabar_exit(lows, highs, 97.0, 120.0, strict_stop=True), ('sl', 2))
+        self.assertIsNone(backtest._first_intrabar_exit(lows, highs, 90.0, 120.0))
+        self.assertIsNone(backtest._first_intrabar_exit(lows, highs, None, None))
+
+    def test_offsets_split_sub_candles_by_parent(self):
+        parents = pd.Series(pd.date_range('2024-01-01', periods=3, freq='1h', tz='UTC'))
+        subs = pd.Series(pd.date_range('2023-12-31 23:58', periods=200, freq='1min', tz='UTC')).drop(index=range(70, 80))
+        offsets = backtest.intrabar_offsets(parents, subs)
+        self.assertEqual(offsets.tolist(), [2, 62, 112, 172])
+
+class TestIntrabarBacktest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.sub_candles = make_sub_candles()
+        self.df = hourly(self.sub_candles)
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+        self.params = dict(max_drawdown_percent=90.0, base_rsi_oversold=45, sentiment_threshold_positive=-1,
+                           atr_trend_threshold=0.004, exchange_filters=self.filters)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_exits_fill_on_the_sub_candle_that_reaches_them(self):
+        # Without slippage the levels follow from the entry open and the signal candle's ATR
+        params = dict(self.params, base_slippage_pct=0.0, volume_factor=0.0)
+        trades, _, _ = backtest.strategy_backtest(None, self.df, sub_candles=self.sub_candles, **params)
+        atrs = apply_indicators(self.df).set_index('timestamp')['ATR']
+        sub = self.sub_candles.set_index('timestamp')
+        entries = trades.index[trades['type'] == 'buy(breakout)']
+        self.assertGreater(len(entries), 0)
+        self.assertTrue((trades['timestamp'].dt.minute != 0).any()) # Minute precision, not candle open times
+        checked = set()
+        for entry in entries:
+            buy, exit_trade = trades.loc[entry], trades.loc[entry + 1] if entry + 1 in trades.index else None
+            if exit_trade is None or exit_trade['type'] == 'final_sell':
+                continue
+            sl = buy['price'] - 2 * atrs[buy['timestamp']]
+            tp = buy['price'] + 2.5 * (buy['price'] - sl)
+            # The first minute after the entry candle that reaches a level, the stop winning ties
+            after = sub[sub.index >= buy['timestamp'] + pd.Timedelta('1h')]
+            hit = after[(after['low'] <= sl) | (after['high'] >= tp)].iloc[0]
+            expected_type = 'sell(breakout_sl)' if hit['low'] <= sl else 'sell(breakout_tp)'
+            self.assertEqual(exit_trade['timestamp'], hit.name)
+            self.assertEqual(exit_trade['type'], expected_type)
+            self.assertAlmostEqual(exit_trade['price'], sl if expected_type == 'sell(breakout_sl)' else tp)
+            checked.add(expected_type)
+        self.assertEqual(checked, {'sell(breakout_sl)', 'sell(breakout_tp)'})
+
+    def test_single_sub_candle_per_candle_resolves_to_stop(self):
+        # With only the hourly candles as sub-candles, a candle spanning both levels exits at the stop
+        bar_trades, _, _ = backtest.strategy_backtest(None, self.df, sub_candles=self.df[['timestamp', 'high', 'low']], **self.params)
+        minute_trades, _, _ = backtest.strategy_backtest(None, self.df, sub_candles=self.sub_candles, **self.params)
+        self.assertFalse(bar_trades.equals(minute_trades))
+        self.assertTrue((bar_trades['timestamp'].dt.minute == 0).all())
+
+    def test_missing_sub_candles_fall_back_to_the_candle(self):
+        gappy = self.sub_candles.drop(index=range(6000, 12000)).reset_index(drop=True)
+        trades, balance, _ = backtest.strategy_backtest(None, self.df, sub_candles=gappy, **self.params)
+        self.assertGreater(len(trades), 0)
+        self.assertGreater(balance, 0)
+
+    def test_streamed_sub_candles_match_the_in_memory_run(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = CandleStore(root)
+            store.write('BTCUSDT', '1h', self.df)
+            store.write('BTCUSDT', '1m', self.sub_candles)
+            expected = backtest.strategy_backtest(None, store.load('BTCUSDT', '1h'), sub_candles=store.load('BTCUSDT', '1m'), **self.params)
+            params = {name: value for name, value in self.params.items() if name != 'exchange_filters'}
+            for chunk_size in (97, 5000):
+                streamed = streaming_backtest('BTCUSDT', '1h', chunk_size=chunk_size, store=store, exchange_filters=self.filters,
+                                              sub_interval='1m', **params)
+                pd.testing.assert_frame_equal(streamed[0], expected[0])
+                self.assertEqual(streamed[1:], expected[1:])
+
+    def test_sub_candles_outside_the_range_are_ignored(self):
+        df = self.df.iloc[200:900].reset_index(drop=True)
+        expected = backtest.strategy_backtest(None, df, sub_candles=self.sub_candles.iloc[200 * 60:900 * 60], **self.params)
+        trades = backtest.strategy_backtest(None, df, sub_candles=self.sub_candles, **self.params)
+        pd.testing.assert_frame_equal(trades[0], expected[0])
+
+    def test_pandas_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            backtest.strategy_backtest(None, self.df, engine='pandas', sub_candles=self.sub_candles, **self.params)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import unittest
+import logging
+import tempfile
+import optuna
+from optimize_params import optimize_parallel
+from indicator_store import IndicatorStore
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+
+class TestOptimizeParallel(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.df = make_candles(600)
+        self.df['sentiment'] = 0.0
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_each_run_uses_and_removes_its_own_journal(self):
+        for _ in range(2):
+            study = optimize_parallel(self.df, IndicatorStore(self.df), self.filters, None, 4, 2, self.tmp.name, pruner='none')
+            self.assertEqual(len(study.trials), 4) # Only this run's trials, kept after the journal is gone
+            self.assertIsNotNone(study.best_trial)
+            self.assertEqual(os.listdir(self.tmp.name), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import logging
+import os
+import tempfile
+from unittest import mock
+import pandas as pd
+import backtest
+from indicator_store import IndicatorStore
+from result_cache import BacktestResultCache, candle_fingerprint
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+
+class TestBacktestResultCache(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = BacktestResultCache(os.path.join(self.tmp.name, 'cache'))
+        self.df = make_candles()
+        self.df['sentiment'] = 0.0
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+        self.params = dict(max_drawdown_percent=90.0, base_rsi_oversold=45, sentiment_threshold_positive=-1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def run_backtest(self, df=None, **params):
+        return backtest.strategy_backtest(None, self.df if df is None else df, exchange_filters=self.filters,
+                                          result_cache=self.cache, **{**self.params, **params})
+
+    def test_repeated_run_is_served_from_cache(self):
+        trades, balance, metrics = self.run_backtest()
+        cached_trades, cached_balance, cached_metrics = self.run_backtest()
+        pd.testing.assert_frame_equal(trades, cached_trades)
+        self.assertEqual((balance, metrics), (cached_balance, cached_metrics))
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        # An equivalent parameter spelling hits the same entry
+        self.run_backtest(grid_levels=4.0, bb_window=30)
+        self.assertEqual(self.cache.get_stats()['hits'], 2)
+        self.assertEqual(self.cache.get_stats()['entries'], 1)
+        # Runs on an indicator store are keyed by its columns too, and repeat like any other run
+        store = IndicatorStore(self.df)
+        self.run_backtest(indicator_store=store)
+        self.run_backtest(indicator_store=IndicatorStore(self.df))
+        self.assertEqual(self.cache.get_stats()['hits'], 3)
+
+    def test_window_warm_up_is_part_of_the_key(self):
+        full = IndicatorStore(self.df)
+        full.indicator_columns() # Cached columns carry the full history's warm-up into the window
+        window = full.window(300, len(self.df))
+        fresh = IndicatorStore(self.df.iloc[300:].reset_index(drop=True))
+        self.assertEqual(window.fingerprint(), fresh.fingerprint())
+        self.assertNotEqual(window.indicator_fingerprint(), fresh.indicator_fingerprint())
+        # Hashed once per setting; Bollinger settings only count when the bands are on
+        with mock.patch('indicator_store.array_digest', side_effect=AssertionError("re-hashed")):
+            self.assertEqual(window.indicator_fingerprint(bb_window=30), window.indicator_fingerprint())
+        df = self.df.iloc[300:].reset_index(drop=True)
+        windowed = self.run_backtest(df=df, indicator_store=window)
+        recomputed = self.run_backtest(df=df, indicator_store=fresh)
+        self.assertEqual(self.cache.get_stats()['misses'], 2)
+        self.assertEqual(windowed[1:], backtest.strategy_backtest(None, df, exchange_filters=self.filters, indicator_store=window, **self.params)[1:])
+        self.assertEqual(recomputed[1:], backtest.strategy_backtest(None, df, exchange_filters=self.filters, indicator_store=fresh, **self.params)[1:])
+
+    def test_changed_inputs_miss(self):
+        self.run_backtest()
+        self.run_backtest(grid_levels=5)
+        self.run_backtest(df=self.df.assign(sentiment=0.1))
+        shifted = self.df.copy()
+        shifted.loc[500, 'close'] *= 1.01
+        self.run_backtest(df=shifted)
+        self.assertEqual(self.cache.get_stats()['misses'], 4)
+        self.assertEqual(IndicatorStore(self.df).fingerprint(), candle_fingerprint(self.df))
+
+    def test_size_bound_evicts_least_recently_used(self):
+        for grid_levels in (3, 4, 5):
+            self.run_backtest(grid_levels=grid_levels)
+        self.run_backtest(grid_levels=3) # Touch the first entry so the grid_levels=4 entry is the oldest
+        self.cache.max_bytes = self.cache.get_stats()['bytes'] - 1
+        self.run_backtest(grid_levels=6)
+        stats = self.cache.get_stats()
+        self.assertLessEqual(stats['bytes'], self.cache.max_bytes)
+        hits = stats['hits']
+        self.run_backtest(grid_levels=3)
+        self.assertEqual(self.cache.get_stats()['hits'], hits + 1)
+        self.run_backtest(grid_levels=4)
+        self.assertEqual(self.cache.get_stats()['hits'], hits + 1)
+
+if __name__ == '__main__':
+    unittest.main()
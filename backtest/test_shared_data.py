@@ -0,0 +1,49 @@
+import unittest
+import logging
+import pandas as pd
+import backtest
+from indicator_store import IndicatorStore
+from shared_data import SharedCandleData
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+
+class TestSharedCandleData(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.df = make_candles()
+        self.df['sentiment'] = 0.1
+        self.store = IndicatorStore(self.df)
+        self.store.indicator_columns(atr_period=12, use_bollinger_bands=True, bb_window=18, bb_window_dev=1.5)
+        self.shared = SharedCandleData.create(self.df, self.store)
+
+    def tearDown(self):
+        self.shared.close()
+        self.shared.unlink()
+        logging.disable(logging.NOTSET)
+
+    def run_attached(self, params, filters):
+        attached = SharedCandleData.attach(self.shared.spec)
+        try:
+            df = attached.frame()
+            store = attached.indicator_store(df)
+            pd.testing.assert_frame_equal(df, self.df, check_freq=False)
+            result = backtest.strategy_backtest(None, df, exchange_filters=filters, indicator_store=store, **params)
+            return result, store.get_stats()
+        finally:
+            del df, store
+            attached.close()
+
+    def test_attached_data_reproduces_backtest(self):
+        filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+        params = dict(max_drawdown_percent=90.0, atr_period=12, use_bollinger_bands=True, bb_window=18, bb_window_dev=1.5,
+                      base_rsi_oversold=45, sentiment_threshold_positive=-1)
+        expected_trades, expected_balance, _ = backtest.strategy_backtest(None, self.df, exchange_filters=filters,
+                                                                          indicator_store=self.store, **params)
+        (trades, balance, _), stats = self.run_attached(params, filters)
+        pd.testing.assert_frame_equal(trades, expected_trades)
+        self.assertEqual(balance, expected_balance)
+        # Every indicator column came from shared memory rather than being recomputed
+        self.assertEqual(stats['misses'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import logging
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+import backtest
+from streaming_backtest import streaming_backtest
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+from bot.indicators import IndicatorSet
+from bot.strategy import apply_indicators
+from data_acquisition.candle_store import CandleStore
+
+class TestStreamingBacktest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp.name)
+        self.store.write('BTCUSDT', '1h', make_candles(3000))
+        self.df = self.store.load('BTCUSDT', '1h')
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+        self.params = dict(max_drawdown_percent=90.0, base_rsi_oversold=45, sentiment_threshold_positive=-1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def assert_matches_in_memory(self, chunk_size, start=None, end=None, **params):
+        params = {**self.params, **params}
+        df = self.store.load('BTCUSDT', '1h', start=start, end=end)
+        expected = backtest.strategy_backtest(None, df, exchange_filters=self.filters, **params)
+        streamed = streaming_backtest('BTCUSDT', '1h', start, end, chunk_size=chunk_size, store=self.store,
+                                      exchange_filters=self.filters, **params)
+        self.assertGreater(len(expected[0]), 0)
+        pd.testing.assert_frame_equal(streamed[0], expected[0])
+        self.assertEqual(streamed[1:], expected[1:])
+
+    def test_indicators_carry_across_chunks(self):
+        params = dict(atr_period=21, use_bollinger_bands=True, bb_window=30, bb_window_dev=2.5)
+        expected = apply_indicators(self.df, **params)
+        indicators = IndicatorSet(**params)
+        chunks = [indicators.update_chunk(*(self.df[col].to_numpy()[lo:lo + 700] for col in ('high', 'low', 'close')))
+                  for lo in range(0, len(self.df), 700)]
+        # Rolling windows agree to rounding (pandas keeps a running sum over the whole series); EMA state is carried exactly
+        for col in ('RSI', 'ATR', 'macd', 'macd_signal', 'bb_bbl', 'bb_bbm', 'bb_bbh'):
+            streamed = np.concatenate([chunk[col] for chunk in chunks])
+            np.testing.assert_allclose(streamed, expected[col].to_numpy(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_array_equal(np.concatenate([chunk['macd_signal'] for chunk in chunks]), expected['macd_signal'].to_numpy())
+        # The per-candle state left behind continues like the live stream would
+        tail = self.df.iloc[-1]
+        live = indicators.peek(tail['high'] + 1, tail['low'], tail['close'] + 1)
+        extended = apply_indicators(pd.concat([self.df, pd.DataFrame({'high': [tail['high'] + 1], 'low': [tail['low']], 'close': [tail['close'] + 1]})],
+                                              ignore_index=True), **params).iloc[-1]
+        for col, value in live.items():
+            np.testing.assert_allclose(value, extended[col], rtol=1e-9)
+
+    def test_matches_in_memory_run(self):
+        self.assert_matches_in_memory(chunk_size=250)
+        self.assert_matches_in_memory(chunk_size=10_000)
+
+    def test_matches_when_one_candle_is_left_for_the_last_chunk(self):
+        # n % chunk_size == 1: the lookahead of the second-to-last chunk is the final candle
+        self.assert_matches_in_memory(chunk_size=2999)
+        self.assert_matches_in_memory(chunk_size=199, end=self.df['timestamp'].iat[200], atr_trend_threshold=1.0)
+        reports = []
+        streaming_backtest('BTCUSDT', '1h', chunk_size=2999, store=self.store, exchange_filters=self.filters, progress_checkpoints=len(self.df),
+                           progress_callback=lambda step, equity: reports.append(step), **self.params)
+        self.assertEqual(len(reports), len(set(reports)))
+
+    def test_matches_with_latency_bollinger_bands_and_range(self):
+        self.assert_matches_in_memory(chunk_size=333, latency_seconds=5, use_bollinger_bands=True, bb_window=25,
+                                      start='2022-01-10', end='2022-04-01')
+
+    def test_matches_on_early_stop_and_progress(self):
+        reports = {'memory': [], 'stream': []}
+        params = dict(self.params, max_trades=7)
+        expected = backtest.strategy_backtest(None, self.df, exchange_filters=self.filters, progress_checkpoints=4,
+                                              progress_callback=lambda step, equity: reports['memory'].append((step, equity)), **params)
+        streamed = streaming_backtest('BTCUSDT', '1h', chunk_size=100, store=self.store, exchange_filters=self.filters, progress_checkpoints=4,
+                                      progress_callback=lambda step, equity: reports['stream'].append((step, equity)), **params)
+        pd.testing.assert_frame_equal(streamed[0], expected[0])
+        self.assertEqual(reports['stream'], reports['memory'])
+
+    def test_peak_memory_is_bounded_by_chunk_size(self):
+        self.store.write('BTCUSDT', '1m', make_candles(20_000))
+        peaks = {}
+        for chunk_size in (1_000, 20_000):
+            tracemalloc.start()
+            streaming_backtest('BTCUSDT', '1m', chunk_size=chunk_size, store=self.store, exchange_filters=self.filters, **self.params)
+            peaks[chunk_size] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.assertLess(peaks[1_000] * 5, peaks[20_000])
+
+if __name__ == '__main__':
+    unittest.main()
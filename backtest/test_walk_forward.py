@@ -0,0 +1,45 @@
+import unittest
+import logging
+import numpy as np
+import optuna
+from indicator_store import IndicatorStore
+from walk_forward import walk_forward, walk_forward_windows
+from test_backtest import FakeClient, make_candles
+from bot.exchange_info import ExchangeFilters
+
+class TestWalkForward(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.df = make_candles(2000)
+        self.df['sentiment'] = 0.0
+        self.filters = ExchangeFilters.from_symbol_info(FakeClient().get_symbol_info('BTCUSDT'))
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_windows_roll_without_overlapping_tests(self):
+        windows = walk_forward_windows(100, 40, 20)
+        self.assertEqual(windows, [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)])
+        self.assertEqual(walk_forward_windows(50, 40, 20), [])
+
+    def test_window_store_slices_full_history(self):
+        store = IndicatorStore(self.df)
+        full_atr = store.atr(12)
+        window = store.window(500, 900)
+        self.assertEqual(len(window), 400)
+        np.testing.assert_array_equal(window.atr(12), full_atr[500:900])
+        np.testing.assert_array_equal(window.price('close'), self.df['close'].to_numpy()[500:900])
+        self.assertEqual(window.get_stats()['misses'], 0)
+
+    def test_out_of_sample_folds_are_chained(self):
+        folds, trades = walk_forward(self.df, self.filters, train_size=800, test_size=400, n_trials=3)
+        self.assertEqual(list(folds['fold']), [0, 1, 2])
+        np.testing.assert_array_equal(folds['out_of_sample_start_balance'].iloc[1:], folds['out_of_sample_end_balance'].iloc[:-1])
+        self.assertTrue((folds['optimize_seconds'] > 0).all())
+        if not trades.empty:
+            # Out-of-sample trades never start before the first test window
+            self.assertGreaterEqual(trades['timestamp'].min(), folds['test_start'].iloc[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import optuna
+import pandas as pd
+
+import backtest
+import optimize_params
+from indicator_store import IndicatorStore
+from shared_data import SharedCandleData
+from bot.exchange_info import ExchangeFilters
+from binance.client import Client
+
+# Settings the optimizer holds fixed; out-of-sample windows are backtested with the same ones
+BACKTEST_SETTINGS = dict(fee_rate=0.001, base_slippage_pct=0.0005, trade_mode='PERCENTAGE', fixed_trade_amount_usdt=5.0)
+
+def walk_forward_windows(n: int, train_size: int, test_size: int, step: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Rolling (train_start, train_end, test_start, test_end) candle ranges, end-exclusive.
+    Each test window directly follows its train window; windows advance by step (default test_size),
+    so consecutive test windows tile the history without overlap.
+    """
+    step = step or test_size
+    windows = []
+    train_start = 0
+    while train_start + train_size + test_size <= n:
+        train_end = train_start + train_size
+        windows.append((train_start, train_end, train_end, train_end + test_size))
+        train_start += step
+    return windows
+
+def _optimize_fold(df, indicator_store, fold, train_start, train_end, n_trials, exchange_filters, pruner, seed):
+    start_time = time.perf_counter()
+    train_df = df.iloc[train_start:train_end].reset_index(drop=True)
+    train_store = indicator_store.window(train_start, train_end)
+    study = optuna.create_study(direction='maximize', pruner=optimize_params.create_pruner(pruner),
+                                sampler=optuna.samplers.TPESampler(seed=seed))
+    study.optimize(lambda trial: optimize_params.objective(trial, train_df, None, None, exchange_filters, train_store), n_trials=n_trials)
+    return {
+        'fold': fold,
+        'best_params': study.best_trial.params,
+        'in_sample_balance': study.best_value,
+        'pruned_trials': len(study.get_trials(states=(optuna.trial.TrialState.PRUNED,))),
+        'optimize_seconds': time.perf_counter() - start_time
+    }
+
+def optimize_fold_worker(spec, fold, train_start, train_end, n_trials, exchange_filters, pruner, seed):
+    """Optimizes one train window in a worker process attached to the shared candle data."""
+    # Per-trade logging from hundreds of trials would drown the fold reports
+    logging.getLogger().setLevel(logging.WARNING)
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    shared = SharedCandleData.attach(spec)
+    try:
+        df = shared.frame()
+        indicator_store = shared.indicator_store(df)
+        result = _optimize_fold(df, indicator_store, fold, train_start, train_end, n_trials, exchange_filters, pruner, seed)
+        del df, indicator_store # Release the views before the block is closed
+        return result
+    finally:
+        shared.close()
+
+def walk_forward(df: pd.DataFrame,
+                 exchange_filters: ExchangeFilters,
+                 train_size: int,
+                 test_size: int,
+                 step: Optional[int] = None,
+                 n_trials: int = 50,
+                 n_workers: int = 1,
+                 pruner: str = 'median',
+                 starting_balance: float = 10000,
+                 indicator_store: Optional[IndicatorStore] = None,
+                 seed: int = 42):
+    """
+    Walk-forward optimization: every train window is tuned with Optuna (in parallel processes
+    when n_workers > 1), and its best parameters are then backtested on the following test window.
+    Test windows are chained, each starting from the previous window's final balance, into one
+    out-of-sample run. df must already carry a 'sentiment' column (see backtest.attach_sentiment).
+
+    Returns (folds, trades): a per-fold summary with runtimes, and the stitched out-of-sample trade log.
+    """
+    windows = walk_forward_windows(len(df), train_size, test_size, step)
+    if not windows:
+        raise ValueError(f"{len(df)} candles are too few for a {train_size}-candle train and {test_size}-candle test window.")
+    if indicator_store is None:
+        indicator_store = IndicatorStore(df)
+    # Indicators are computed once over the full history; every window slices the same arrays
+    optimize_params.precompute_indicators(indicator_store)
+    logging.info(f"Walk-forward over {len(windows)} folds ({train_size} train / {test_size} test candles, {n_trials} trials each).")
+
+    if n_workers > 1:
+        shared = SharedCandleData.create(df, indicator_store)
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(optimize_fold_worker, shared.spec, fold, train_start, train_end, n_trials,
+                                           exchange_filters, pruner, seed + fold)
+                           for fold, (train_start, train_end, _, _) in enumerate(windows)]
+                results = [future.result() for future in futures]
+        finally:
+            shared.close()
+            shared.unlink()
+    else:
+        results = [_optimize_fold(df, indicator_store, fold, train_start, train_end, n_trials, exchange_filters, pruner, seed + fold)
+                   for fold, (train_start, train_end, _, _) in enumerate(windows)]
+
+    folds = []
+    fold_trades = []
+    balance = starting_balance
+    for result, (train_start, train_end, test_start, test_end) in zip(results, windows):
+        fold = result['fold']
+        if balance <= 0:
+            logging.warning(f"Out-of-sample balance exhausted before fold {fold}; skipping the remaining folds.")
+            break
+        best_params = result['best_params']
+        # Start the test slice early by the warm-up the loop skips, so trading begins exactly at test_start
+        warmup = backtest.warmup_candles(best_params['atr_period'], best_params['use_bollinger_bands'], best_params.get('bb_window', 20))
+        window_start = max(test_start - warmup, 0)
+        start_time = time.perf_counter()
+        trades, final_balance, metrics = backtest.strategy_backtest(
+            None,
+            df.iloc[window_start:test_end].reset_index(drop=True),
+            starting_balance=balance,
+            exchange_filters=exchange_filters,
+            indicator_store=indicator_store.window(window_start, test_end),
+            **BACKTEST_SETTINGS,
+            **best_params
+        )
+        test_seconds = time.perf_counter() - start_time
+        fold_trades.append(trades.assign(fold=fold))
+        folds.append({
+            'fold': fold,
+            'train_start': df['timestamp'].iat[train_start],
+            'train_end': df['timestamp'].iat[train_end - 1],
+            'test_start': df['timestamp'].iat[test_start],
+            'test_end': df['timestamp'].iat[test_end - 1],
+            'in_sample_return_pct': (result['in_sample_balance'] / 10000 - 1) * 100, # objective starts every trial at 10000
+            'out_of_sample_start_balance': balance,
+            'out_of_sample_end_balance': final_balance,
+            'out_of_sample_return_pct': (final_balance / balance - 1) * 100,
+            'out_of_sample_max_drawdown': metrics['max_drawdown'],
+            'pruned_trials': result['pruned_trials'],
+            'optimize_seconds': result['optimize_seconds'],
+            'test_seconds': test_seconds,
+            'best_params': best_params
+        })
+        logging.info(f"Fold {fold}: in-sample {folds[-1]['in_sample_return_pct']:.2f}%, out-of-sample {folds[-1]['out_of_sample_return_pct']:.2f}% "
+                     f"(optimized in {result['optimize_seconds']:.1f}s, tested in {test_seconds:.2f}s)")
+        balance = final_balance
+
+    trades = pd.concat(fold_trades, ignore_index=True) if fold_trades else pd.DataFrame()
+    return pd.DataFrame(folds), trades
+
+from dotenv import load_dotenv
+load_dotenv()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of the strategy parameters.")
+    parser.add_argument('--train', type=int, default=24 * 180, help="Candles per train window.")
+    parser.add_argument('--test', type=int, default=24 * 30, help="Candles per test window.")
+    parser.add_argument('--step', type=int, default=None, help="Candles between folds (default: test window size).")
+    parser.add_argument('--trials', type=int, default=50, help="Optuna trials per train window.")
+    parser.add_argument('--workers', type=int, default=1, help="Train windows optimized in parallel.")
+    parser.add_argument('--pruner', choices=['median', 'halving', 'none'], default='median')
+    parser.add_argument('--start', default=None, help="First candle date (UTC).")
+    parser.add_argument('--end', default=None, help="End date (UTC), exclusive.")
+    args = parser.parse_args()
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+    symbol = os.getenv("TRADE_SYMBOL", "BTCUSDT")
+    csv_file = f"backtest/{symbol}_1h.csv"
+    try:
+        df = backtest.load_candles(symbol, '1h', start=args.start, end=args.end, csv_file=csv_file)
+    except FileNotFoundError as e:
+        logging.error(f"Historical data not found: {e} Please run backtest.py first to generate it.")
+        sys.exit(1)
+
+    df = backtest.attach_sentiment(df, "data_acquisition/historical_sentiment.csv")
+    snapshot_file = "backtest/exchange_filters.json"
+    # A client is only needed to create the filter snapshot the first time
+    client = None if os.path.exists(snapshot_file) else Client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_API_SECRET"))
+    exchange_filters = backtest.load_exchange_filters(client, symbol, snapshot_file)
+
+    start_time = time.perf_counter()
+    folds, trades = walk_forward(df, exchange_filters, args.train, args.test, args.step, args.trials, args.workers, args.pruner)
+    logging.info(f"Walk-forward finished in {time.perf_counter() - start_time:.1f}s")
+    logging.info("\n" + folds.drop(columns=['best_params']).to_string(index=False))
+
+    output_dir = "backtest/optimization_results"
+    os.makedirs(output_dir, exist_ok=True)
+    folds.to_csv(os.path.join(output_dir, "walk_forward_folds.csv"), index=False)
+    trades.to_csv(os.path.join(output_dir, "walk_forward_trades.csv"), index=False)
+    logging.info(f"Saved fold summary and out-of-sample trades to {output_dir}")
@@ -0,0 +1,117 @@
+import os
+import hmac
+import time
+import asyncio
+import hashlib
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+from binance.exceptions import BinanceAPIException
+
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com")
+EXCHANGE_TIMEOUT_SECONDS = float(os.getenv("EXCHANGE_TIMEOUT_SECONDS", "10"))
+EXCHANGE_MAX_CONNECTIONS = int(os.getenv("EXCHANGE_MAX_CONNECTIONS", "10"))
+RECV_WINDOW_MS = 5000
+
+class AsyncExchange:
+    """
+    Non-blocking Binance spot REST adapter for the live loop. Requests share one pooled keep-alive
+    aiohttp session, every request has a timeout, and signed endpoints are HMAC-SHA256 signed like
+    binance.client.Client does. Method names and return values follow Client, so call sites read
+    the same with an await in front. Errors from the exchange raise BinanceAPIException.
+    """
+    def __init__(self, api_key: Optional[str], api_secret: Optional[str], base_url: str = BINANCE_API_URL,
+                 timeout: float = EXCHANGE_TIMEOUT_SECONDS, max_connections: int = EXCHANGE_MAX_CONNECTIONS,
+                 timestamp_offset: int = 0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.timestamp_offset = timestamp_offset # Milliseconds to add to the local clock, as in Client
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.errors = 0
+
+    async def __aenter__(self) -> "AsyncExchange":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the event loop that uses it
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def sign(self, params: Dict[str, Any]) -> str:
+        """The URL-encoded params with timestamp, recvWindow and signature appended."""
+        params = {**params, 'recvWindow': params.get('recvWindow', RECV_WINDOW_MS),
+                  'timestamp': int(time.time() * 1000) + self.timestamp_offset}
+        query = urlencode(params)
+        signature = hmac.new(self.api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, signed: bool = False,
+                      timeout: Optional[float] = None) -> Any:
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        query = self.sign(params) if signed else urlencode(params)
+        url = f"{self.base_url}{path}" + (f"?{query}" if query else '')
+        headers = {'X-MBX-APIKEY': self.api_key} if self.api_key else {}
+        # aiohttp treats timeout=None as "no timeout", so the session default is always passed explicitly
+        request_timeout = aiohttp.ClientTimeout(total=timeout if timeout is not None else self.timeout)
+        self.requests += 1
+        try:
+            async with self.session().request(method, url, headers=headers, timeout=request_timeout) as response:
+                text = await response.text()
+                if response.status >= 400:
+                    # BinanceAPIException reads response.text for non-JSON bodies; aiohttp's is a coroutine
+                    raise BinanceAPIException(SimpleNamespace(text=text, url=str(response.url)), response.status, text)
+                return await response.json(content_type=None)
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def get_symbol_ticker(self, symbol: str) -> dict:
+        return await self.request('GET', '/api/v3/ticker/price', {'symbol': symbol})
+
+    async def get_symbol_info(self, symbol: str) -> Optional[dict]:
+        info = await self.request('GET', '/api/v3/exchangeInfo', {'symbol': symbol})
+        return next((item for item in info.get('symbols', []) if item['symbol'] == symbol.upper()), None)
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 500, startTime: Optional[int] = None,
+                         endTime: Optional[int] = None) -> list:
+        return await self.request('GET', '/api/v3/klines', {'symbol': symbol, 'interval': interval, 'limit': limit,
+                                                            'startTime': startTime, 'endTime': endTime})
+
+    async def get_asset_balance(self, asset: str) -> Optional[dict]:
+        account = await self.request('GET', '/api/v3/account', signed=True)
+        return next((balance for balance in account.get('balances', []) if balance['asset'] == asset), None)
+
+    async def create_order(self, **params) -> dict:
+        return await self.request('POST', '/api/v3/order', params, signed=True)
+
+    async def create_oco_order(self, **params) -> dict:
+        # price/stopPrice/stopLimitPrice OCO parameters, as trading.py passes them
+        return await self.request('POST', '/api/v3/order/oco', params, signed=True)
+
+    async def submit_orders(self, orders: List[Dict[str, Any]]) -> list:
+        """Submits orders concurrently; failed submissions come back as their exception, in order."""
+        results = await asyncio.gather(*(self.create_order(**order) for order in orders), return_exceptions=True)
+        for order, result in zip(orders, results):
+            if isinstance(result, Exception):
+                logging.error(f"Order {order.get('side')} {order.get('quantity')} {order.get('symbol')} failed: {result}")
+        return results
+
+    def get_stats(self) -> dict:
+        return {'requests': self.requests, 'errors': self.errors}
@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+from .sentiment_engines import SENTIMENT_ENGINES, get_engine
+
+BENCHMARK_CORPUS = os.path.join(os.path.dirname(__file__), 'benchmark_headlines.txt')
+
+def load_corpus(path: str = BENCHMARK_CORPUS) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def benchmark_engines(titles: List[str], engines: List[str], repeat: int = 20, batch_size: int = 500,
+                      reference: str = 'textblob') -> Dict[str, dict]:
+    """
+    Scores the corpus repeat times with each engine in batches of batch_size (no cache) and reports
+    throughput and agreement with the reference engine's scores on the corpus.
+    """
+    workload = titles * repeat
+    results, corpus_scores = {}, {}
+    for name in engines:
+        started = time.perf_counter()
+        engine = get_engine(name)
+        load_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for lo in range(0, len(workload), batch_size):
+            engine.score_batch(workload[lo:lo + batch_size])
+        elapsed = time.perf_counter() - started
+        corpus_scores[name] = np.array(engine.score_batch(titles))
+        results[name] = {'headlines_per_second': len(workload) / elapsed, 'load_seconds': load_seconds}
+    reference_scores = np.array(get_engine(reference).score_batch(titles)) # Loaded after the timings above
+    for name, scores in corpus_scores.items():
+        constant = np.ptp(scores) == 0 or np.ptp(reference_scores) == 0
+        results[name].update({
+            'correlation': float('nan') if constant else float(np.corrcoef(scores, reference_scores)[0, 1]),
+            'mean_abs_diff': float(np.abs(scores - reference_scores).mean()),
+            'sign_agreement': float((np.sign(scores) == np.sign(reference_scores)).mean()),
+        })
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark the headline sentiment engines against TextBlob.")
+    parser.add_argument('--corpus', default=BENCHMARK_CORPUS, help="Text file with one headline per line.")
+    parser.add_argument('--engines', default=','.join(SENTIMENT_ENGINES))
+    parser.add_argument('--repeat', type=int, default=20, help="Times the corpus is scored for the throughput figure.")
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    logging.info(f"Benchmarking on {len(corpus)} headlines x {args.repeat} from {args.corpus}")
+    results = benchmark_engines(corpus, [name.strip() for name in args.engines.split(',')], args.repeat, args.batch_size)
+    for name, result in results.items():
+        logging.info(f"📊 {name:>8}: {result['headlines_per_second']:>10,.0f} headlines/s | load {result['load_seconds']:.2f}s | "
+                     f"corr vs textblob {result['correlation']:.3f} | mean |diff| {result['mean_abs_diff']:.3f} | "
+                     f"same sign {result['sign_agreement']:.1%}")
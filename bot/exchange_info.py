@@ -1,8 +1,102 @@
+import json
 import logging
 import math
+import threading
+import time
+from collections import deque
+import numpy as np
 from binance.client import Client
-from functools import lru_cache
 from math import floor
+from typing import Dict, Iterable, Optional, Tuple
+
+# Request weight Binance charges for GET /api/v3/exchangeInfo, which backs client.get_symbol_info
+EXCHANGE_INFO_REQUEST_WEIGHT = 20
+
+class ExchangeFilters:
+    """
+    LOT_SIZE, PRICE_FILTER and NOTIONAL rules for one symbol, parsed once into
+    precomputed step, tick and precision values so rounding is pure arithmetic.
+    """
+    def __init__(self, symbol: str, step_size: Optional[float] = None, tick_size: Optional[float] = None,
+                 min_qty: float = 0.0, min_notional: float = 0.0):
+        self.symbol = symbol
+        self.step_size = step_size
+        self.tick_size = tick_size
+        self.min_qty = min_qty
+        self.min_notional = min_notional
+        self.quantity_precision = int(round(-math.log10(step_size), 0)) if step_size else None
+        self.price_precision = int(round(-math.log10(tick_size), 0)) if tick_size else None
+        self._quantity_factor = 10**self.quantity_precision if step_size else None
+
+    @classmethod
+    def from_symbol_info(cls, info: Optional[dict], symbol: str = "") -> "ExchangeFilters":
+        """
+        Builds the filters from a client.get_symbol_info response. A missing response yields
+        permissive filters that format like format_quantity does when symbol info is unavailable.
+        """
+        if not info:
+            return cls(symbol)
+        filters = {f['filterType']: f for f in info.get('filters', [])}
+
+        lot_size_filter = filters.get('LOT_SIZE')
+        price_filter = filters.get('PRICE_FILTER')
+        # Check for the modern 'NOTIONAL' filter first, then fallback to 'MIN_NOTIONAL'
+        notional_filter = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL')
+
+        return cls(
+            info.get('symbol', symbol),
+            step_size=float(lot_size_filter['stepSize']) if lot_size_filter else None,
+            tick_size=float(price_filter['tickSize']) if price_filter and float(price_filter['tickSize']) > 0 else None,
+            min_qty=float(lot_size_filter.get('minQty', 0.0)) if lot_size_filter else 0.0,
+            min_notional=float(notional_filter.get('minNotional', 0.0)) if notional_filter else 0.0
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot_file: str, symbol: str) -> "ExchangeFilters":
+        """
+        Loads the filters for a symbol from a JSON snapshot written by save_exchange_filters_snapshot.
+        """
+        with open(snapshot_file) as f:
+            snapshot = json.load(f)
+        if symbol not in snapshot:
+            raise KeyError(f"Symbol {symbol} not found in exchange filter snapshot {snapshot_file}")
+        return cls.from_symbol_info(snapshot[symbol], symbol)
+
+    def format_quantity(self, quantity: float) -> str:
+        if self._quantity_factor is None:
+            return f"{quantity:.8f}"
+        # Floor the quantity to the required precision
+        floored_quantity = floor(quantity * self._quantity_factor) / self._quantity_factor
+        return f"{floored_quantity:.{self.quantity_precision}f}"
+
+    def floor_quantity(self, quantity):
+        """float(format_quantity(q)) for a quantity or a NumPy array of them, without the string round trip."""
+        if self._quantity_factor is None:
+            return np.vectorize(lambda q: float(self.format_quantity(q)), otypes=[float])(quantity)
+        return np.floor(np.asarray(quantity) * self._quantity_factor) / self._quantity_factor
+
+    def format_price(self, price: float) -> str:
+        if self.tick_size is None:
+            return f"{price:.2f}"
+        rounded_price = round(price / self.tick_size) * self.tick_size
+        return f"{rounded_price:.{self.price_precision}f}"
+
+def save_exchange_filters_snapshot(client: Client, symbols: Iterable[str], snapshot_file: str) -> Dict[str, dict]:
+    """
+    Fetches symbol info for each symbol and writes the filters to a JSON snapshot on disk,
+    so backtests can load them later without network access.
+    """
+    snapshot = {}
+    for symbol in symbols:
+        info = get_symbol_info(client, symbol)
+        if not info:
+            logging.warning(f"No symbol info for {symbol}; leaving it out of the exchange filter snapshot.")
+            continue
+        snapshot[symbol] = {'symbol': symbol, 'filters': info['filters']}
+    with open(snapshot_file, 'w') as f:
+        json.dump(snapshot, f, indent=2)
+    logging.info(f"Saved exchange filter snapshot for {list(snapshot)} to {snapshot_file}")
+    return snapshot
 
 def get_symbol_info(client: Client, symbol: str):
     try:
@@ -11,37 +105,125 @@ def get_symbol_info(client: Client, symbol: str):
         logging.error(f"Could not retrieve symbol info for {symbol}: {e}")
         return None
 
+class SymbolInfoCache:
+    """
+    Process-wide, thread-safe cache of ExchangeFilters per symbol.
+    Entries are served from memory until they are older than ttl_seconds; a background
+    refresher can keep them fresh so the order path never waits on an exchange-info request.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._lock = threading.Lock() # Instance lock, separate from the singleton lock
+                cls._instance.ttl_seconds = 3600.0
+                cls._instance._refresh_thread = None
+                cls._instance._stop_refresh = threading.Event()
+                cls._instance.clear()
+            return cls._instance
+
+    def clear(self):
+        with self._lock:
+            self._entries: Dict[str, Tuple[ExchangeFilters, float]] = {}
+            self._clients: Dict[str, Client] = {}
+            self._weight_log = deque()
+            self.hits = 0
+            self.misses = 0
+            self.refreshes = 0
+            self.request_weight = 0
+
+    def get_filters(self, client: Client, symbol: str) -> ExchangeFilters:
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        filters = self._fetch(client, symbol)
+        return filters if filters is not None else ExchangeFilters(symbol)
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def _fetch(self, client: Client, symbol: str) -> Optional[ExchangeFilters]:
+        info = get_symbol_info(client, symbol)
+        now = time.monotonic()
+        with self._lock:
+            self.request_weight += EXCHANGE_INFO_REQUEST_WEIGHT
+            self._weight_log.append((now, EXCHANGE_INFO_REQUEST_WEIGHT))
+            if not info:
+                # Keep serving the previous filters (if any) rather than caching an empty response
+                entry = self._entries.get(symbol)
+                return entry[0] if entry else None
+            filters = ExchangeFilters.from_symbol_info(info, symbol)
+            self._entries[symbol] = (filters, now)
+            self._clients[symbol] = client
+            return filters
+
+    def refresh(self):
+        """
+        Re-fetches every cached symbol with the client it was first requested with.
+        """
+        with self._lock:
+            symbols = dict(self._clients)
+        for symbol, client in symbols.items():
+            self._fetch(client, symbol)
+        with self._lock:
+            self.refreshes += 1
+
+    def start_refresh(self, ttl_seconds: Optional[float] = None):
+        """
+        Starts a daemon thread that refreshes all cached symbols shortly before they expire.
+        """
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_refresh.clear()
+
+        def refresh_loop():
+            while not self._stop_refresh.wait(self.ttl_seconds * 0.9):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Symbol info refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name='symbol-info-refresh', daemon=True)
+        self._refresh_thread.start()
+        logging.info(f"Symbol info cache refreshing every {self.ttl_seconds * 0.9:.0f}s.")
+
+    def stop_refresh(self):
+        self._stop_refresh.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            cutoff = time.monotonic() - 60
+            while self._weight_log and self._weight_log[0][0] < cutoff:
+                self._weight_log.popleft()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'request_weight': self.request_weight,
+                'request_weight_last_minute': sum(weight for _, weight in self._weight_log),
+                'symbols': sorted(self._entries)
+            }
+
+def get_exchange_filters(client: Client, symbol: str) -> ExchangeFilters:
+    return SymbolInfoCache().get_filters(client, symbol)
+
 def get_min_notional(client: Client, symbol: str) -> float:
-    info = get_symbol_info(client, symbol)
-    if not info:
-        return 0.0
-    
-    # Check for the modern 'NOTIONAL' filter first, then fallback to 'MIN_NOTIONAL'
-    notional_filter = next((f for f in info['filters'] if f['filterType'] == 'NOTIONAL'), None)
-    if notional_filter:
-        return float(notional_filter.get('minNotional', 0.0))
-
-    min_notional_filter = next((f for f in info['filters'] if f['filterType'] == 'MIN_NOTIONAL'), None)
-    if min_notional_filter:
-        return float(min_notional_filter.get('minNotional', 0.0))
-        
-    return 0.0
+    return get_exchange_filters(client, symbol).min_notional
 
 def format_quantity(client: Client, symbol: str, quantity: float) -> str:
-    info = get_symbol_info(client, symbol)
-    if not info:
-        return f"{quantity:.8f}"
-
-    lot_size_filter = next((f for f in info['filters'] if f['filterType'] == 'LOT_SIZE'), None)
-    if not lot_size_filter:
-        return f"{quantity:.8f}"
-
-    step_size = float(lot_size_filter['stepSize'])
-    precision = int(round(-math.log10(step_size), 0))
-    
-    # Floor the quantity to the required precision
-    factor = 10**precision
-    floored_quantity = floor(quantity * factor) / factor
-    
-    formatted_quantity = f"{floored_quantity:.{precision}f}"
-    return formatted_quantity
+    return get_exchange_filters(client, symbol).format_quantity(quantity)
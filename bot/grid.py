@@ -1,24 +1,26 @@
 import logging
 import asyncio
-from binance.client import Client
+import aiohttp
 from binance.enums import SIDE_BUY, SIDE_SELL, ORDER_TYPE_LIMIT, TIME_IN_FORCE_GTC
 from binance.exceptions import BinanceAPIException
 from bot.trading_stats import LiveTradingStats
 from bot.position_manager import PositionManager
-from bot.exchange_info import format_quantity, get_min_notional
+from bot.exchange_info import ExchangeFilters
+from bot.async_exchange import AsyncExchange
+from typing import Optional
 
-async def place_grid_orders(client: Client, symbol: str, base_qty: float, levels: int, step_pct: float, profit_target_pct: float, invalidation_pct: float):
+async def place_grid_orders(exchange: AsyncExchange, symbol: str, base_qty: float, levels: int, step_pct: float, profit_target_pct: float, invalidation_pct: float, exchange_filters: Optional[ExchangeFilters] = None):
     """
     Places grid ladder buy orders below current price asynchronously, and places corresponding sell (take-profit/stop-loss) orders.
+    Quantities and prices are rounded with exchange_filters, which are fetched once up front when not supplied.
+    The levels are submitted concurrently over the exchange's pooled session.
     """
     try:
-        loop = asyncio.get_event_loop()
-        ticker_data = await loop.run_in_executor(
-            None,
-            lambda: client.get_symbol_ticker(symbol=symbol)
-        )
+        ticker_data = await exchange.get_symbol_ticker(symbol=symbol)
         current_price = float(ticker_data['price'])
-        min_notional = get_min_notional(client, symbol)
+        if exchange_filters is None:
+            exchange_filters = ExchangeFilters.from_symbol_info(await exchange.get_symbol_info(symbol), symbol)
+        min_notional = exchange_filters.min_notional
         position_manager = PositionManager()
         tasks = []
         amount_per_level = base_qty / levels
@@ -36,16 +38,16 @@ async def place_grid_orders(client: Client, symbol: str, base_qty: float, levels
                 logging.error(f"Order value for grid level {i} is too low. Value: {quantity * buy_price:.4f}, Min Notional: {min_notional}")
                 continue # Skip this grid level
 
-            quantity_str = format_quantity(client, symbol, quantity)
+            quantity_str = exchange_filters.format_quantity(quantity)
 
-            def create_and_log_order(p=buy_price, q=quantity_str):
+            async def create_and_log_order(p=buy_price, q=quantity_str):
                 try:
-                    order = client.create_order(
+                    order = await exchange.create_order(
                         symbol=symbol,
                         side=SIDE_BUY,
                         type=ORDER_TYPE_LIMIT,
                         quantity=q,
-                        price=str(round(p, 2)),
+                        price=exchange_filters.format_price(p),
                         timeInForce=TIME_IN_FORCE_GTC
                     )
                     LiveTradingStats().log_trade({
@@ -57,24 +59,20 @@ async def place_grid_orders(client: Client, symbol: str, base_qty: float, levels
                     position_manager.open_position(symbol, float(p), float(q), 'buy', 'grid', invalidation_price=invalidation_price)
                     
                     tp_price = float(p) * (1 + profit_target_pct / 100)
-                    client.create_order(
+                    await exchange.create_order(
                         symbol=symbol,
                         side=SIDE_SELL,
                         type=ORDER_TYPE_LIMIT,
                         quantity=q,
-                        price=str(round(tp_price, 2)),
+                        price=exchange_filters.format_price(tp_price),
                         timeInForce=TIME_IN_FORCE_GTC
                     )
                     return order
-                except BinanceAPIException as e:
+                except (BinanceAPIException, aiohttp.ClientError, asyncio.TimeoutError) as e:
                     logging.error(f"Failed to place grid order for {q} {symbol} at {p}: {e}")
                     return None
 
-            task = loop.run_in_executor(
-                None,
-                create_and_log_order
-            )
-            tasks.append(task)
+            tasks.append(create_and_log_order())
             logging.info(f"Creating grid buy order: {quantity_str} @ {buy_price}")
 
         if not tasks:
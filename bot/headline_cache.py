@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .sentiment_engines import get_engine
+
+# Scores persist here so restarts and historical rebuilds reuse them (the docker-compose volume)
+HEADLINE_CACHE_PATH = os.getenv("HEADLINE_CACHE_PATH", "market_cache/headline_scores.sqlite")
+HEADLINE_CACHE_SIZE = int(os.getenv("HEADLINE_CACHE_SIZE", "50000"))
+SQLITE_MAX_VARIABLES = 900 # Below SQLite's default limit on host parameters per statement
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def normalize_headline(title: str) -> str:
+    """
+    NFKC-normalized, whitespace-collapsed title. Case is kept: engines can score case variants
+    differently (TextBlob reads ':D' as a smiley but not ':d').
+    """
+    return ' '.join(unicodedata.normalize('NFKC', title).split())
+
+def headline_key(title: str) -> str:
+    return hashlib.blake2b(normalize_headline(title).encode(), digest_size=16).hexdigest()
+
+class HeadlineScoreCache:
+    """
+    Sentiment scores keyed by a hash of the normalized headline: a bounded in-memory LRU in front of
+    a SQLite table. score_batch looks every miss up on disk in one query, scores the remaining ones
+    in a single call to the batch scorer and stores them in one transaction. Scores are kept per
+    engine name so different sentiment engines never share entries. Without a scorer, the engine
+    selected by SENTIMENT_ENGINE scores the misses.
+    """
+    def __init__(self, path: Optional[str] = HEADLINE_CACHE_PATH, max_entries: int = HEADLINE_CACHE_SIZE,
+                 scorer: Optional[Callable[[List[str]], List[float]]] = None, engine: Optional[str] = None):
+        self.path = path
+        self.max_entries = max_entries
+        if scorer is None:
+            sentiment_engine = get_engine(engine)
+            scorer, engine = sentiment_engine.score_batch, sentiment_engine.name
+        self.scorer = scorer
+        self.engine = engine or 'custom'
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS headline_scores (engine TEXT, key TEXT, score REAL, PRIMARY KEY (engine, key))")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Headline score store {path} unavailable, caching in memory only: {e}")
+                self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, score: float):
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, float]:
+        found = {}
+        for lo in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[lo:lo + SQLITE_MAX_VARIABLES]
+            rows = self._db.execute(f"SELECT key, score FROM headline_scores WHERE engine = ? AND key IN ({','.join('?' * len(chunk))})",
+                                    [self.engine, *chunk])
+            found.update(rows.fetchall())
+        return found
+
+    def score_batch(self, titles: Iterable[str]) -> List[float]:
+        """Scores of titles in order, computing only those never seen before."""
+        titles = list(titles)
+        keys = [headline_key(title) for title in titles]
+        with self._lock:
+            scores: Dict[str, float] = {}
+            missing = {}
+            for key, title in zip(keys, titles):
+                if key in scores or key in missing:
+                    continue
+                score = self._entries.get(key)
+                if score is not None:
+                    self._entries.move_to_end(key)
+                    scores[key] = score
+                    self.hits += 1
+                else:
+                    missing[key] = title
+            if missing and self._db is not None:
+                stored = self._load(list(missing))
+                self.disk_hits += len(stored)
+                for key, score in stored.items():
+                    scores[key] = score
+                    self._remember(key, score)
+                    del missing[key]
+            if missing:
+                self.misses += len(missing)
+                computed = dict(zip(missing, self.scorer(list(missing.values()))))
+                if self._db is not None:
+                    with self._db:
+                        self._db.executemany("INSERT OR REPLACE INTO headline_scores VALUES (?, ?, ?)",
+                                             [(self.engine, key, score) for key, score in computed.items()])
+                for key, score in computed.items():
+                    scores[key] = score
+                    self._remember(key, score)
+            return [scores[key] for key in keys]
+
+    def score(self, title: str) -> float:
+        return self.score_batch([title])[0]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+def get_headline_cache() -> HeadlineScoreCache:
+    """The process-wide cache used by the news, RSS and historical sentiment code."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HeadlineScoreCache()
+        return _default_cache
+
+def score_headlines(titles: Iterable[str]) -> List[float]:
+    return get_headline_cache().score_batch(titles)
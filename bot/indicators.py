@@ -0,0 +1,350 @@
+import copy
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+class RollingWindow:
+    """
+    Fixed-size window of the latest values with a running sum and sum of squared deviations
+    (Welford-style add/remove), so mean and variance update in O(1). The sums are recomputed
+    from the buffer every time it wraps around, which keeps rounding drift bounded.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.m2 = 0.0
+        self._mean = 0.0
+        self._updates = 0
+        self._repeats = 0 # Trailing run of identical values
+
+    def push(self, value: float):
+        self._repeats = self._repeats + 1 if self.values and value == self.values[-1] else 1
+        if len(self.values) == self.size:
+            removed = self.values[0]
+            self.values.append(value)
+            old_mean = self._mean
+            self.total += value - removed
+            self._mean += (value - removed) / self.size
+            self.m2 += (value - removed) * (value - self._mean + removed - old_mean)
+        else:
+            self.values.append(value)
+            self.total += value
+            old_mean = self._mean
+            self._mean += (value - old_mean) / len(self.values)
+            self.m2 += (value - old_mean) * (value - self._mean)
+        self._updates += 1
+        if self._updates % self.size == 0:
+            self._resync()
+
+    def _resync(self):
+        count = len(self.values)
+        self.total = math.fsum(self.values)
+        self._mean = self.total / count
+        self.m2 = math.fsum((value - self._mean) ** 2 for value in self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    @property
+    def constant(self) -> bool:
+        # Like pandas' rolling mean, a window of identical values yields exactly that value
+        return self._repeats >= len(self.values) > 0
+
+    @property
+    def mean(self) -> float:
+        return self.values[-1] if self.constant else self._mean
+
+    def variance(self) -> float:
+        """Population variance (ddof=0), as the Bollinger Bands use."""
+        return 0.0 if self.constant else max(self.m2, 0.0) / len(self.values)
+
+    def to_dict(self) -> dict:
+        return {'size': self.size, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RollingWindow":
+        window = cls(state['size'])
+        for value in state['values']:
+            window.push(value)
+        return window
+
+class EMA:
+    """
+    Exponential moving average matching pandas ewm(span=span, adjust=False).mean(), including
+    its arithmetic, so values are bit-identical to the batch calculation.
+    """
+    def __init__(self, span: int, value: Optional[float] = None):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        elif self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {'span': self.span, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "EMA":
+        return cls(state['span'], state['value'])
+
+class RSI:
+    """Incremental calculate_rsi: simple moving averages of gains and losses over period closes."""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+
+    def update(self, close: float) -> float:
+        # The first close has no change; calculate_rsi counts it as a zero gain and loss
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        self.prev_close = close
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if not self.gains.full:
+            return NAN
+        gain, loss = self.gains.mean, self.losses.mean
+        if loss == 0:
+            return NAN if gain == 0 else 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+    def to_dict(self) -> dict:
+        return {'period': self.period, 'prev_close': self.prev_close, 'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RSI":
+        rsi = cls(state['period'])
+        rsi.prev_close = state['prev_close']
+        rsi.gains = RollingWindow.from_dict(state['gains'])
+        rsi.losses = RollingWindow.from_dict(state['losses'])
+        return rsi
+
+class MACD:
+    """Incremental calculate_macd: EMA(fast) - EMA(slow) and its EMA(signal)."""
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.macd = NAN
+
+    def update(self, close: float):
+        """Returns (macd, macd_signal)."""
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        return self.macd, self.signal.update(self.macd)
+
+    def to_dict(self) -> dict:
+        return {'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(), 'signal': self.signal.to_dict(), 'macd': self.macd}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "MACD":
+        macd = cls()
+        macd.fast, macd.slow, macd.signal = EMA.from_dict(state['fast']), EMA.from_dict(state['slow']), EMA.from_dict(state['signal'])
+        macd.macd = state['macd']
+        return macd
+
+class ATR:
+    """Incremental calculate_atr: simple moving average of the true range over period candles."""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.true_ranges = RollingWindow(period)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.true_ranges.push(true_range)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.true_ranges.mean if self.true_ranges.full else NAN
+
+    def to_dict(self) -> dict:
+        return {'period': self.period, 'prev_close': self.prev_close, 'true_ranges': self.true_ranges.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "ATR":
+        atr = cls(state['period'])
+        atr.prev_close = state['prev_close']
+        atr.true_ranges = RollingWindow.from_dict(state['true_ranges'])
+        return atr
+
+class BollingerBands:
+    """Incremental calculate_bollinger_bands: moving average plus/minus window_dev population std devs."""
+    def __init__(self, window: int = 20, window_dev: float = 2.0):
+        self.window_dev = window_dev
+        self.closes = RollingWindow(window)
+
+    def update(self, close: float):
+        """Returns (lower, middle, upper)."""
+        self.closes.push(close)
+        return self.value
+
+    @property
+    def value(self):
+        if not self.closes.full:
+            return NAN, NAN, NAN
+        middle = self.closes.mean
+        width = self.window_dev * math.sqrt(self.closes.variance())
+        return middle - width, middle, middle + width
+
+    def to_dict(self) -> dict:
+        return {'window_dev': self.window_dev, 'closes': self.closes.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "BollingerBands":
+        bands = cls(state['closes']['size'], state['window_dev'])
+        bands.closes = RollingWindow.from_dict(state['closes'])
+        return bands
+
+def _ema(values: np.ndarray, span: int, seed: Optional[float]) -> np.ndarray:
+    # Prepending the previous EMA value leaves pandas' adjust=False recursion in exactly the state it
+    # had at the end of the previous chunk, so the continuation matches a single pass bit for bit
+    if seed is None:
+        return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    return pd.Series(np.r_[seed, values]).ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+class IndicatorSet:
+    """
+    The apply_indicators columns for one symbol, updated one closed candle at a time (update, for the
+    live stream) or a chunk of candles at a time (update_chunk, for backtests). Both leave the same
+    state behind, so they can be mixed. update returns the latest values under the apply_indicators
+    column names; to_dict/from_dict round-trip the state through JSON so a restarted bot resumes
+    without replaying history.
+    """
+    def __init__(self, atr_period: int = 14, use_bollinger_bands: bool = False, bb_window: int = 20, bb_window_dev: float = 2.0):
+        self.rsi = RSI()
+        self.macd = MACD()
+        self.atr = ATR(atr_period)
+        self.bollinger_bands = BollingerBands(bb_window, bb_window_dev) if use_bollinger_bands else None
+        self.last_timestamp = None
+        self.values: Dict[str, float] = {}
+        # Latest (high, low, close) candles, one more than the longest window: the first row of any
+        # frame gets a placeholder diff/shift that must stay out of every window
+        self.tail = deque(maxlen=max(self.rsi.period, atr_period, bb_window if use_bollinger_bands else 0) + 1)
+
+    def provides(self, atr_period: int = 14, use_bollinger_bands: bool = False, bb_window: int = 20, bb_window_dev: float = 2.0) -> bool:
+        """Whether this set computes the columns apply_indicators would for these parameters."""
+        if self.atr.period != atr_period:
+            return False
+        if not use_bollinger_bands:
+            return True
+        bands = self.bollinger_bands
+        return bands is not None and bands.closes.size == bb_window and bands.window_dev == bb_window_dev
+
+    def update(self, high: float, low: float, close: float, timestamp=None) -> Dict[str, float]:
+        self.tail.append((high, low, close))
+        macd, macd_signal = self.macd.update(close)
+        self.values = {'RSI': self.rsi.update(close), 'macd': macd, 'macd_signal': macd_signal,
+                       'ATR': self.atr.update(high, low, close)}
+        if self.bollinger_bands is not None:
+            self.values['bb_bbl'], self.values['bb_bbm'], self.values['bb_bbh'] = self.bollinger_bands.update(close)
+        if timestamp is not None:
+            self.last_timestamp = pd.Timestamp(timestamp)
+        return self.values
+
+    def peek(self, high: float, low: float, close: float) -> Dict[str, float]:
+        """The values update would return for this candle, without changing the state (for the forming candle)."""
+        return copy.deepcopy(self).update(high, low, close)
+
+    def update_chunk(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, timestamp=None) -> Dict[str, np.ndarray]:
+        """
+        Indicator columns for the next candles in one vectorized pass: the batch functions run over
+        the tail of earlier candles plus the chunk, and the MACD EMAs continue from their carried
+        values. Afterwards the per-candle state is rebuilt from the new tail.
+        """
+        from bot.strategy import calculate_rsi, calculate_atr, calculate_bollinger_bands
+        k = len(self.tail)
+        previous = np.array(self.tail, dtype=float).reshape(k, 3)
+        frame = pd.DataFrame({'high': np.r_[previous[:, 0], high], 'low': np.r_[previous[:, 1], low], 'close': np.r_[previous[:, 2], close]})
+        columns = {'RSI': calculate_rsi(frame, self.rsi.period).to_numpy()[k:],
+                   'ATR': calculate_atr(frame, period=self.atr.period).to_numpy()[k:]}
+        if self.bollinger_bands is not None:
+            frame = calculate_bollinger_bands(frame, window=self.bollinger_bands.closes.size, window_dev=self.bollinger_bands.window_dev)
+            for band in ('bb_bbl', 'bb_bbm', 'bb_bbh'):
+                columns[band] = frame[band].to_numpy()[k:]
+
+        closes = np.asarray(close, dtype=float)
+        ema_fast = _ema(closes, self.macd.fast.span, self.macd.fast.value)
+        ema_slow = _ema(closes, self.macd.slow.span, self.macd.slow.value)
+        macd = ema_fast - ema_slow
+        macd_signal = _ema(macd, self.macd.signal.span, self.macd.signal.value)
+        columns['macd'], columns['macd_signal'] = macd, macd_signal
+        if not len(closes):
+            return columns
+
+        self.macd.fast.value, self.macd.slow.value, self.macd.signal.value = ema_fast[-1], ema_slow[-1], macd_signal[-1]
+        self.macd.macd = macd[-1]
+        self.tail.extend(zip(np.asarray(high, dtype=float).tolist(), np.asarray(low, dtype=float).tolist(), closes.tolist()))
+        self._rebuild_windows()
+        self.values = {col: float(values[-1]) for col, values in columns.items()}
+        if timestamp is not None and len(timestamp):
+            self.last_timestamp = pd.Timestamp(np.asarray(timestamp)[-1])
+        return columns
+
+    def _rebuild_windows(self):
+        # Replays the tail into fresh RSI/ATR/Bollinger windows; the candle before each window only
+        # provides the previous close, as it would have in a candle-by-candle run. The tail is longer
+        # than every window, so a window only starts without a previous close at the very first candle.
+        candles = list(self.tail)
+        rsi, atr = RSI(self.rsi.period), ATR(self.atr.period)
+        bands = BollingerBands(self.bollinger_bands.closes.size, self.bollinger_bands.window_dev) if self.bollinger_bands is not None else None
+        for indicator, period in ((rsi, rsi.period), (atr, atr.period)):
+            start = max(len(candles) - period, 0)
+            if start > 0:
+                indicator.prev_close = candles[start - 1][2]
+            for high, low, close in candles[start:]:
+                if indicator is rsi:
+                    rsi.update(close)
+                else:
+                    atr.update(high, low, close)
+        if bands is not None:
+            for _, _, close in candles[-bands.closes.size:]:
+                bands.update(close)
+        self.rsi, self.atr, self.bollinger_bands = rsi, atr, bands
+
+    def update_frame(self, df: pd.DataFrame) -> Dict[str, float]:
+        """Feeds the candles of df newer than the last one seen, in order."""
+        if self.last_timestamp is not None:
+            df = df[pd.to_datetime(df['timestamp']) > self.last_timestamp]
+        for timestamp, high, low, close in zip(df['timestamp'], df['high'].tolist(), df['low'].tolist(), df['close'].tolist()):
+            self.update(high, low, close, timestamp)
+        return self.values
+
+    def to_dict(self) -> dict:
+        return {'rsi': self.rsi.to_dict(), 'macd': self.macd.to_dict(), 'atr': self.atr.to_dict(),
+                'bollinger_bands': self.bollinger_bands.to_dict() if self.bollinger_bands is not None else None,
+                'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+                'values': self.values, 'tail': [list(candle) for candle in self.tail]}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "IndicatorSet":
+        bands = state['bollinger_bands']
+        indicators = cls(state['atr']['period'], bands is not None, bands['closes']['size'] if bands else 20, bands['window_dev'] if bands else 2.0)
+        indicators.rsi = RSI.from_dict(state['rsi'])
+        indicators.macd = MACD.from_dict(state['macd'])
+        indicators.atr = ATR.from_dict(state['atr'])
+        indicators.bollinger_bands = BollingerBands.from_dict(state['bollinger_bands']) if state['bollinger_bands'] else None
+        indicators.last_timestamp = pd.Timestamp(state['last_timestamp']) if state['last_timestamp'] else None
+        indicators.values = state['values']
+        indicators.tail.extend(tuple(candle) for candle in state.get('tail', []))
+        return indicators
@@ -0,0 +1,421 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+import websockets
+from binance.client import Client
+
+from bot.strategy import get_data, apply_indicators
+from bot.indicators import IndicatorSet
+from data_acquisition.candle_store import INTERVAL_MS
+
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+KLINE_BUFFER_SIZE = int(os.getenv("KLINE_BUFFER_SIZE", "500"))
+# Older stream data counts as unavailable and readers fall back to REST
+KLINE_MAX_STALENESS_SECONDS = float(os.getenv("KLINE_MAX_STALENESS_SECONDS", "60"))
+
+# Recent candles and indicator state survive restarts here (mount it as a volume in docker-compose)
+MARKET_DATA_CACHE_DIR = os.getenv("MARKET_DATA_CACHE_DIR", "market_cache")
+# Most candles one delta request may ask for (Binance caps klines limit at 1000); older caches are discarded
+MAX_DELTA_CANDLES = 1000
+
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_active_service = None
+
+class KlineCache:
+    """
+    On-disk warm-start cache: one JSON file per (symbol, interval) holding the buffered candles
+    and the IndicatorSet state over the closed ones. Files are replaced atomically.
+    """
+    def __init__(self, root: str = MARKET_DATA_CACHE_DIR):
+        self.root = root
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"{symbol.upper()}_{interval}.json")
+
+    def load(self, symbol: str, interval: str) -> Optional[dict]:
+        try:
+            with open(self.path(symbol, interval)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable kline cache for {symbol} {interval}: {e}")
+            return None
+
+    def save(self, symbol: str, interval: str, candles: list, indicators: Optional[dict], indicator_params: dict):
+        os.makedirs(self.root, exist_ok=True)
+        cache_file = self.path(symbol, interval)
+        with open(f"{cache_file}.tmp", 'w') as f:
+            json.dump({'candles': candles, 'indicators': indicators, 'indicator_params': indicator_params}, f)
+        os.replace(f"{cache_file}.tmp", cache_file)
+
+class KlineStreamService:
+    """
+    Keeps a bounded ring of recent candles per (symbol, interval), seeded once over REST and then
+    updated from the exchange's kline WebSocket streams. The stream runs on its own event loop in a
+    daemon thread; readers take thread-safe DataFrame snapshots in the same shape as get_data,
+    including the still-forming candle. After a dropped connection it reconnects with backoff and
+    re-seeds over REST so no closed candle is missed.
+
+    An IndicatorSet per pair is updated as candles close and serves latest_indicators, which the
+    trading decisions read through MarketSnapshot. With a KlineCache both survive restarts:
+    start() loads the cached candles and indicator state and fetches only the candles since.
+    """
+    def __init__(self, client: Optional[Client], streams: Iterable[Tuple[str, str]], ws_url: str = BINANCE_WS_URL,
+                 buffer_size: int = KLINE_BUFFER_SIZE, seed_limit: int = 100, cache: Optional[KlineCache] = None,
+                 indicator_params: Optional[dict] = None):
+        self.client = client
+        self.streams = [(symbol.upper(), interval) for symbol, interval in streams]
+        self.ws_url = ws_url.rstrip('/')
+        self.buffer_size = buffer_size
+        self.seed_limit = seed_limit
+        self._candles: Dict[Tuple[str, str], deque] = {stream: deque(maxlen=buffer_size) for stream in self.streams}
+        self._updated: Dict[Tuple[str, str], float] = {}
+        self.cache = cache
+        self.indicator_params = dict(indicator_params or {})
+        self._indicators: Dict[Tuple[str, str], IndicatorSet] = {stream: IndicatorSet(**self.indicator_params) for stream in self.streams}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self.messages = 0
+        self.reconnects = 0
+        self.rest_seeds = 0
+        self.cache_loads = 0
+
+    def stream_url(self) -> str:
+        names = '/'.join(f"{symbol.lower()}@kline_{interval}" for symbol, interval in self.streams)
+        return f"{self.ws_url}/stream?streams={names}"
+
+    def start(self, wait_seconds: float = 10.0) -> "KlineStreamService":
+        """Seeds the buffers, starts the stream thread and makes this the service get_klines reads from."""
+        global _active_service
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self.load_cache()
+        self.seed()
+        self._thread = threading.Thread(target=self._run_thread, name='kline-stream', daemon=True)
+        self._thread.start()
+        if not self._ready.wait(wait_seconds):
+            logging.warning(f"Kline stream not connected after {wait_seconds:.0f}s; readers fall back to REST until it is.")
+        _active_service = self
+        return self
+
+    def stop(self):
+        global _active_service
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: None) # Wake the loop so it sees the stop flag
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.save_cache()
+        if _active_service is self:
+            _active_service = None
+
+    def load_cache(self):
+        """Restores the buffers and indicator state saved by a previous run."""
+        if self.cache is None:
+            return
+        for key in self.streams:
+            state = self.cache.load(*key)
+            if not state or not state.get('candles'):
+                continue
+            with self._lock:
+                self._candles[key].clear()
+                self._candles[key].extend(state['candles'][-self.buffer_size:])
+                if state.get('indicators') and state.get('indicator_params') == self.indicator_params:
+                    self._indicators[key] = IndicatorSet.from_dict(state['indicators'])
+                else:
+                    # Indicator settings changed since the cache was written: rebuild from the cached closed candles in one pass
+                    indicators = self._indicators[key] = IndicatorSet(**self.indicator_params)
+                    closed = list(self._candles[key])[:-1]
+                    indicators.update_chunk([c[2] for c in closed], [c[3] for c in closed], [c[4] for c in closed],
+                                            timestamp=pd.to_datetime([c[0] for c in closed], unit='ms'))
+                self.cache_loads += 1
+            logging.info(f"💾 Loaded {len(state['candles'])} cached {key[0]} {key[1]} candles.")
+
+    def save_cache(self):
+        if self.cache is None:
+            return
+        for key in self.streams:
+            with self._lock:
+                candles = [list(candle) for candle in self._candles[key]]
+                indicators = self._indicators[key].to_dict()
+            if candles:
+                try:
+                    self.cache.save(*key, candles, indicators, self.indicator_params)
+                except OSError as e:
+                    logging.error(f"Saving the {key[0]} {key[1]} kline cache failed: {e}")
+
+    def _fetch_seed(self, symbol: str, interval: str) -> list:
+        # Buffers that already hold candles (from the cache or before a reconnect) only fetch the
+        # candles since their last one, which is re-fetched because it may still have been forming
+        with self._lock:
+            candles = self._candles[(symbol, interval)]
+            last_open = candles[-1][0] if candles else None
+        if last_open is not None and interval in INTERVAL_MS:
+            missing = int(time.time() * 1000 - last_open) // INTERVAL_MS[interval] + 1
+            if missing + 1 <= MAX_DELTA_CANDLES: # The last cached candle is fetched again
+                return self.client.get_klines(symbol=symbol, interval=interval, startTime=last_open, limit=missing + 1)
+            logging.info(f"Cached {symbol} {interval} candles are {missing} candles old; fetching a fresh window.")
+            with self._lock:
+                self._candles[(symbol, interval)].clear()
+                self._indicators[(symbol, interval)] = IndicatorSet(**self.indicator_params)
+        return self.client.get_klines(symbol=symbol, interval=interval, limit=self.seed_limit)
+
+    def seed(self):
+        """Fills every buffer over REST: the latest seed_limit candles, or only the missing ones."""
+        if self.client is None:
+            return
+        for symbol, interval in self.streams:
+            try:
+                klines = self._fetch_seed(symbol, interval)
+            except Exception as e:
+                logging.error(f"Seeding {symbol} {interval} klines failed: {e}")
+                continue
+            with self._lock:
+                for kline in klines:
+                    self._apply((symbol, interval), [int(kline[0])] + [float(value) for value in kline[1:6]])
+                self._updated[(symbol, interval)] = time.monotonic()
+                self.rest_seeds += 1
+
+    def _run_thread(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.stream_url(), ping_interval=20, open_timeout=10) as ws:
+                    logging.info(f"📡 Kline stream connected: {', '.join(f'{s} {i}' for s, i in self.streams)}")
+                    self._ready.set()
+                    backoff = 1.0
+                    while not self._stop.is_set():
+                        try:
+                            message = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.on_message(message)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.reconnects += 1
+                logging.warning(f"Kline stream disconnected ({e}); reconnecting in {backoff:.0f}s.")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                # Candles that closed while disconnected come back over REST
+                await asyncio.get_running_loop().run_in_executor(None, self.seed)
+
+    def on_message(self, message: str):
+        payload = json.loads(message)
+        data = payload.get('data', payload)
+        kline = data.get('k')
+        if kline is None:
+            return
+        key = (kline['s'].upper(), kline['i'])
+        if key not in self._candles:
+            return
+        with self._lock:
+            self._apply(key, [int(kline['t']), float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])],
+                        closed=bool(kline.get('x')))
+            self._updated[key] = time.monotonic()
+            self.messages += 1
+
+    def _apply(self, key: Tuple[str, str], candle: list, closed: bool = False):
+        # Updates of the forming candle replace it; a newer open time starts a new candle and closes the previous one
+        candles = self._candles[key]
+        if candles and candles[-1][0] == candle[0]:
+            candles[-1] = candle
+        elif not candles or candles[-1][0] < candle[0]:
+            if candles:
+                self._close(key, candles[-1])
+            candles.append(candle)
+        else:
+            return
+        if closed:
+            self._close(key, candle)
+
+    def _close(self, key: Tuple[str, str], candle: list):
+        indicators = self._indicators[key]
+        timestamp = pd.Timestamp(candle[0], unit='ms')
+        if indicators.last_timestamp is None or timestamp > indicators.last_timestamp:
+            indicators.update(candle[2], candle[3], candle[4], timestamp)
+
+    def indicator_values(self, symbol: str, interval: str) -> Dict[str, float]:
+        """Latest IndicatorSet values over the closed candles of a streamed pair."""
+        with self._lock:
+            return dict(self._indicators[(symbol.upper(), interval)].values)
+
+    def latest_indicators(self, symbol: str, interval: str, atr_period: int = 14, use_bollinger_bands: bool = False,
+                          bb_window: int = 20, bb_window_dev: float = 2.0,
+                          max_staleness: Optional[float] = KLINE_MAX_STALENESS_SECONDS) -> Optional[Dict[str, float]]:
+        """
+        The apply_indicators values at the latest candle, the forming one included as in a get_data
+        frame, plus its 'close' and 'timestamp'. Read from the pair's IndicatorSet in O(1); None when
+        the pair is not streamed or stale, its IndicatorSet uses other parameters, or it has not seen
+        every closed candle in the buffer.
+        """
+        key = (symbol.upper(), interval)
+        if key not in self._indicators:
+            return None
+        if max_staleness is not None and self.staleness(symbol, interval) > max_staleness:
+            return None
+        with self._lock:
+            indicators = self._indicators[key]
+            candles = self._candles[key]
+            if not candles or indicators.last_timestamp is None or not indicators.provides(atr_period, use_bollinger_bands, bb_window, bb_window_dev):
+                return None
+            last = candles[-1]
+            timestamp = pd.Timestamp(last[0], unit='ms')
+            if timestamp == indicators.last_timestamp:
+                values = dict(indicators.values)
+            elif len(candles) > 1 and pd.Timestamp(candles[-2][0], unit='ms') == indicators.last_timestamp:
+                values = indicators.peek(last[2], last[3], last[4])
+            else:
+                return None
+        values['close'] = last[4]
+        values['timestamp'] = timestamp
+        return values
+
+    def staleness(self, symbol: str, interval: str) -> float:
+        """Seconds since the buffer last received data (inf if never)."""
+        with self._lock:
+            updated = self._updated.get((symbol.upper(), interval))
+        return time.monotonic() - updated if updated is not None else float('inf')
+
+    def snapshot(self, symbol: str, interval: str, limit: Optional[int] = None,
+                 max_staleness: Optional[float] = KLINE_MAX_STALENESS_SECONDS) -> Optional[pd.DataFrame]:
+        """
+        The latest limit candles as a get_data-style DataFrame, or None when the pair is not
+        streamed, holds fewer than limit candles, or has not been updated within max_staleness seconds.
+        """
+        key = (symbol.upper(), interval)
+        if key not in self._candles:
+            return None
+        if max_staleness is not None and self.staleness(symbol, interval) > max_staleness:
+            return None
+        with self._lock:
+            candles = list(self._candles[key])
+        if not candles or (limit is not None and len(candles) < limit):
+            return None
+        if limit is not None:
+            candles = candles[-limit:]
+        df = pd.DataFrame(candles, columns=KLINE_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'messages': self.messages, 'reconnects': self.reconnects, 'rest_seeds': self.rest_seeds, 'cache_loads': self.cache_loads,
+                    'candles': {f"{symbol} {interval}": len(candles) for (symbol, interval), candles in self._candles.items()}}
+
+def get_klines(client: Client, symbol: str, interval: str, limit: int = 100) -> pd.DataFrame:
+    """
+    Recent candles from the running KlineStreamService when it streams the pair and is fresh,
+    otherwise from a REST get_data call.
+    """
+    service = _active_service
+    if service is not None:
+        df = service.snapshot(symbol, interval, limit)
+        if df is not None:
+            return df
+        logging.debug(f"No fresh streamed {symbol} {interval} candles; fetching over REST.")
+    return get_data(client, symbol, interval, limit=limit)
+
+class MarketSnapshot:
+    """
+    Market data for one bot cycle. Each (symbol, interval) is fetched at most once and indicator
+    frames are memoized per parameter set, so regime detection, the selected strategy and order
+    placement share the same candles. Frames are shared between callers and must not be modified.
+    fetch_counts records the kline fetches per (symbol, interval).
+
+    latest_indicators is what trading decisions read: for a fresh streamed pair it comes from the
+    stream's incrementally updated IndicatorSet instead of recomputing indicator columns.
+    """
+    def __init__(self, client: Client, limit: int = 100):
+        self.client = client
+        self.limit = limit
+        self._candles: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._indicators: Dict[tuple, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+        self.fetch_counts = Counter()
+        self._latest: Dict[tuple, Dict[str, float]] = {}
+        self.indicator_computations = 0
+        self.indicator_hits = 0
+        self.stream_indicator_reads = 0
+
+    def candles(self, symbol: str, interval: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """The latest limit candles (default: the snapshot limit)."""
+        limit = limit or self.limit
+        key = (symbol.upper(), interval)
+        df = self._candles.get(key)
+        # A later request for a longer history than fetched so far refetches once at that length
+        if df is None or len(df) < limit:
+            df = get_klines(self.client, key[0], interval, limit=max(limit, self.limit))
+            self._candles[key] = df
+            self.fetch_counts[key] += 1
+        return df if len(df) == limit else df.iloc[-limit:]
+
+    def indicators(self, symbol: str, interval: str, atr_period: int = 14, use_bollinger_bands: bool = False,
+                   bb_window: int = 20, bb_window_dev: float = 2.0) -> pd.DataFrame:
+        """The snapshot candles with the apply_indicators columns, computed once per parameter set."""
+        key = (symbol.upper(), interval, atr_period, use_bollinger_bands, bb_window if use_bollinger_bands else None,
+               bb_window_dev if use_bollinger_bands else None)
+        self.candles(symbol, interval)
+        candles = self._candles[key[:2]]
+        cached = self._indicators.get(key)
+        if cached is not None and cached[0] is candles:
+            self.indicator_hits += 1
+            return cached[1]
+        df = apply_indicators(candles, atr_period=atr_period, bb_window=bb_window,
+                              bb_window_dev=bb_window_dev, use_bollinger_bands=use_bollinger_bands)
+        self._indicators[key] = (candles, df)
+        self.indicator_computations += 1
+        return df
+
+    def latest_indicators(self, symbol: str, interval: str, atr_period: int = 14, use_bollinger_bands: bool = False,
+                          bb_window: int = 20, bb_window_dev: float = 2.0) -> Dict[str, float]:
+        """
+        The indicator values and close of the latest candle, read once per cycle and parameter set:
+        from the running KlineStreamService when it serves them, otherwise the last row of indicators().
+        """
+        key = (symbol.upper(), interval, atr_period, use_bollinger_bands, bb_window if use_bollinger_bands else None,
+               bb_window_dev if use_bollinger_bands else None)
+        values = self._latest.get(key)
+        if values is not None:
+            self.indicator_hits += 1
+            return values
+        service = _active_service
+        if service is not None:
+            values = service.latest_indicators(symbol, interval, atr_period, use_bollinger_bands, bb_window, bb_window_dev)
+        if values is not None:
+            self.stream_indicator_reads += 1
+        else:
+            row = self.indicators(symbol, interval, atr_period, use_bollinger_bands, bb_window, bb_window_dev).iloc[-1]
+            values = row.to_dict()
+        self._latest[key] = values
+        return values
+
+    def price(self, symbol: str, interval: str) -> float:
+        return float(self.candles(symbol, interval)['close'].iloc[-1])
+
+    def get_stats(self) -> dict:
+        return {'fetches': sum(self.fetch_counts.values()),
+                'fetch_counts': {f"{symbol} {interval}": count for (symbol, interval), count in self.fetch_counts.items()},
+                'indicator_computations': self.indicator_computations, 'indicator_hits': self.indicator_hits,
+                'stream_indicator_reads': self.stream_indicator_reads}
@@ -1,28 +1,32 @@
 import os
 import requests
-from textblob import TextBlob
 import logging
+from typing import List, Optional
+from .headline_cache import score_headlines
 
-def get_news_sentiment(query: str = "bitcoin OR crypto", max_articles: int = 10) -> float:
+def average_polarity(headlines: List[str]) -> float:
+    # Cached per headline: repeated polls only score headlines not seen before
+    return sum(score_headlines(headlines)) / len(headlines)
+
+def fetch_news_headlines(query: str = "bitcoin OR crypto", max_articles: int = 10, session: Optional[requests.Session] = None,
+                         timeout: float = 10.0) -> List[str]:
+    """Latest NewsAPI headlines for query; raises on missing key or request errors."""
     api_key = os.getenv("NEWSAPI_KEY")
     if not api_key:
-        logging.error("NEWSAPI_KEY not found in .env")
-        return 0.0
-
-    url = (
-        f"https://newsapi.org/v2/everything?q={query}"
-        f"&language=en&sortBy=publishedAt&pageSize={max_articles}&apiKey={api_key}"
-    )
+        raise RuntimeError("NEWSAPI_KEY not found in .env")
+    params = {'q': query, 'language': 'en', 'sortBy': 'publishedAt', 'pageSize': max_articles, 'apiKey': api_key}
+    r = (session or requests).get("https://newsapi.org/v2/everything", params=params, timeout=timeout)
+    r.raise_for_status()
+    return [article["title"] for article in r.json().get("articles", []) if article.get("title")]
 
+def get_news_sentiment(query: str = "bitcoin OR crypto", max_articles: int = 10, session: Optional[requests.Session] = None,
+                       timeout: float = 10.0) -> float:
     try:
-        r = requests.get(url)
-        r.raise_for_status()
-        headlines = [article["title"] for article in r.json().get("articles", [])]
+        headlines = fetch_news_headlines(query, max_articles, session, timeout)
         if not headlines:
             logging.warning("No headlines returned.")
             return 0.0
-        score = sum(TextBlob(h).sentiment.polarity for h in headlines) # type: ignore
-        avg_score = score / len(headlines)
+        avg_score = average_polarity(headlines)
         logging.info(f"Avg News Sentiment Score: {avg_score:.2f}")
         return avg_score
 
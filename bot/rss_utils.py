@@ -1,21 +1,29 @@
 # bot/rss_utils.py
 
 import feedparser
-from textblob import TextBlob
+import requests
 import logging
+from typing import List, Optional
+from .news_utils import average_polarity
 
-def get_rss_sentiment(feed_url: str, max_items: int = 10) -> float:
+def fetch_rss_headlines(feed_url: str, max_items: int = 10, session: Optional[requests.Session] = None,
+                        timeout: float = 10.0) -> List[str]:
+    """Entry titles of an RSS feed, downloaded with a timeout (feedparser's own fetch has none)."""
+    r = (session or requests).get(feed_url, timeout=timeout)
+    r.raise_for_status()
+    entries = feedparser.parse(r.content).entries[:max_items]
+    return [entry.title for entry in entries if hasattr(entry, "title")]
+
+def get_rss_sentiment(feed_url: str, max_items: int = 10, session: Optional[requests.Session] = None,
+                      timeout: float = 10.0) -> float:
     try:
-        feed = feedparser.parse(feed_url)
-        entries = feed.entries[:max_items]
-        headlines = [entry.title for entry in entries if hasattr(entry, "title")]
+        headlines = fetch_rss_headlines(feed_url, max_items, session, timeout)
 
         if not headlines:
             logging.warning("No RSS headlines found.")
             return 0.0
 
-        score = sum(TextBlob(title).sentiment.polarity for title in headlines)  # type: ignore
-        avg_score = score / len(headlines)
+        avg_score = average_polarity(headlines)
         logging.info(f"RSS Sentiment Score: {avg_score:.2f}")
         return avg_score
 
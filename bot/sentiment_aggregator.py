@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .news_utils import average_polarity, fetch_news_headlines
+from .rss_utils import fetch_rss_headlines
+
+# Overall time budget of one collection round; sources still running at the deadline are left out
+SENTIMENT_DEADLINE_SECONDS = float(os.getenv("SENTIMENT_DEADLINE_SECONDS", "5"))
+SENTIMENT_HTTP_TIMEOUT_SECONDS = float(os.getenv("SENTIMENT_HTTP_TIMEOUT_SECONDS", "10"))
+NEWS_QUERY = "bitcoin OR crypto OR rugpull"
+SENTIMENT_RSS_URL = os.getenv("SENTIMENT_RSS_URL", "https://nitter.net/WatcherGuru/rss")
+
+_session = None
+_session_lock = threading.Lock()
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """'newsapi:0.6,rss:0.4' -> {'newsapi': 0.6, 'rss': 0.4}"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = item.partition(':')
+        weights[name.strip()] = float(weight) if weight else 1.0
+    return weights
+
+SENTIMENT_SOURCE_WEIGHTS = parse_weights(os.getenv("SENTIMENT_SOURCE_WEIGHTS", "newsapi:1.0,rss:1.0"))
+
+def shared_session() -> requests.Session:
+    """Process-wide keep-alive session for the sentiment HTTP sources."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def default_sources() -> Dict[str, Callable[[requests.Session, float], List[str]]]:
+    return {
+        'newsapi': lambda session, timeout: fetch_news_headlines(NEWS_QUERY, session=session, timeout=timeout),
+        'rss': lambda session, timeout: fetch_rss_headlines(SENTIMENT_RSS_URL, session=session, timeout=timeout),
+    }
+
+class SentimentAggregator:
+    """
+    Fetches the headlines of all sources concurrently under one overall deadline and combines the
+    polarity of those that answered in time as a weighted mean. Sources are callables
+    (session, timeout) -> headlines; each one's latency, failures and deadline misses are recorded.
+    """
+    def __init__(self, sources: Optional[Dict[str, Callable[[requests.Session, float], List[str]]]] = None,
+                 weights: Optional[Dict[str, float]] = None, deadline: float = SENTIMENT_DEADLINE_SECONDS,
+                 timeout: float = SENTIMENT_HTTP_TIMEOUT_SECONDS, session: Optional[requests.Session] = None,
+                 scorer: Callable[[List[str]], float] = average_polarity):
+        self.sources = sources if sources is not None else default_sources()
+        self.weights = weights if weights is not None else SENTIMENT_SOURCE_WEIGHTS
+        self.deadline = deadline
+        self.timeout = timeout
+        self.session = session or shared_session()
+        self.scorer = scorer
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.sources), 1), thread_name_prefix='sentiment-source')
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {name: {'calls': 0, 'completed': 0, 'failures': 0, 'deadline_misses': 0, 'empty': 0,
+                              'latency_total': 0.0, 'last_latency': None}
+                      for name in self.sources}
+
+    def _run_source(self, name: str) -> List[str]:
+        started = time.perf_counter()
+        try:
+            return self.sources[name](self.session, self.timeout)
+        except Exception:
+            with self._lock:
+                self.stats[name]['failures'] += 1
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                self.stats[name]['completed'] += 1
+                self.stats[name]['latency_total'] += latency
+                self.stats[name]['last_latency'] = latency
+
+    def collect(self) -> Dict[str, float]:
+        """Polarity per source that returned headlines before the deadline."""
+        futures = {}
+        for name in self.sources:
+            previous = self._pending.get(name)
+            if previous is not None and not previous.done():
+                # Still stuck in an earlier round (bounded by the HTTP timeout); don't queue behind it
+                with self._lock:
+                    self.stats[name]['calls'] += 1
+                    self.stats[name]['deadline_misses'] += 1
+                continue
+            with self._lock:
+                self.stats[name]['calls'] += 1
+            futures[name] = self._pending[name] = self._executor.submit(self._run_source, name)
+        wait(futures.values(), timeout=self.deadline)
+
+        readings = {}
+        for name, future in futures.items():
+            if not future.done():
+                with self._lock:
+                    self.stats[name]['deadline_misses'] += 1
+                logging.warning(f"Sentiment source {name} missed the {self.deadline:.1f}s deadline.")
+            elif future.exception() is not None:
+                logging.error(f"Sentiment source {name} failed: {future.exception()}")
+            elif not future.result():
+                with self._lock:
+                    self.stats[name]['empty'] += 1
+            else:
+                readings[name] = self.scorer(future.result())
+        return readings
+
+    def combine(self, readings: Dict[str, float]) -> Optional[float]:
+        """Weighted mean of the readings (weights renormalized over the sources present), or None."""
+        total_weight = sum(self.weights.get(name, 1.0) for name in readings)
+        if not readings or total_weight <= 0:
+            return None
+        return sum(value * self.weights.get(name, 1.0) for name, value in readings.items()) / total_weight
+
+    def fetch_sentiment(self) -> Optional[float]:
+        readings = self.collect()
+        score = self.combine(readings)
+        if score is not None:
+            logging.info(f"🧠 Combined sentiment {score:.2f} from {', '.join(f'{name}={value:.2f}' for name, value in readings.items())}")
+        return score
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {name: {'calls': s['calls'], 'failures': s['failures'], 'deadline_misses': s['deadline_misses'], 'empty': s['empty'],
+                           'failure_rate': (s['failures'] + s['deadline_misses']) / s['calls'] if s['calls'] else 0.0,
+                           'avg_latency_ms': round(1000 * s['latency_total'] / s['completed'], 1) if s['completed'] else None,
+                           'last_latency_ms': round(1000 * s['last_latency'], 1) if s['last_latency'] is not None else None}
+                    for name, s in self.stats.items()}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+import os
+import re
+import json
+import argparse
+import logging
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Engine used for headline scoring unless one is named explicitly: 'textblob' or 'lexicon'
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "textblob")
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), 'sentiment_lexicon.json')
+
+NEGATIONS = ("no", "not", "n't", "never")
+TOKEN_RE = re.compile(r"n't|[a-z0-9]+(?:'[a-z]+)?|!")
+
+_engines: Dict[str, "SentimentEngine"] = {}
+
+class SentimentEngine(ABC):
+    """Scores headlines with a polarity in [-1, 1]. Engines score whole batches at once."""
+    name = 'base'
+
+    @abstractmethod
+    def score_batch(self, titles: List[str]) -> List[float]:
+        ...
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+class TextBlobEngine(SentimentEngine):
+    """TextBlob's pattern analyzer, one headline at a time; the reference engine."""
+    name = 'textblob'
+
+    def __init__(self):
+        from textblob import TextBlob # Slow to import, so only when this engine is used
+        self._textblob = TextBlob
+
+    def score_batch(self, titles: List[str]) -> List[float]:
+        return [self._textblob(title).sentiment.polarity for title in titles]
+
+class LexiconEngine(SentimentEngine):
+    """
+    TextBlob's word polarities from a precompiled lexicon, applied to a whole batch with array
+    operations: the mean polarity of the known words of each title, halved and flipped after a
+    negation and boosted by a following '!', as TextBlob does. It skips TextBlob's intensifier
+    ("very good") handling and emoticons, so scores are close but not identical.
+    """
+    name = 'lexicon'
+
+    def __init__(self, path: str = LEXICON_PATH):
+        with open(path) as f:
+            self.lexicon: Dict[str, float] = json.load(f)
+
+    def score_batch(self, titles: List[str]) -> List[float]:
+        if not titles:
+            return []
+        token_lists = [TOKEN_RE.findall(title.casefold().replace("n't", " n't")) for title in titles]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        tokens = list(chain.from_iterable(token_lists))
+        title_ids = np.repeat(np.arange(len(titles)), lengths)
+        polarity = np.fromiter((self.lexicon.get(token, np.nan) for token in tokens), dtype=float, count=len(tokens))
+        is_negation = np.fromiter((token in NEGATIONS for token in tokens), dtype=bool, count=len(tokens))
+        is_bang = np.fromiter((token == '!' for token in tokens), dtype=bool, count=len(tokens))
+
+        same_title_as_previous = np.r_[False, title_ids[1:] == title_ids[:-1]]
+        negated = np.r_[False, is_negation[:-1]] & same_title_as_previous
+        boosted = np.r_[is_bang[1:], False] & np.r_[same_title_as_previous[1:], False]
+        known = ~np.isnan(polarity)
+        scores = np.where(negated, polarity * -0.5, polarity)
+        scores = np.where(boosted, np.clip(scores * 1.25, -1.0, 1.0), scores)
+
+        sums = np.bincount(title_ids[known], weights=scores[known], minlength=len(titles))
+        counts = np.bincount(title_ids[known], minlength=len(titles))
+        return np.divide(sums, counts, out=np.zeros(len(titles)), where=counts > 0).tolist()
+
+SENTIMENT_ENGINES = {'textblob': TextBlobEngine, 'lexicon': LexiconEngine}
+
+def get_engine(name: Optional[str] = None) -> SentimentEngine:
+    """The shared instance of the named engine (default: SENTIMENT_ENGINE)."""
+    name = (name or SENTIMENT_ENGINE).lower()
+    if name not in SENTIMENT_ENGINES:
+        raise ValueError(f"Unknown sentiment engine {name!r}; choose one of {sorted(SENTIMENT_ENGINES)}.")
+    if name not in _engines:
+        _engines[name] = SENTIMENT_ENGINES[name]()
+    return _engines[name]
+
+def build_lexicon(out_path: str = LEXICON_PATH) -> Dict[str, float]:
+    """
+    Compiles the word polarities of TextBlob's en-sentiment.xml the way its analyzer loads them
+    (senses averaged per part of speech, then across parts of speech) into a JSON lexicon.
+    """
+    import textblob
+    from xml.etree import ElementTree
+    xml_path = os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml')
+    senses: Dict[str, Dict[str, List[float]]] = {}
+    for word in ElementTree.parse(xml_path).getroot().findall('word'):
+        form = word.attrib.get('form')
+        if form:
+            senses.setdefault(form, {}).setdefault(word.attrib.get('pos'), []).append(float(word.attrib.get('polarity', 0.0)))
+    lexicon = {}
+    for form, by_pos in senses.items():
+        per_pos = [sum(values) / len(values) for values in by_pos.values()]
+        lexicon[form] = sum(per_pos) / len(per_pos)
+    with open(out_path, 'w') as f:
+        json.dump(lexicon, f, sort_keys=True, separators=(',', ':'))
+    logging.info(f"Wrote {len(lexicon)} lexicon entries to {out_path}.")
+    return lexicon
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Compile the lexicon engine's word polarities from TextBlob.")
+    parser.add_argument('--out', default=LEXICON_PATH)
+    build_lexicon(parser.parse_args().out)
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from .sentiment_aggregator import SENTIMENT_HTTP_TIMEOUT_SECONDS, SentimentAggregator, shared_session
+from .trading_stats import LiveTradingStats
+
+FEAR_GREED_URL = 'https://api.alternative.me/fng/'
+NEWS_SENTIMENT_REFRESH_SECONDS = float(os.getenv("NEWS_SENTIMENT_REFRESH_SECONDS", "900"))
+FEAR_GREED_REFRESH_SECONDS = float(os.getenv("FEAR_GREED_REFRESH_SECONDS", "3600"))
+# Readings older than this make is_market_safe report the market as unsafe
+SENTIMENT_MAX_STALENESS_SECONDS = float(os.getenv("SENTIMENT_MAX_STALENESS_SECONDS", "7200"))
+# Failed refreshes are retried sooner than the regular schedule
+RETRY_SECONDS = 60.0
+
+_aggregator = None
+
+def get_aggregator() -> SentimentAggregator:
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = SentimentAggregator()
+    return _aggregator
+
+def fetch_news_sentiment() -> float:
+    """Weighted headline sentiment of the NewsAPI and RSS sources that answer before the deadline."""
+    sentiment = get_aggregator().fetch_sentiment()
+    if sentiment is None:
+        raise RuntimeError("No news source returned headlines before the deadline")
+    return sentiment
+
+def fetch_fear_greed(timeout: float = SENTIMENT_HTTP_TIMEOUT_SECONDS) -> int:
+    fg_r = shared_session().get(FEAR_GREED_URL, timeout=timeout)
+    fg_r.raise_for_status()
+    return int(fg_r.json()['data'][0]['value'])
+
+DEFAULT_SOURCES = {
+    'news': (fetch_news_sentiment, NEWS_SENTIMENT_REFRESH_SECONDS),
+    'fear_greed': (fetch_fear_greed, FEAR_GREED_REFRESH_SECONDS),
+}
+
+class SentimentService:
+    """
+    Refreshes each sentiment source on its own schedule in a daemon thread and publishes the
+    readings with their timestamps to LiveTradingStats, so the trading loop only reads cached
+    values. A failed refresh keeps the previous reading (which ages towards the staleness limit)
+    and is retried after RETRY_SECONDS.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._threads: Dict[str, threading.Thread] = {}
+                cls._instance._stop = threading.Event()
+                cls._instance.sources: Dict[str, Tuple[Callable[[], float], float]] = dict(DEFAULT_SOURCES)
+                cls._instance.refreshes = {}
+                cls._instance.failures = {}
+            return cls._instance
+
+    def refresh(self, source: str) -> bool:
+        """Fetches one source now and publishes the reading; returns whether it succeeded."""
+        fetch, _ = self.sources[source]
+        try:
+            value = fetch()
+        except Exception as e:
+            self.failures[source] = self.failures.get(source, 0) + 1
+            logging.error(f"Refreshing {source} sentiment failed: {e}")
+            return False
+        LiveTradingStats().publish_sentiment(source, value)
+        self.refreshes[source] = self.refreshes.get(source, 0) + 1
+        logging.info(f"🧠 {source} sentiment refreshed: {value:.2f}")
+        return True
+
+    def start(self, sources: Optional[Dict[str, Tuple[Callable[[], float], float]]] = None, wait_seconds: float = 0.0):
+        """
+        Starts one refresh thread per source ({name: (fetch, interval_seconds)}, default: news and
+        Fear & Greed). Waits up to wait_seconds for the first readings.
+        """
+        if any(thread.is_alive() for thread in self._threads.values()):
+            return
+        if sources is not None:
+            self.sources = dict(sources)
+        self._stop.clear()
+        first_refresh = {name: threading.Event() for name in self.sources}
+
+        def refresh_loop(name: str, interval: float):
+            while not self._stop.is_set():
+                ok = self.refresh(name)
+                first_refresh[name].set()
+                if self._stop.wait(interval if ok else min(interval, RETRY_SECONDS)):
+                    break
+
+        for name, (_, interval) in self.sources.items():
+            thread = threading.Thread(target=refresh_loop, args=(name, interval), name=f'sentiment-{name}', daemon=True)
+            self._threads[name] = thread
+            thread.start()
+        deadline = time.monotonic() + wait_seconds
+        for event in first_refresh.values():
+            event.wait(max(deadline - time.monotonic(), 0))
+        logging.info(f"Sentiment service refreshing {', '.join(f'{name} every {interval:.0f}s' for name, (_, interval) in self.sources.items())}.")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads.values():
+            thread.join(timeout=5)
+        self._threads = {}
+
+    def get_stats(self) -> dict:
+        stats = {}
+        for name in self.sources:
+            value, age = LiveTradingStats().get_sentiment_reading(name)
+            stats[name] = {'value': value, 'age_seconds': round(age, 1) if age is not None else None,
+                           'refreshes': self.refreshes.get(name, 0), 'failures': self.failures.get(name, 0)}
+        if _aggregator is not None:
+            stats['news_sources'] = _aggregator.get_stats()
+        return stats
@@ -1,4 +1,5 @@
 from binance.client import Client
+import numpy as np
 import pandas as pd
 import logging
 from typing import Optional
@@ -50,6 +51,7 @@ def calculate_bollinger_bands(df: pd.DataFrame, window: int = 20, window_dev: fl
     return df
 
 def apply_indicators(df: pd.DataFrame, atr_period: int = 14, bb_window: int = 20, bb_window_dev: float = 2.0, use_bollinger_bands: bool = False):
+    df = df.copy() # Work on a copy so callers (e.g. concurrent Optuna trials) never see each other's columns
     df['RSI'] = calculate_rsi(df)
     df = calculate_macd(df) # This modifies df in place and returns it
     df['ATR'] = calculate_atr(df, period=atr_period)
@@ -57,6 +59,18 @@ def apply_indicators(df: pd.DataFrame, atr_period: int = 14, bb_window: int = 20
         df = calculate_bollinger_bands(df, window=bb_window, window_dev=bb_window_dev)
     return df
 
+def buy_signals(rsi, macd, macd_signal, sentiment, sentiment_threshold_positive, base_rsi_oversold,
+                use_bollinger_bands=False, bb_bbl=None, current_close=None):
+    """
+    The buy rule of generate_signal on scalars or NumPy arrays, which broadcast against each other
+    (e.g. one candle's indicators against the thresholds of many parameter sets).
+    """
+    # Positive sentiment makes buy signals easier (higher oversold threshold)
+    buy = (macd > macd_signal) & (rsi < base_rsi_oversold - (sentiment * 10)) & (sentiment > sentiment_threshold_positive)
+    if bb_bbl is not None and current_close is not None:
+        buy = buy & np.logical_or(np.logical_not(use_bollinger_bands), current_close < bb_bbl) # Price below lower band
+    return buy
+
 def generate_signal(rsi: float, macd: float, macd_signal: float, sentiment: float,
                     sentiment_threshold_positive: float, sentiment_threshold_negative: float,
                     base_rsi_oversold: float, base_rsi_overbought: float,
@@ -66,24 +80,15 @@ def generate_signal(rsi: float, macd: float, macd_signal: float, sentiment: floa
     Returns 'buy', 'sell', or None.
     """
     
+    # Bullish conditions, shared with the vectorized backtests
+    if buy_signals(rsi, macd, macd_signal, sentiment, sentiment_threshold_positive, base_rsi_oversold,
+                   use_bollinger_bands, bb_bbl, current_close):
+        return 'buy'
+
     # Adjust RSI thresholds based on sentiment
-    # Positive sentiment makes buy signals easier (higher oversold threshold)
     # Negative sentiment makes sell signals easier (lower overbought threshold)
-    adjusted_rsi_oversold = base_rsi_oversold - (sentiment * 10) # Example: sentiment 0.5 -> 30 - 5 = 25
     adjusted_rsi_overbought = base_rsi_overbought - (sentiment * 10) # Example: sentiment 0.5 -> 70 - 5 = 65
 
-    # Bullish conditions
-    macd_cross_bullish = macd > macd_signal # Simplified for current candle comparison
-    rsi_oversold_condition = rsi < adjusted_rsi_oversold
-    sentiment_positive_condition = sentiment > sentiment_threshold_positive  # Use configurable threshold
-
-    bollinger_buy_condition = True
-    if use_bollinger_bands and bb_bbl is not None and current_close is not None:
-        bollinger_buy_condition = current_close < bb_bbl # Price below lower band
-
-    if macd_cross_bullish and rsi_oversold_condition and sentiment_positive_condition and bollinger_buy_condition:
-        return 'buy'
-
     # Bearish conditions
     macd_cross_bearish = macd < macd_signal # Simplified for current candle comparison
     rsi_overbought_condition = rsi > adjusted_rsi_overbought
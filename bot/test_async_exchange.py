@@ -0,0 +1,147 @@
+import hmac
+import time
+import asyncio
+import hashlib
+import logging
+import unittest
+from urllib.parse import parse_qsl
+from aiohttp import web
+from binance.exceptions import BinanceAPIException
+from bot.async_exchange import AsyncExchange
+from bot.exchange_info import ExchangeFilters
+from bot.grid import place_grid_orders
+from bot.market_data import MarketSnapshot
+from bot.trading import place_market_order_with_sl_tp_async
+from bot.test_exchange_info import SYMBOL_INFO
+from bot.test_market_data import FakeClient
+
+API_KEY, API_SECRET = 'key', 'secret'
+
+class FakeExchangeServer:
+    """Binance REST stand-in on localhost that checks API keys and signatures."""
+    def __init__(self, order_delay: float = 0.0):
+        self.order_delay = order_delay
+        self.orders = []
+        self.peers = set()
+        app = web.Application()
+        app.router.add_get('/api/v3/ticker/price', self.ticker)
+        app.router.add_get('/api/v3/account', self.account)
+        app.router.add_get('/api/v3/slow', self.slow)
+        app.router.add_get('/api/v3/broken', self.broken)
+        app.router.add_post('/api/v3/order', self.order)
+        app.router.add_post('/api/v3/order/oco', self.order)
+        self.runner = web.AppRunner(app)
+
+    async def start(self) -> str:
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    def check_signature(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        query = request.query_string
+        payload, signature = query.rsplit('&signature=', 1)
+        expected = hmac.new(API_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+        if request.headers.get('X-MBX-APIKEY') != API_KEY or signature != expected:
+            raise web.HTTPUnauthorized(text='{"code": -1022, "msg": "Signature for this request is not valid."}')
+        return dict(parse_qsl(payload))
+
+    async def ticker(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        return web.json_response({'symbol': request.query['symbol'], 'price': '30000.00'})
+
+    async def account(self, request):
+        self.check_signature(request)
+        return web.json_response({'balances': [{'asset': 'BTC', 'free': '0.5', 'locked': '0'},
+                                               {'asset': 'USDT', 'free': '1000.0', 'locked': '0'}]})
+
+    async def slow(self, request):
+        await asyncio.sleep(2)
+        return web.json_response({})
+
+    async def broken(self, request):
+        return web.Response(status=502, text='Bad Gateway')
+
+    async def order(self, request):
+        params = self.check_signature(request)
+        await asyncio.sleep(self.order_delay)
+        if float(params.get('quantity', 0)) <= 0:
+            raise web.HTTPBadRequest(text='{"code": -1013, "msg": "Filter failure: LOT_SIZE"}')
+        self.orders.append((request.path, params))
+        return web.json_response({'orderId': len(self.orders), **params})
+
+class TestAsyncExchange(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        logging.disable(logging.CRITICAL)
+        self.server = FakeExchangeServer(order_delay=0.2)
+        self.exchange = AsyncExchange(API_KEY, API_SECRET, base_url=await self.server.start(), timeout=1.0)
+
+    async def asyncTearDown(self):
+        await self.exchange.close()
+        await self.server.runner.cleanup()
+        logging.disable(logging.NOTSET)
+
+    async def test_signed_requests_reuse_one_connection(self):
+        self.assertEqual(await self.exchange.get_asset_balance('USDT'), {'asset': 'USDT', 'free': '1000.0', 'locked': '0'})
+        for _ in range(4):
+            await self.exchange.get_symbol_ticker(symbol='BTCUSDT')
+        self.assertEqual(len(self.server.peers), 1)
+        self.assertEqual(self.exchange.get_stats(), {'requests': 5, 'errors': 0})
+
+    async def test_rejections_raise_binance_errors(self):
+        with self.assertRaises(BinanceAPIException) as raised:
+            await self.exchange.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='0')
+        self.assertEqual(raised.exception.code, -1013)
+        bad_key = AsyncExchange(API_KEY, 'wrong', base_url=self.exchange.base_url)
+        with self.assertRaises(BinanceAPIException):
+            await bad_key.get_asset_balance('USDT')
+        await bad_key.close()
+        with self.assertRaises(BinanceAPIException) as raised:
+            await self.exchange.request('GET', '/api/v3/broken')
+        self.assertEqual((raised.exception.status_code, raised.exception.message),
+                         (502, 'Invalid JSON error message from Binance: Bad Gateway'))
+
+    async def test_timeout_does_not_stall_other_requests(self):
+        started = time.perf_counter()
+        slow = asyncio.create_task(self.exchange.request('GET', '/api/v3/slow', timeout=0.3))
+        ticker = await self.exchange.get_symbol_ticker(symbol='BTCUSDT')
+        self.assertEqual(ticker['price'], '30000.00')
+        self.assertLess(time.perf_counter() - started, 0.25)
+        with self.assertRaises(asyncio.TimeoutError):
+            await slow
+        self.assertEqual(self.exchange.errors, 1)
+
+    async def test_default_timeout_applies_without_an_explicit_one(self):
+        exchange = AsyncExchange(API_KEY, API_SECRET, base_url=self.exchange.base_url, timeout=0.3)
+        self.addAsyncCleanup(exchange.close)
+        started = time.perf_counter()
+        with self.assertRaises(asyncio.TimeoutError):
+            await exchange.request('GET', '/api/v3/slow')
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    async def test_orders_are_submitted_concurrently(self):
+        orders = [dict(symbol='BTCUSDT', side='BUY', type='LIMIT', quantity=str(q), price='29000.00', timeInForce='GTC')
+                  for q in ('0.001', '0.002', '0', '0.003', '0.004')]
+        started = time.perf_counter()
+        results = await self.exchange.submit_orders(orders)
+        self.assertLess(time.perf_counter() - started, 0.6) # Five 0.2s orders in about one round trip
+        self.assertIsInstance(results[2], BinanceAPIException)
+        self.assertEqual([result['quantity'] for i, result in enumerate(results) if i != 2], ['0.001', '0.002', '0.003', '0.004'])
+
+    async def test_grid_and_breakout_orders_go_through_the_adapter(self):
+        filters = ExchangeFilters.from_symbol_info(SYMBOL_INFO)
+        await place_grid_orders(self.exchange, 'BTCUSDT', base_qty=100.0, levels=3, step_pct=1.0, profit_target_pct=1.5,
+                                invalidation_pct=2.0, exchange_filters=filters)
+        self.assertEqual(len(self.server.orders), 6) # A buy and its take-profit per level
+        self.assertEqual(sorted(params['side'] for _, params in self.server.orders), ['BUY'] * 3 + ['SELL'] * 3)
+
+        order = await place_market_order_with_sl_tp_async(self.exchange, 'BTCUSDT', 'buy', 10.0, rr_ratio=2.0, atr_period=14,
+                                                          exchange_filters=filters, snapshot=MarketSnapshot(FakeClient(candles=100)))
+        self.assertEqual(order['type'], 'MARKET')
+        path, oco = self.server.orders[-1]
+        self.assertEqual(path, '/api/v3/order/oco')
+        self.assertEqual((oco['side'], oco['stopPrice'], oco['price']), ('SELL', '191.00', '215.00')) # Two ATRs of 4 below 199, 2:1 above
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import time
+import numpy as np
+from bot.exchange_info import ExchangeFilters, SymbolInfoCache, EXCHANGE_INFO_REQUEST_WEIGHT, format_quantity, get_min_notional
+
+SYMBOL_INFO = {'symbol': 'BTCUSDT', 'filters': [
+    {'filterType': 'PRICE_FILTER', 'minPrice': '0.01', 'maxPrice': '1000000.00', 'tickSize': '0.01'},
+    {'filterType': 'LOT_SIZE', 'minQty': '0.00001', 'maxQty': '9000.00', 'stepSize': '0.00001'},
+    {'filterType': 'NOTIONAL', 'minNotional': '5.00'}
+]}
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def get_symbol_info(self, symbol):
+        self.calls += 1
+        return SYMBOL_INFO
+
+class TestExchangeFilters(unittest.TestCase):
+    def test_parses_filters_once(self):
+        filters = ExchangeFilters.from_symbol_info(SYMBOL_INFO)
+        self.assertEqual(filters.step_size, 0.00001)
+        self.assertEqual(filters.tick_size, 0.01)
+        self.assertEqual(filters.quantity_precision, 5)
+        self.assertEqual(filters.price_precision, 2)
+        self.assertEqual(filters.min_notional, 5.0)
+
+    def test_rounding_matches_client_helpers(self):
+        filters = ExchangeFilters.from_symbol_info(SYMBOL_INFO)
+        for quantity in (0.0123456789, 1.999999, 0.00001, 12.5):
+            self.assertEqual(filters.format_quantity(quantity), format_quantity(FakeClient(), 'BTCUSDT', quantity))
+        self.assertEqual(filters.min_notional, get_min_notional(FakeClient(), 'BTCUSDT'))
+        self.assertEqual(filters.format_price(30000.126), '30000.13')
+
+    def test_floor_quantity_matches_format_quantity(self):
+        quantities = np.array([0.0123456789, 1.999999, 0.00001, 12.5, 0.0])
+        for filters in (ExchangeFilters.from_symbol_info(SYMBOL_INFO), ExchangeFilters.from_symbol_info(None, 'BTCUSDT')):
+            np.testing.assert_array_equal(filters.floor_quantity(quantities), [float(filters.format_quantity(q)) for q in quantities])
+            self.assertEqual(float(filters.floor_quantity(0.0123456789)), float(filters.format_quantity(0.0123456789)))
+
+    def test_missing_symbol_info_is_permissive(self):
+        filters = ExchangeFilters.from_symbol_info(None, 'BTCUSDT')
+        self.assertEqual(filters.format_quantity(0.123456789), '0.12345679')
+        self.assertEqual(filters.min_notional, 0.0)
+
+class TestSymbolInfoCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SymbolInfoCache()
+        self.cache.clear()
+        self.cache.ttl_seconds = 3600.0
+
+    def tearDown(self):
+        self.cache.stop_refresh()
+        self.cache.clear()
+
+    def test_hits_make_no_requests(self):
+        client = FakeClient()
+        for quantity in (0.1, 0.2, 0.3):
+            format_quantity(client, 'BTCUSDT', quantity)
+        get_min_notional(client, 'BTCUSDT')
+        self.assertEqual(client.calls, 1)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (3, 1))
+        self.assertEqual(stats['request_weight'], EXCHANGE_INFO_REQUEST_WEIGHT)
+
+    def test_expired_entries_are_refetched(self):
+        client = FakeClient()
+        self.cache.ttl_seconds = 0.0
+        get_min_notional(client, 'BTCUSDT')
+        get_min_notional(client, 'BTCUSDT')
+        self.assertEqual(client.calls, 2)
+
+    def test_background_refresh_keeps_entries_fresh(self):
+        client = FakeClient()
+        get_min_notional(client, 'BTCUSDT')
+        self.cache.start_refresh(ttl_seconds=0.05)
+        time.sleep(0.3)
+        self.cache.stop_refresh()
+        self.assertGreater(self.cache.get_stats()['refreshes'], 0)
+        self.assertGreater(client.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
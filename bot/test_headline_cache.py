@@ -0,0 +1,86 @@
+import os
+import logging
+import tempfile
+import unittest
+from bot.headline_cache import HeadlineScoreCache, headline_key
+from bot.sentiment_engines import get_engine
+
+def textblob_scores(titles):
+    return get_engine('textblob').score_batch(titles)
+
+HEADLINES = [
+    "Bitcoin soars to a record high as ETF inflows surge",
+    "Crypto exchange hacked, users face terrible losses",
+    "SEC delays decision on spot Ether ETF",
+    "Not bad: miners report steady quarter!",
+]
+
+class CountingScorer:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, titles):
+        self.batches.append(list(titles))
+        return textblob_scores(titles)
+
+class TestHeadlineScoreCache(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'scores.sqlite')
+        self.scorer = CountingScorer()
+        self.cache = HeadlineScoreCache(self.path, scorer=self.scorer, engine='textblob')
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_matches_scorer_and_batches_misses(self):
+        variants = HEADLINES + ["  Bitcoin soars to a record   high as ETF inflows surge "]
+        self.assertEqual(self.cache.score_batch(variants), textblob_scores(variants))
+        self.assertEqual(self.scorer.batches, [HEADLINES]) # One batch, the variant deduplicated
+        self.assertEqual(headline_key(variants[0]), headline_key(variants[-1]))
+
+    def test_case_variants_keep_their_own_scores(self):
+        variants = ["BTC :D rally", "btc :d rally"] # TextBlob scores the smiley only in upper case
+        self.assertNotEqual(headline_key(variants[0]), headline_key(variants[1]))
+        self.assertEqual(self.cache.score_batch(variants), textblob_scores(variants))
+        self.assertNotEqual(*self.cache.score_batch(variants))
+
+    def test_repeated_polls_do_no_scoring(self):
+        self.cache.score_batch(HEADLINES)
+        for _ in range(5):
+            self.cache.score_batch(HEADLINES[1:] + ["Fresh headline about a great rally"])
+        self.assertEqual(len(self.scorer.batches), 2)
+        self.assertEqual(self.scorer.batches[1], ["Fresh headline about a great rally"])
+        self.assertEqual(self.cache.get_stats()['misses'], 5)
+
+    def test_scores_persist_across_instances(self):
+        self.cache.score_batch(HEADLINES)
+        self.cache.close()
+        scorer = CountingScorer()
+        reopened = HeadlineScoreCache(self.path, scorer=scorer, engine='textblob')
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.score_batch(HEADLINES), textblob_scores(HEADLINES))
+        self.assertEqual(scorer.batches, [])
+        self.assertEqual(reopened.get_stats()['disk_hits'], len(HEADLINES))
+        # Another engine's scores are kept apart
+        other = HeadlineScoreCache(self.path, scorer=lambda titles: [0.5] * len(titles), engine='other')
+        self.addCleanup(other.close)
+        self.assertEqual(other.score_batch(HEADLINES), [0.5] * len(HEADLINES))
+        # Without a scorer the named engine scores, under its own name
+        lexicon = HeadlineScoreCache(self.path, engine='lexicon')
+        self.addCleanup(lexicon.close)
+        self.assertEqual(lexicon.score_batch(HEADLINES), get_engine('lexicon').score_batch(HEADLINES))
+        self.assertEqual((lexicon.engine, lexicon.get_stats()['disk_hits']), ('lexicon', 0))
+
+    def test_memory_is_bounded(self):
+        cache = HeadlineScoreCache(None, max_entries=2, scorer=self.scorer)
+        cache.score_batch(HEADLINES)
+        self.assertEqual(cache.get_stats()['entries'], 2)
+        cache.score_batch(HEADLINES[-2:])
+        self.assertEqual(len(self.scorer.batches), 1) # The two most recent stayed cached
+
+if __name__ == '__main__':
+    unittest.main()
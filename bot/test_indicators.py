@@ -0,0 +1,85 @@
+import json
+import unittest
+import numpy as np
+import pandas as pd
+from bot.indicators import IndicatorSet, RollingWindow
+from bot.strategy import apply_indicators
+
+def make_candles(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.005, n)))
+    close[1000:1030] = close[1000] # A flat stretch: zero losses and zero band width
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='15min'),
+        'open': open_, 'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n))), 'close': close
+    })
+
+class TestIndicatorSet(unittest.TestCase):
+    def setUp(self):
+        self.df = make_candles()
+        self.params = dict(atr_period=21, use_bollinger_bands=True, bb_window=30, bb_window_dev=2.5)
+        self.expected = apply_indicators(self.df, **self.params)
+
+    def run_incremental(self, indicators: IndicatorSet, df: pd.DataFrame) -> pd.DataFrame:
+        rows = [dict(indicators.update(high, low, close, timestamp))
+                for timestamp, high, low, close in zip(df['timestamp'], df['high'], df['low'], df['close'])]
+        return pd.DataFrame(rows)
+
+    def test_matches_batch_functions(self):
+        streamed = self.run_incremental(IndicatorSet(**self.params), self.df)
+        for col in ('RSI', 'ATR', 'bb_bbl', 'bb_bbm', 'bb_bbh'):
+            np.testing.assert_allclose(streamed[col], self.expected[col], rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=col)
+        # EMAs repeat pandas' arithmetic exactly
+        np.testing.assert_array_equal(streamed['macd'], self.expected['macd'])
+        np.testing.assert_array_equal(streamed['macd_signal'], self.expected['macd_signal'])
+        # Same warm-up: NaN exactly where the batch columns are NaN
+        for col in ('RSI', 'ATR', 'bb_bbm'):
+            np.testing.assert_array_equal(streamed[col].isna(), self.expected[col].isna())
+
+    def test_state_round_trips_through_json(self):
+        indicators = IndicatorSet(**self.params)
+        self.run_incremental(indicators, self.df.iloc[:1500])
+        restored = IndicatorSet.from_dict(json.loads(json.dumps(indicators.to_dict())))
+        streamed = self.run_incremental(restored, self.df.iloc[1500:])
+        for col in ('RSI', 'ATR', 'macd', 'macd_signal', 'bb_bbh'):
+            np.testing.assert_allclose(streamed[col], self.expected[col].iloc[1500:], rtol=1e-9, err_msg=col)
+
+    def test_chunks_and_single_candles_mix(self):
+        indicators = IndicatorSet(**self.params)
+        first = indicators.update_chunk(*(self.df[col].to_numpy()[:5] for col in ('high', 'low', 'close'))) # Shorter than any window
+        rest = indicators.update_chunk(*(self.df[col].to_numpy()[5:1200] for col in ('high', 'low', 'close')), timestamp=self.df['timestamp'][5:1200])
+        self.assertEqual(indicators.last_timestamp, self.df['timestamp'].iloc[1199])
+        streamed = self.run_incremental(indicators, self.df.iloc[1200:])
+        for col in ('RSI', 'ATR', 'macd', 'macd_signal', 'bb_bbl', 'bb_bbh'):
+            np.testing.assert_allclose(np.r_[first[col], rest[col]], self.expected[col].iloc[:1200], rtol=1e-9, equal_nan=True, err_msg=col)
+            np.testing.assert_allclose(streamed[col], self.expected[col].iloc[1200:], rtol=1e-9, err_msg=col)
+
+    def test_peek_leaves_the_state_alone(self):
+        indicators = IndicatorSet(**self.params)
+        self.run_incremental(indicators, self.df.iloc[:-1])
+        before = json.dumps(indicators.to_dict())
+        last = self.df.iloc[-1]
+        peeked = indicators.peek(last['high'], last['low'], last['close'])
+        self.assertEqual(json.dumps(indicators.to_dict()), before)
+        self.assertEqual(peeked, indicators.update(last['high'], last['low'], last['close']))
+        self.assertTrue(indicators.provides(21, True, 30, 2.5) and indicators.provides(21))
+        self.assertFalse(indicators.provides(14) or indicators.provides(21, True, 20, 2.5))
+
+    def test_update_frame_skips_candles_already_seen(self):
+        indicators = IndicatorSet()
+        indicators.update_frame(self.df.iloc[:100])
+        values = indicators.update_frame(self.df.iloc[50:200])
+        self.assertEqual(values['macd'], apply_indicators(self.df.iloc[:200])['macd'].iloc[-1])
+
+    def test_rolling_window_stays_accurate(self):
+        window = RollingWindow(20)
+        values = 1e6 + np.random.default_rng(1).normal(0, 1e-3, 100_000)
+        for value in values:
+            window.push(value)
+        self.assertAlmostEqual(window.mean, values[-20:].mean(), delta=1e-9)
+        self.assertAlmostEqual(window.variance(), values[-20:].var(), delta=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
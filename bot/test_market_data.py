@@ -0,0 +1,313 @@
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import pandas as pd
+from websockets.asyncio.server import serve
+import bot.market_data as market_data
+from bot.market_data import KlineCache, KlineStreamService, MarketSnapshot, get_klines
+from bot.indicators import IndicatorSet
+from bot.exchange_info import ExchangeFilters
+from bot.strategy import apply_indicators, get_data
+from bot.trading import place_market_order_with_sl_tp
+from bot.test_exchange_info import SYMBOL_INFO
+
+MINUTE_MS = 60_000
+START_MS = 1_700_000_000_000 // MINUTE_MS * MINUTE_MS
+
+def kline_row(open_time: int, close: float) -> list:
+    return [open_time, str(close - 1), str(close + 2), str(close - 2), str(close), '10.0', open_time + MINUTE_MS - 1, '1000.0', 10, '5.0', '500.0', '0']
+
+def kline_event(open_time: int, close: float, closed: bool = False, symbol: str = 'BTCUSDT', interval: str = '1m') -> str:
+    return json.dumps({'stream': f"{symbol.lower()}@kline_{interval}", 'data': {'e': 'kline', 's': symbol, 'k': {
+        't': open_time, 's': symbol, 'i': interval, 'o': str(close - 1), 'h': str(close + 2), 'l': str(close - 2),
+        'c': str(close), 'v': '10.0', 'x': closed}}})
+
+class FakeClient:
+    def __init__(self, candles: int = 5, start: int = START_MS, noise: float = 0.0):
+        self.candles = candles
+        self.start = start
+        self.noise = noise
+        self.kline_calls = 0
+        self.kline_requests = []
+        self.orders = []
+
+    def create_order(self, **kwargs):
+        self.orders.append(kwargs)
+        return {'orderId': len(self.orders)}
+
+    def create_oco_order(self, **kwargs):
+        self.orders.append(kwargs)
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, **kwargs):
+        self.kline_calls += 1
+        self.kline_requests.append((symbol, interval, limit, startTime))
+        if limit > 1000:
+            raise ValueError(f"Binance rejects klines limit {limit}")
+        rows = [kline_row(self.start + i * MINUTE_MS, 100.0 + i + self.noise * (i % 7)) for i in range(self.candles)]
+        if startTime is not None:
+            return [row for row in rows if row[0] >= startTime][:limit]
+        return rows[-limit:]
+
+class FakeStreamServer:
+    """Kline stream on localhost; send() pushes a message to every connected client."""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.connections = set()
+        self.paths = []
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result(5)
+
+    async def _start(self):
+        self.server = await serve(self._handler, '127.0.0.1', 0)
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def _handler(self, connection):
+        self.paths.append(connection.request.path)
+        self.connections.add(connection)
+        try:
+            await connection.wait_closed()
+        finally:
+            self.connections.discard(connection)
+
+    def wait_for_connections(self, count: int = 1, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while len(self.connections) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def send(self, message: str):
+        async def broadcast():
+            for connection in list(self.connections):
+                await connection.send(message)
+        asyncio.run_coroutine_threadsafe(broadcast(), self.loop).result(5)
+
+    def drop_connections(self):
+        async def close():
+            for connection in list(self.connections):
+                await connection.close()
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result(5)
+
+    def close(self):
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class TestKlineStreamService(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.server = FakeStreamServer()
+        self.client = FakeClient()
+        self.service = KlineStreamService(self.client, [('BTCUSDT', '1m')], ws_url=self.server.url, buffer_size=8).start()
+        self.server.wait_for_connections()
+
+    def tearDown(self):
+        self.service.stop()
+        self.server.close()
+        logging.disable(logging.NOTSET)
+
+    def test_subscribes_and_seeds_over_rest(self):
+        self.assertEqual(self.server.paths, ['/stream?streams=btcusdt@kline_1m'])
+        df = self.service.snapshot('BTCUSDT', '1m')
+        self.assertEqual(list(df.columns), ['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(df['close'].tolist(), [100.0, 101.0, 102.0, 103.0, 104.0])
+        self.assertEqual(df['timestamp'].iloc[0].value // 1_000_000, START_MS)
+
+    def test_updates_forming_candle_then_appends_and_stays_bounded(self):
+        last = START_MS + 4 * MINUTE_MS
+        self.server.send(kline_event(last, 104.5))
+        self.assertTrue(wait_until(lambda: self.service.messages == 1))
+        df = self.service.snapshot('BTCUSDT', '1m')
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df['close'].iloc[-1], 104.5)
+
+        for i in range(1, 6):
+            self.server.send(kline_event(last + i * MINUTE_MS, 200.0 + i, closed=True))
+        self.server.send(kline_event(last - MINUTE_MS, 1.0)) # Out-of-order update of an older candle is ignored
+        self.assertTrue(wait_until(lambda: self.service.messages == 7))
+        df = self.service.snapshot('BTCUSDT', '1m')
+        self.assertEqual(len(df), 8)
+        self.assertEqual(df['close'].tolist()[-6:], [104.5, 201.0, 202.0, 203.0, 204.0, 205.0])
+        self.assertTrue(df['timestamp'].is_monotonic_increasing)
+
+    def test_get_klines_reads_the_stream_without_rest_calls(self):
+        calls = self.client.kline_calls
+        df = get_klines(self.client, 'BTCUSDT', '1m', limit=3)
+        self.assertEqual(df['close'].tolist(), [102.0, 103.0, 104.0])
+        self.assertEqual(self.client.kline_calls, calls)
+
+    def test_falls_back_when_unavailable_or_stale(self):
+        # More candles than buffered, a pair not streamed, or a stale buffer all go to REST
+        self.assertIsNone(self.service.snapshot('BTCUSDT', '1m', limit=50))
+        self.assertIsNone(self.service.snapshot('ETHUSDT', '1m'))
+        self.service._updated[('BTCUSDT', '1m')] -= 3600
+        self.assertIsNone(self.service.snapshot('BTCUSDT', '1m'))
+        self.assertIsNotNone(self.service.snapshot('BTCUSDT', '1m', max_staleness=None))
+
+    def test_reconnects_and_reseeds(self):
+        seeds = self.service.rest_seeds
+        self.server.drop_connections()
+        self.assertTrue(wait_until(lambda: self.service.reconnects == 1 and len(self.server.connections) == 1))
+        self.assertTrue(wait_until(lambda: self.service.rest_seeds == seeds + 1))
+        self.server.send(kline_event(START_MS + 5 * MINUTE_MS, 300.0))
+        self.assertTrue(wait_until(lambda: self.service.snapshot('BTCUSDT', '1m')['close'].iloc[-1] == 300.0))
+
+    def test_stop_detaches_service(self):
+        self.service.stop()
+        self.assertIsNone(market_data._active_service)
+
+class TestWarmStart(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = KlineCache(self.tmp.name)
+        self.params = dict(atr_period=5, use_bollinger_bands=True, bb_window=10)
+        self.start = (int(time.time() * 1000) // MINUTE_MS - 59) * MINUTE_MS # The last candle is forming now
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def run_service(self, client, **params) -> KlineStreamService:
+        # No stream: seeding and the cache alone are under test
+        service = KlineStreamService(client, [('BTCUSDT', '1m')], ws_url='ws://127.0.0.1:9', buffer_size=200, cache=self.cache,
+                                     indicator_params=params or self.params)
+        service.load_cache()
+        service.seed()
+        return service
+
+    def expected_indicators(self, service, **params) -> dict:
+        closed = service.snapshot('BTCUSDT', '1m', max_staleness=None).iloc[:-1]
+        return IndicatorSet(**(params or self.params)).update_frame(closed)
+
+    def test_restart_fetches_only_the_delta(self):
+        first = self.run_service(FakeClient(candles=58, start=self.start, noise=0.3))
+        first.save_cache()
+        client = FakeClient(candles=60, start=self.start, noise=0.3)
+        restarted = self.run_service(client)
+        self.assertEqual(restarted.cache_loads, 1)
+        self.assertEqual(client.kline_calls, 1)
+        symbol, interval, limit, start_time = client.kline_requests[0]
+        self.assertEqual(start_time, self.start + 57 * MINUTE_MS)
+        self.assertLessEqual(limit, 4)
+        df = restarted.snapshot('BTCUSDT', '1m', max_staleness=None)
+        self.assertEqual(len(df), 60)
+        self.assertTrue(df['timestamp'].is_unique)
+        # Restored indicator state continues exactly where a single run would be
+        full = self.run_service(FakeClient(candles=60, start=self.start, noise=0.3))
+        self.assertEqual(restarted.indicator_values('BTCUSDT', '1m'), full.indicator_values('BTCUSDT', '1m'))
+        for name, value in self.expected_indicators(restarted).items():
+            self.assertAlmostEqual(restarted.indicator_values('BTCUSDT', '1m')[name], value, places=9)
+        # The restored state is what the cycle's decisions read, with no candles recomputed
+        with mock.patch.object(market_data, '_active_service', restarted):
+            snapshot = MarketSnapshot(client)
+            self.assertEqual(snapshot.latest_indicators('BTCUSDT', '1m', **self.params),
+                             full.latest_indicators('BTCUSDT', '1m', **self.params))
+            self.assertEqual((snapshot.stream_indicator_reads, snapshot.indicator_computations, client.kline_calls), (1, 0, 1))
+
+    def test_delta_requests_stay_within_the_klines_limit(self):
+        old_start = self.start - (999 - 59 + 57) * MINUTE_MS # The last cached candle opened 999 minutes ago
+        self.run_service(FakeClient(candles=58, start=old_start, noise=0.3)).save_cache()
+        client = FakeClient(candles=58 + 999, start=old_start, noise=0.3)
+        restarted = self.run_service(client)
+        self.assertTrue(all(limit <= 1000 for _, _, limit, _ in client.kline_requests))
+        df = restarted.snapshot('BTCUSDT', '1m', max_staleness=None)
+        self.assertEqual(df['timestamp'].iat[-1], pd.Timestamp(self.start + 59 * MINUTE_MS, unit='ms'))
+
+    def test_changed_indicator_settings_rebuild_from_cached_candles(self):
+        self.run_service(FakeClient(candles=58, start=self.start, noise=0.3)).save_cache()
+        params = dict(atr_period=14)
+        restarted = self.run_service(FakeClient(candles=60, start=self.start, noise=0.3), **params)
+        for name, value in self.expected_indicators(restarted, **params).items():
+            self.assertAlmostEqual(restarted.indicator_values('BTCUSDT', '1m')[name], value, places=9)
+        expected = apply_indicators(restarted.snapshot('BTCUSDT', '1m', max_staleness=None), **params).iloc[-1]
+        self.assertAlmostEqual(restarted.latest_indicators('BTCUSDT', '1m', **params)['RSI'], expected['RSI'], places=9)
+
+    def test_decisions_read_the_stream_indicators(self):
+        service = self.run_service(FakeClient(candles=60, start=self.start, noise=0.3))
+        # Same values as apply_indicators over the buffered candles, forming candle included
+        expected = apply_indicators(service.snapshot('BTCUSDT', '1m', max_staleness=None), **self.params).iloc[-1]
+        latest = service.latest_indicators('BTCUSDT', '1m', max_staleness=None, **self.params)
+        for name in ('RSI', 'macd', 'macd_signal', 'ATR', 'bb_bbl', 'bb_bbm', 'bb_bbh', 'close'):
+            self.assertAlmostEqual(latest[name], expected[name], places=9)
+        self.assertEqual(latest['timestamp'], expected['timestamp'])
+        self.assertIsNone(service.latest_indicators('BTCUSDT', '1m', atr_period=14)) # Not the streamed parameters
+
+        client = FakeClient(candles=60, start=self.start, noise=0.3)
+        with mock.patch.object(market_data, '_active_service', service):
+            snapshot = MarketSnapshot(client, limit=60)
+            self.assertEqual(snapshot.latest_indicators('BTCUSDT', '1m', atr_period=5), snapshot.latest_indicators('BTCUSDT', '1m', atr_period=5))
+            self.assertAlmostEqual(snapshot.latest_indicators('BTCUSDT', '1m', atr_period=5)['ATR'], expected['ATR'], places=9)
+            self.assertEqual((client.kline_calls, snapshot.stream_indicator_reads, snapshot.indicator_computations), (0, 1, 0))
+            # Parameters the stream does not compute fall back to the snapshot candles
+            self.assertEqual(snapshot.latest_indicators('BTCUSDT', '1m', atr_period=14)['ATR'],
+                             snapshot.indicators('BTCUSDT', '1m', atr_period=14)['ATR'].iloc[-1])
+            self.assertEqual(snapshot.indicator_computations, 1)
+
+    def test_stale_cache_fetches_a_fresh_window(self):
+        self.run_service(FakeClient(candles=20, start=START_MS)).save_cache()
+        client = FakeClient(candles=60, start=self.start, noise=0.3)
+        restarted = self.run_service(client)
+        self.assertEqual(client.kline_requests, [('BTCUSDT', '1m', 100, None)])
+        self.assertEqual(restarted.snapshot('BTCUSDT', '1m', max_staleness=None)['timestamp'].iloc[0].value // 1_000_000, self.start)
+
+class TestMarketSnapshot(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.client = FakeClient(candles=150)
+        self.snapshot = MarketSnapshot(self.client)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_one_fetch_per_pair_per_cycle(self):
+        # Regime check, breakout strategy and order placement, as in one run_bot cycle
+        regime = self.snapshot.indicators('BTCUSDT', '15m', atr_period=14)
+        signal = self.snapshot.indicators('btcusdt', '15m', atr_period=14)
+        self.assertIs(regime, signal)
+        place_market_order_with_sl_tp(self.client, 'BTCUSDT', 'buy', 10.0, rr_ratio=2.0, atr_period=14,
+                                      exchange_filters=ExchangeFilters.from_symbol_info(SYMBOL_INFO), snapshot=self.snapshot)
+        place_market_order_with_sl_tp(self.client, 'BTCUSDT', 'buy', 10.0, rr_ratio=2.0, atr_period=14,
+                                      exchange_filters=ExchangeFilters.from_symbol_info(SYMBOL_INFO), snapshot=self.snapshot)
+        self.assertEqual(self.client.kline_calls, 2)
+        self.assertEqual(dict(self.snapshot.fetch_counts), {('BTCUSDT', '15m'): 1, ('BTCUSDT', '1m'): 1})
+        self.assertEqual(self.snapshot.get_stats()['indicator_computations'], 2)
+        self.assertEqual(self.snapshot.get_stats()['indicator_hits'], 2)
+        self.assertEqual(len(self.client.orders), 4)
+
+    def test_matches_direct_fetch(self):
+        expected = apply_indicators(get_data(self.client, 'BTCUSDT', '15m'), atr_period=21, use_bollinger_bands=True)
+        df = self.snapshot.indicators('BTCUSDT', '15m', atr_period=21, use_bollinger_bands=True)
+        self.assertEqual(self.snapshot.price('BTCUSDT', '15m'), 249.0)
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_parameters_and_longer_histories(self):
+        self.snapshot.indicators('BTCUSDT', '15m')
+        self.snapshot.indicators('BTCUSDT', '15m', atr_period=21)
+        self.assertEqual(self.snapshot.indicator_computations, 2)
+        self.assertEqual(len(self.snapshot.candles('BTCUSDT', '15m', limit=50)), 50)
+        self.assertEqual(self.snapshot.fetch_counts[('BTCUSDT', '15m')], 1)
+        # A longer history refetches once; memoized indicators are recomputed on the new candles
+        self.assertEqual(len(self.snapshot.candles('BTCUSDT', '15m', limit=120)), 120)
+        self.assertEqual(len(self.snapshot.indicators('BTCUSDT', '15m')), 120)
+        self.assertEqual(self.snapshot.fetch_counts[('BTCUSDT', '15m')], 2)
+        self.assertEqual(self.client.kline_requests[-1], ('BTCUSDT', '15m', 120, None))
+
+if __name__ == '__main__':
+    unittest.main()
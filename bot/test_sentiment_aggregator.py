@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bot.sentiment_aggregator import SentimentAggregator, parse_weights, shared_session
+from bot.rss_utils import fetch_rss_headlines
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><title>Bitcoin rallies to a great new high</title></item>
+<item><title>Exchange hacked, terrible losses</title></item>
+</channel></rss>"""
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive
+    connections = set()
+
+    def do_GET(self):
+        FeedHandler.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(RSS)))
+        self.end_headers()
+        self.wfile.write(RSS)
+
+    def log_message(self, *args):
+        pass
+
+def source(headlines, delay=0.0, error=None):
+    def fetch(session, timeout):
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return headlines
+    return fetch
+
+class TestSentimentAggregator(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def make(self, sources, **kwargs) -> SentimentAggregator:
+        # Headline count as the score keeps the combination arithmetic visible
+        aggregator = SentimentAggregator(sources, scorer=lambda headlines: float(len(headlines)), **kwargs)
+        self.addCleanup(aggregator.close)
+        return aggregator
+
+    def test_weighted_combination_of_sources(self):
+        aggregator = self.make({'newsapi': source(['a']), 'rss': source(['a', 'b', 'c'])}, weights={'newsapi': 3.0, 'rss': 1.0})
+        self.assertEqual(aggregator.collect(), {'newsapi': 1.0, 'rss': 3.0})
+        self.assertEqual(aggregator.fetch_sentiment(), 1.5)
+        self.assertEqual(parse_weights('newsapi:0.6, rss:0.4,extra'), {'newsapi': 0.6, 'rss': 0.4, 'extra': 1.0})
+
+    def test_sources_run_concurrently_and_the_deadline_bounds_latency(self):
+        aggregator = self.make({'a': source(['x'], delay=0.3), 'b': source(['x', 'y'], delay=0.3), 'slow': source(['x'], delay=2.0)},
+                               deadline=0.6)
+        started = time.perf_counter()
+        readings = aggregator.collect()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(readings, {'a': 1.0, 'b': 2.0}) # Partial result without the slow source
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(aggregator.get_stats()['slow']['deadline_misses'], 1)
+        self.assertGreaterEqual(aggregator.get_stats()['a']['last_latency_ms'], 300)
+        # Still running from the first round: skipped instead of queued
+        aggregator.collect()
+        self.assertEqual(aggregator.get_stats()['slow']['deadline_misses'], 2)
+        self.assertEqual(aggregator.get_stats()['slow']['failure_rate'], 1.0)
+
+    def test_failures_and_empty_sources_are_left_out_and_recorded(self):
+        aggregator = self.make({'newsapi': source([]), 'rss': source(None, error=ConnectionError('down')), 'ok': source(['x'])})
+        self.assertEqual(aggregator.fetch_sentiment(), 1.0)
+        stats = aggregator.get_stats()
+        self.assertEqual((stats['newsapi']['empty'], stats['rss']['failures'], stats['rss']['failure_rate']), (1, 1, 1.0))
+        self.assertIsNone(self.make({'rss': source([])}).fetch_sentiment())
+
+    def test_rss_feed_over_the_shared_keep_alive_session(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/rss"
+        FeedHandler.connections.clear()
+        for _ in range(3):
+            headlines = fetch_rss_headlines(url, session=shared_session(), timeout=2)
+        self.assertEqual(headlines, ['Bitcoin rallies to a great new high', 'Exchange hacked, terrible losses'])
+        self.assertEqual(len(FeedHandler.connections), 1)
+
+if __name__ == '__main__':
+    unittest.main()
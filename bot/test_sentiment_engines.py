@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from bot import sentiment_engines
+from bot.sentiment_engines import LexiconEngine, get_engine
+from bot.benchmark_sentiment import benchmark_engines, load_corpus
+
+class TestSentimentEngines(unittest.TestCase):
+    def test_lexicon_matches_textblob_on_plain_negated_and_exclaimed_headlines(self):
+        titles = ["Bitcoin soars to a great new high!", "Not good: exchange hacked", "Terrible crash wipes out gains",
+                  "It isn't a good day", "SEC delays ETF", ""]
+        lexicon, textblob = get_engine('lexicon').score_batch(titles), get_engine('textblob').score_batch(titles)
+        for ours, reference in zip(lexicon, textblob):
+            self.assertAlmostEqual(ours, reference)
+
+    def test_batches_keep_titles_apart(self):
+        engine = get_engine('lexicon')
+        titles = ["not", "good news", "great!", "!"] # A negation or '!' never reaches into the neighbouring title
+        self.assertEqual(engine.score_batch(titles), [engine.score(title) for title in titles])
+        self.assertEqual(engine.score_batch([]), [])
+
+    def test_engine_selection(self):
+        self.assertIs(get_engine('LEXICON'), get_engine('lexicon'))
+        self.assertIsInstance(get_engine('lexicon'), LexiconEngine)
+        with mock.patch.object(sentiment_engines, 'SENTIMENT_ENGINE', 'lexicon'):
+            self.assertEqual(get_engine().name, 'lexicon')
+        with self.assertRaises(ValueError):
+            get_engine('vader')
+
+    def test_incomplete_engine_fails_on_creation(self):
+        class Unfinished(sentiment_engines.SentimentEngine):
+            name = 'unfinished'
+        with self.assertRaises(TypeError):
+            Unfinished()
+
+    def test_benchmark_reports_throughput_and_agreement(self):
+        results = benchmark_engines(load_corpus(), ['textblob', 'lexicon'], repeat=1)
+        self.assertAlmostEqual(results['textblob']['correlation'], 1.0)
+        self.assertGreater(results['lexicon']['correlation'], 0.95)
+        self.assertGreater(results['lexicon']['headlines_per_second'], results['textblob']['headlines_per_second'])
+
+if __name__ == '__main__':
+    unittest.main()
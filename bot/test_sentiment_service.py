@@ -0,0 +1,80 @@
+import time
+import logging
+import threading
+import unittest
+from bot.sentiment_engine import is_market_safe
+from bot.sentiment_service import SentimentService
+from bot.trading_stats import LiveTradingStats
+
+class FakeSource:
+    def __init__(self, value: float, fail: bool = False, delay: float = 0.0):
+        self.value = value
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self) -> float:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("feed unavailable")
+        return self.value
+
+class TestSentimentService(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        LiveTradingStats().reset()
+        self.service = SentimentService()
+        self.service.refreshes, self.service.failures = {}, {}
+
+    def tearDown(self):
+        self.service.stop()
+        LiveTradingStats().reset()
+        logging.disable(logging.NOTSET)
+
+    def test_sources_refresh_on_their_own_schedules(self):
+        news, fear_greed = FakeSource(0.4), FakeSource(65)
+        self.service.start({'news': (news, 0.05), 'fear_greed': (fear_greed, 60)}, wait_seconds=2)
+        self.assertEqual(LiveTradingStats().get_sentiment_reading('news')[0], 0.4)
+        self.assertEqual(LiveTradingStats().get_sentiment(), 0.4)
+        time.sleep(0.3)
+        self.assertGreater(news.calls, 3)
+        self.assertEqual(fear_greed.calls, 1)
+        self.assertTrue(is_market_safe(min_sentiment=0.1, min_fear_greed=50))
+
+    def test_slow_source_does_not_delay_the_others_or_the_loop(self):
+        slow_news = FakeSource(0.4, delay=1.0)
+        self.service.start({'news': (slow_news, 60), 'fear_greed': (FakeSource(65), 60)}, wait_seconds=0.2)
+        self.assertEqual(LiveTradingStats().get_sentiment_reading('fear_greed')[0], 65)
+        started = time.perf_counter()
+        self.assertFalse(is_market_safe(min_sentiment=0.1, min_fear_greed=50)) # News not in yet
+        self.assertLess(time.perf_counter() - started, 0.01)
+
+    def test_failed_refresh_keeps_last_reading_until_stale(self):
+        stats = LiveTradingStats()
+        stats.publish_sentiment('news', 0.3, timestamp=time.time() - 100)
+        stats.publish_sentiment('fear_greed', 70)
+        failing = FakeSource(0.0, fail=True)
+        self.service.start({'news': (failing, 60), 'fear_greed': (FakeSource(70), 60)}, wait_seconds=2)
+        self.assertEqual(self.service.get_stats()['news']['failures'], 1)
+        self.assertEqual(stats.get_sentiment_reading('news')[0], 0.3)
+        self.assertTrue(is_market_safe(min_sentiment=0.1, min_fear_greed=50, max_staleness=300))
+        self.assertFalse(is_market_safe(min_sentiment=0.1, min_fear_greed=50, max_staleness=60))
+
+    def test_thresholds_still_apply(self):
+        stats = LiveTradingStats()
+        stats.publish_sentiment('news', 0.05)
+        stats.publish_sentiment('fear_greed', 70)
+        self.assertFalse(is_market_safe(min_sentiment=0.1, min_fear_greed=50))
+        stats.publish_sentiment('news', 0.2)
+        stats.publish_sentiment('fear_greed', 40)
+        self.assertFalse(is_market_safe(min_sentiment=0.1, min_fear_greed=50))
+        self.assertTrue(is_market_safe(min_sentiment=0.1, min_fear_greed=30))
+
+    def test_stop_ends_refresh_threads(self):
+        self.service.start({'news': (FakeSource(0.4), 0.01)}, wait_seconds=1)
+        self.service.stop()
+        self.assertFalse(any(thread.name.startswith('sentiment-') for thread in threading.enumerate()))
+
+if __name__ == '__main__':
+    unittest.main()
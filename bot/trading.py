@@ -5,8 +5,10 @@ from binance.enums import (
     SIDE_BUY, SIDE_SELL, ORDER_TYPE_MARKET, ORDER_TYPE_LIMIT, TIME_IN_FORCE_GTC
 )
 from bot.trading_stats import LiveTradingStats
-from bot.strategy import get_data, calculate_atr
-from bot.exchange_info import format_quantity
+from bot.strategy import calculate_atr
+from bot.market_data import MarketSnapshot, get_klines
+from bot.exchange_info import ExchangeFilters, get_exchange_filters
+from bot.async_exchange import AsyncExchange
 from typing import Optional
 
 def calculate_trade_size(balance: float, trade_mode: str, risk_per_trade_percent: float, current_sentiment: float, fixed_trade_amount_usdt: float = 5.0, sentiment_sizing_multiplier: float = 0.0) -> float:
@@ -21,21 +23,34 @@ def calculate_trade_size(balance: float, trade_mode: str, risk_per_trade_percent
     adjusted_amount = base_amount * (1 + current_sentiment * sentiment_sizing_multiplier)
     return max(adjusted_amount, fixed_trade_amount_usdt) # Ensure it doesn't go below min fixed amount
 
-def place_market_order_with_sl_tp(client: Client, symbol: str, side: str, amount_to_risk: float, rr_ratio: float, atr_period: int):
+def sl_tp_levels(price: float, atr: float, side: str, rr_ratio: float):
+    """Stop-loss two ATRs from price and take-profit rr_ratio times that distance on the other side."""
+    if side == 'buy':
+        sl_price = price - (2 * atr)
+        tp_price = price + (rr_ratio * (price - sl_price))
+    else: # sell
+        sl_price = price + (2 * atr)
+        tp_price = price - (rr_ratio * (sl_price - price))
+    return sl_price, tp_price
+
+def place_market_order_with_sl_tp(client: Client, symbol: str, side: str, amount_to_risk: float, rr_ratio: float, atr_period: int, exchange_filters: Optional[ExchangeFilters] = None, snapshot: Optional[MarketSnapshot] = None):
     try:
-        df = get_data(client, symbol, '1m', limit=100) # Use 1m for recent price
-        price = df['close'].iloc[-1]
-        atr = calculate_atr(df, period=atr_period).iloc[-1]
+        if exchange_filters is None:
+            exchange_filters = get_exchange_filters(client, symbol)
+
+        # Use 1m for recent price
+        if snapshot is not None:
+            latest = snapshot.latest_indicators(symbol, '1m', atr_period=atr_period)
+            price, atr = latest['close'], latest['ATR']
+        else:
+            df = get_klines(client, symbol, '1m', limit=100)
+            price = df['close'].iloc[-1]
+            atr = calculate_atr(df, period=atr_period).iloc[-1]
 
-        if side == 'buy':
-            sl_price = price - (2 * atr)
-            tp_price = price + (rr_ratio * (price - sl_price))
-        else: # sell
-            sl_price = price + (2 * atr)
-            tp_price = price - (rr_ratio * (sl_price - price))
+        sl_price, tp_price = sl_tp_levels(price, atr, side, rr_ratio)
 
         quantity = amount_to_risk / (price - sl_price)
-        quantity_str = format_quantity(client, symbol, quantity)
+        quantity_str = exchange_filters.format_quantity(quantity)
 
         # Place market order
         market_order = client.create_order(
@@ -51,9 +66,53 @@ def place_market_order_with_sl_tp(client: Client, symbol: str, side: str, amount
             symbol=symbol,
             side=SIDE_SELL if side == 'buy' else SIDE_BUY,
             quantity=quantity_str,
-            price=f'{tp_price:.2f}',
-            stopPrice=f'{sl_price:.2f}',
-            stopLimitPrice=f'{sl_price:.2f}',
+            price=exchange_filters.format_price(tp_price),
+            stopPrice=exchange_filters.format_price(sl_price),
+            stopLimitPrice=exchange_filters.format_price(sl_price),
+            stopLimitTimeInForce=TIME_IN_FORCE_GTC
+        )
+        logging.info(f"OCO order placed with TP at {tp_price:.2f} and SL at {sl_price:.2f}")
+
+        LiveTradingStats().log_trade({
+            'symbol': symbol,
+            'side': side,
+            'quantity': quantity_str,
+            'order': market_order
+        })
+        return market_order
+
+    except Exception as e:
+        logging.error(f"Failed to place market order with SL/TP: {e}")
+        return None
+
+async def place_market_order_with_sl_tp_async(exchange: AsyncExchange, symbol: str, side: str, amount_to_risk: float, rr_ratio: float, atr_period: int, exchange_filters: ExchangeFilters, snapshot: MarketSnapshot):
+    """
+    place_market_order_with_sl_tp for the live loop: orders go through the AsyncExchange, and the
+    1m candles come from the cycle snapshot in a worker thread, so a slow REST fallback never blocks the event loop.
+    """
+    try:
+        latest = await asyncio.to_thread(snapshot.latest_indicators, symbol, '1m', atr_period=atr_period)
+        price, atr = latest['close'], latest['ATR']
+        sl_price, tp_price = sl_tp_levels(price, atr, side, rr_ratio)
+
+        quantity = amount_to_risk / (price - sl_price)
+        quantity_str = exchange_filters.format_quantity(quantity)
+
+        market_order = await exchange.create_order(
+            symbol=symbol,
+            side=SIDE_BUY if side == 'buy' else SIDE_SELL,
+            type=ORDER_TYPE_MARKET,
+            quantity=quantity_str
+        )
+        logging.info(f"Market {side} order placed for {quantity_str} {symbol} at {price}")
+
+        await exchange.create_oco_order(
+            symbol=symbol,
+            side=SIDE_SELL if side == 'buy' else SIDE_BUY,
+            quantity=quantity_str,
+            price=exchange_filters.format_price(tp_price),
+            stopPrice=exchange_filters.format_price(sl_price),
+            stopLimitPrice=exchange_filters.format_price(sl_price),
             stopLimitTimeInForce=TIME_IN_FORCE_GTC
         )
         logging.info(f"OCO order placed with TP at {tp_price:.2f} and SL at {sl_price:.2f}")
@@ -1,5 +1,6 @@
 import threading
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
 class LiveTradingStats:
     def get_sentiment(self):
@@ -27,6 +28,7 @@ class LiveTradingStats:
         self.trade_outcomes: List[bool] = [] # Initialize trade_outcomes
         self.last_sentiment = None
         self.last_galaxy_score = None
+        self.sentiment_readings: Dict[str, Tuple[float, float]] = {} # source -> (value, unix time published)
         self._lock = threading.Lock()
 
     def log_trade(self, trade: Dict[str, Any]):
@@ -48,6 +50,26 @@ class LiveTradingStats:
             self.last_sentiment = sentiment
             self.last_galaxy_score = galaxy_score
 
+    def publish_sentiment(self, source: str, value: float, timestamp: Optional[float] = None):
+        """
+        Records the latest reading of one sentiment source ('news' or 'fear_greed') with the time it
+        was taken; the two also update last_sentiment and last_galaxy_score.
+        """
+        with self._lock:
+            self.sentiment_readings[source] = (value, timestamp if timestamp is not None else time.time())
+            if source == 'news':
+                self.last_sentiment = value
+            elif source == 'fear_greed':
+                self.last_galaxy_score = value
+
+    def get_sentiment_reading(self, source: str) -> Tuple[Optional[float], Optional[float]]:
+        """Returns (value, age in seconds) of a source's latest reading, or (None, None)."""
+        with self._lock:
+            reading = self.sentiment_readings.get(source)
+        if reading is None:
+            return None, None
+        return reading[0], time.time() - reading[1]
+
     def get_consecutive_losses(self, window_size: int = 5) -> int:
         """
         Returns the number of consecutive losing trades within the last window_size trades.
@@ -0,0 +1,235 @@
+import os
+import json
+import logging
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", "data_acquisition/candles")
+
+# On-disk dtype of each column; timestamps are candle open times in epoch milliseconds, as Binance returns them
+CANDLE_COLUMNS = {'timestamp': np.int64, 'open': np.float64, 'high': np.float64, 'low': np.float64,
+                  'close': np.float64, 'volume': np.float64}
+
+# Binance kline intervals in milliseconds
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000, '8h': 28_800_000,
+    '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000, '1w': 604_800_000
+}
+
+TimeLike = Union[int, str, pd.Timestamp, None]
+
+def to_epoch_ms(value: TimeLike) -> Optional[int]:
+    """Epoch milliseconds for an int (already ms), a date string or a Timestamp; naive times are UTC."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return timestamp.value // 1_000_000
+
+class CandleStore:
+    """
+    Columnar candle storage: one raw little-endian binary file per column under
+    <root>/<SYMBOL>/<interval>/, plus a meta.json holding the row count. Loading memory-maps only
+    the requested columns and time range, so nothing is parsed and untouched pages are never read.
+    Appends write new rows to the end of each column file before bumping the row count in
+    meta.json, so an interrupted append leaves the dataset readable. Rewrites replace each column
+    file with a new one instead of truncating it, so frames already loaded keep their old data.
+    """
+    def __init__(self, root: str = CANDLE_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def exists(self, symbol: str, interval: str) -> bool:
+        return os.path.exists(os.path.join(self.path(symbol, interval), 'meta.json'))
+
+    def meta(self, symbol: str, interval: str) -> dict:
+        with open(os.path.join(self.path(symbol, interval), 'meta.json')) as f:
+            return json.load(f)
+
+    def rows(self, symbol: str, interval: str) -> int:
+        return self.meta(symbol, interval)['rows'] if self.exists(symbol, interval) else 0
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Open time (epoch ms) of the newest stored candle, or None for an empty dataset."""
+        return self.meta(symbol, interval).get('last') if self.exists(symbol, interval) else None
+
+    def revision(self, symbol: str, interval: str) -> int:
+        """Counter bumped whenever the dataset is rewritten rather than appended to."""
+        return self.meta(symbol, interval).get('revision', 0) if self.exists(symbol, interval) else 0
+
+    def empty_ranges(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """(first, last) open times (epoch ms) the exchange was confirmed to have no candles for, e.g. downtime."""
+        if not self.exists(symbol, interval):
+            return []
+        return [tuple(pair) for pair in self.meta(symbol, interval).get('empty_ranges', [])]
+
+    def add_empty_ranges(self, symbol: str, interval: str, ranges: Iterable[Tuple[int, int]]):
+        """Records ranges as confirmed empty in meta.json, so gap filling stops asking for them."""
+        with self._lock:
+            meta = self.meta(symbol, interval)
+            meta['empty_ranges'] = sorted(set(map(tuple, meta.get('empty_ranges', []))) | {(int(first), int(last)) for first, last in ranges})
+            self._replace_meta(symbol, interval, meta)
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame):
+        """Replaces the dataset with df (sorted by timestamp, duplicate timestamps dropped)."""
+        columns = _normalize(df)
+        with self._lock:
+            path = self.path(symbol, interval)
+            os.makedirs(path, exist_ok=True)
+            # Rewrites bump the revision so derived data (e.g. resampled timeframes) can tell them from appends
+            revision = self.revision(symbol, interval) + 1
+            self._write_meta(symbol, interval, 0, None, None, revision) # Readers see an empty dataset while columns are replaced
+            for name, values in columns.items():
+                # A new file swapped in by rename: memmaps readers hold on the old one stay valid (no SIGBUS on a shrunk file)
+                file_path = os.path.join(path, f"{name}.bin")
+                values.tofile(f"{file_path}.tmp")
+                os.replace(f"{file_path}.tmp", file_path)
+            rows = len(columns['timestamp'])
+            self._write_meta(symbol, interval, rows, *_bounds(columns['timestamp']), revision)
+        logging.info(f"Stored {rows} {symbol} {interval} candles in {path}")
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Appends the candles newer than the last stored one and returns how many were added.
+        Older or duplicate rows are ignored; use merge to fill gaps inside the stored range.
+        """
+        if not self.exists(symbol, interval):
+            self.write(symbol, interval, df)
+            return self.rows(symbol, interval)
+        columns = _normalize(df)
+        with self._lock:
+            meta = self.meta(symbol, interval)
+            newer = columns['timestamp'] > meta['last'] if meta['last'] is not None else np.ones(len(columns['timestamp']), dtype=bool)
+            added = int(newer.sum())
+            if added == 0:
+                return 0
+            path = self.path(symbol, interval)
+            for name, values in columns.items():
+                file_path = os.path.join(path, f"{name}.bin")
+                with open(file_path, 'r+b' if os.path.exists(file_path) else 'wb') as f:
+                    # Drop any bytes an interrupted append left past the committed row count
+                    f.truncate(meta['rows'] * values.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    values[newer].tofile(f)
+            first = meta['first'] if meta['first'] is not None else int(columns['timestamp'][newer][0])
+            self._write_meta(symbol, interval, meta['rows'] + added, first, int(columns['timestamp'][newer][-1]), meta.get('revision', 0))
+        return added
+
+    def merge(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Upserts df into the dataset, keeping the new values for timestamps present in both.
+        Rewrites the dataset, so prefer append for candles past the end. Returns the number of new rows.
+        """
+        if not self.exists(symbol, interval):
+            self.write(symbol, interval, df)
+            return self.rows(symbol, interval)
+        existing = self.load(symbol, interval)
+        before = len(existing)
+        df = df[list(CANDLE_COLUMNS)]
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df = df.assign(timestamp=pd.to_datetime(df['timestamp'], unit='ms', utc=True)) # Epoch-ms rows from the API
+        combined = pd.concat([existing, df], ignore_index=True)
+        self.write(symbol, interval, combined.drop_duplicates('timestamp', keep='last'))
+        return self.rows(symbol, interval) - before
+
+    def import_csv(self, symbol: str, interval: str, csv_file: str):
+        """One-off conversion of a timestamp,open,high,low,close,volume CSV into the store."""
+        df = pd.read_csv(csv_file)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        self.write(symbol, interval, df)
+
+    def load(self, symbol: str, interval: str, columns: Optional[Iterable[str]] = None,
+             start: TimeLike = None, end: TimeLike = None, dtype=None) -> pd.DataFrame:
+        """
+        Returns candles with open time in [start, end) as a DataFrame of read-only memory-mapped
+        columns. columns prunes the price columns read (timestamp is always included); dtype
+        (e.g. np.float32) downcasts them, which copies just the selected range.
+        """
+        lo, hi = self.row_range(symbol, interval, start, end)
+        return self.load_rows(symbol, interval, lo, hi, columns=columns, dtype=dtype)
+
+    def row_range(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None) -> Tuple[int, int]:
+        """Row positions [lo, hi) of the candles with open time in [start, end), found by binary search."""
+        rows = self.meta(symbol, interval)['rows']
+        timestamps = self._map(self.path(symbol, interval), 'timestamp', 0, rows)
+        lo = int(np.searchsorted(timestamps, to_epoch_ms(start), side='left')) if start is not None else 0
+        hi = int(np.searchsorted(timestamps, to_epoch_ms(end), side='left')) if end is not None else rows
+        return lo, max(hi, lo)
+
+    def load_rows(self, symbol: str, interval: str, lo: int, hi: int, columns: Optional[Iterable[str]] = None, dtype=None) -> pd.DataFrame:
+        """Like load, but for the row positions [lo, hi)."""
+        path = self.path(symbol, interval)
+        columns = [col for col in CANDLE_COLUMNS if col != 'timestamp'] if columns is None else [col for col in columns if col != 'timestamp']
+        unknown = set(columns) - set(CANDLE_COLUMNS)
+        if unknown:
+            raise KeyError(f"Unknown candle columns {sorted(unknown)}")
+        data = {'timestamp': pd.to_datetime(self._map(path, 'timestamp', lo, hi - lo), unit='ms', utc=True)}
+        for col in columns:
+            values = self._map(path, col, lo, hi - lo)
+            data[col] = values.astype(dtype) if dtype is not None else values
+        return pd.DataFrame(data, copy=False)
+
+    def iter_chunks(self, symbol: str, interval: str, chunk_size: int, start: TimeLike = None, end: TimeLike = None,
+                    columns: Optional[Iterable[str]] = None, overlap: int = 0) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """
+        Yields (row offset from the first candle in range, frame) for consecutive chunks of chunk_size
+        candles in [start, end). Each chunk but the last also includes the first overlap candles of the next;
+        a chunk whose overlap already reaches the end is the last, so no candle is yielded only as a remainder.
+        """
+        lo, hi = self.row_range(symbol, interval, start, end)
+        for chunk_lo in range(lo, hi, chunk_size):
+            chunk_hi = min(chunk_lo + chunk_size + overlap, hi)
+            yield chunk_lo - lo, self.load_rows(symbol, interval, chunk_lo, chunk_hi, columns=columns)
+            if chunk_hi == hi:
+                break
+
+    def _map(self, path: str, column: str, offset: int, count: int) -> np.ndarray:
+        dtype = np.dtype(CANDLE_COLUMNS[column])
+        if count <= 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, f"{column}.bin"), dtype=dtype, mode='r', offset=offset * dtype.itemsize, shape=(count,))
+
+    def _write_meta(self, symbol: str, interval: str, rows: int, first: Optional[int], last: Optional[int], revision: int = 0):
+        meta_file = os.path.join(self.path(symbol, interval), 'meta.json')
+        meta = {'symbol': symbol.upper(), 'interval': interval, 'rows': rows, 'first': first, 'last': last, 'revision': revision,
+                'columns': {name: np.dtype(dtype).str for name, dtype in CANDLE_COLUMNS.items()}}
+        if os.path.exists(meta_file):
+            # Confirmed-empty ranges describe the exchange's history, not the stored rows, so rewrites keep them
+            meta['empty_ranges'] = self.meta(symbol, interval).get('empty_ranges', [])
+        self._replace_meta(symbol, interval, meta)
+
+    def _replace_meta(self, symbol: str, interval: str, meta: dict):
+        meta_file = os.path.join(self.path(symbol, interval), 'meta.json')
+        with open(f"{meta_file}.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_file}.tmp", meta_file)
+
+def _normalize(df: pd.DataFrame) -> dict:
+    # Sorted, de-duplicated contiguous arrays in the on-disk dtypes
+    timestamps = df['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        if timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize('UTC')
+        epoch_ms = timestamps.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype='datetime64[ms]').view(np.int64)
+    else:
+        epoch_ms = timestamps.to_numpy(dtype=np.int64)
+    order = np.argsort(epoch_ms, kind='stable')
+    epoch_ms = epoch_ms[order]
+    # Keep the last row for duplicate timestamps
+    keep = np.r_[epoch_ms[1:] != epoch_ms[:-1], True] if len(epoch_ms) else np.zeros(0, dtype=bool)
+    columns = {'timestamp': np.ascontiguousarray(epoch_ms[keep])}
+    for name, dtype in CANDLE_COLUMNS.items():
+        if name != 'timestamp':
+            columns[name] = np.ascontiguousarray(df[name].to_numpy(dtype=dtype)[order][keep])
+    return columns
+
+def _bounds(timestamps: np.ndarray):
+    return (int(timestamps[0]), int(timestamps[-1])) if len(timestamps) else (None, None)
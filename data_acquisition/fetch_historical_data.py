@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 
 # Add bot directory to sys.path to import sentiment_engine
 sys.path.append(os.path.join(os.path.dirname(__file__), '..')) # Add project root to path
-from bot.sentiment_engine import analyze_text_sentiment
+from bot.headline_cache import score_headlines
 
 load_dotenv() # Load environment variables
 
@@ -72,6 +72,7 @@ def fetch_rss_feed(url: str) -> list:
 def process_articles_for_sentiment(articles: list, source_type: str) -> pd.DataFrame:
     """
     Processes a list of articles (from various sources) to extract sentiment.
+    Titles are scored in one batch through the headline score cache, so rebuilds reuse earlier scores.
     """
     sentiments = []
     for article in articles:
@@ -89,13 +90,15 @@ def process_articles_for_sentiment(articles: list, source_type: str) -> pd.DataF
             published_at = article.get('published')
         
         if title and published_at:
-            sentiment_score = analyze_text_sentiment(title) # Use your existing sentiment analyzer
             sentiments.append({
                 'timestamp': pd.to_datetime(published_at, utc=True),
-                'sentiment_score': sentiment_score,
+                'title': title,
                 'source': source_type
             })
-    return pd.DataFrame(sentiments)
+    scores = score_headlines([row.pop('title') for row in sentiments])
+    for row, score in zip(sentiments, scores):
+        row['sentiment_score'] = score
+    return pd.DataFrame(sentiments, columns=['timestamp', 'sentiment_score', 'source'])
 
 def aggregate_hourly_sentiment(sentiment_df: pd.DataFrame) -> pd.DataFrame:
     """
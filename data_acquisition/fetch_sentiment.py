@@ -1,11 +1,42 @@
+import numpy as np
 import pandas as pd
+from typing import Optional, Union
 
-def load_historical_sentiment(csv_file: str) -> pd.DataFrame:
+def load_historical_sentiment(csv_file: str, candle_index=None,
+                              max_staleness: Optional[Union[str, pd.Timedelta]] = None):
     """
     Loads historical sentiment data from a CSV file and sets the timestamp as the index.
+    If candle_index is given, returns the sentiment already aligned to those candle timestamps
+    (see align_sentiment) instead of the raw frame.
     """
     df = pd.read_csv(csv_file)
     df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
     df.set_index('timestamp', inplace=True)
     df.sort_index(inplace=True)
-    return df
\ No newline at end of file
+    if candle_index is not None:
+        return align_sentiment(df, candle_index, max_staleness=max_staleness)
+    return df
+
+def align_sentiment(sentiment_df: pd.DataFrame, candle_index,
+                    max_staleness: Optional[Union[str, pd.Timedelta]] = None) -> pd.Series:
+    """
+    As-of joins sentiment scores onto candle timestamps in one vectorized pass.
+    Each candle gets the score at its timestamp or the closest preceding one. Candles with no
+    earlier score, or whose latest score is older than max_staleness, get a neutral 0.0.
+    """
+    candle_index = pd.DatetimeIndex(candle_index)
+    if candle_index.tz is None:
+        candle_index = candle_index.tz_localize('UTC')
+    candle_times = candle_index.as_unit('ns').asi8
+
+    aligned = np.zeros(len(candle_index))
+    if not sentiment_df.empty:
+        sentiment_times = pd.DatetimeIndex(sentiment_df.index).tz_convert('UTC').as_unit('ns').asi8
+        positions = np.searchsorted(sentiment_times, candle_times, side='right') - 1
+        found = positions >= 0
+        if max_staleness is not None:
+            age = candle_times - sentiment_times[np.clip(positions, 0, None)]
+            found &= age <= pd.Timedelta(max_staleness).value
+        scores = sentiment_df['sentiment_score'].to_numpy(dtype=float)
+        aligned[found] = scores[positions[found]]
+    return pd.Series(aligned, index=candle_index, name='sentiment')
@@ -0,0 +1,277 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..')) # Add project root to path
+from data_acquisition.candle_store import CandleStore, INTERVAL_MS, TimeLike, to_epoch_ms
+
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com")
+KLINES_PATH = "/api/v3/klines"
+# Request weight Binance charges for GET /api/v3/klines
+KLINES_REQUEST_WEIGHT = 2
+KLINES_LIMIT = 1000
+
+class WeightBudget:
+    """
+    Thread-safe sliding-window request-weight limiter shared by all download threads.
+    acquire blocks until the weight used in the last window_seconds leaves room for the request.
+    """
+    def __init__(self, limit: int = 1200, window_seconds: float = 60.0):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.used_weight = 0
+        self._log = deque()
+        self._lock = threading.Lock()
+
+    def _used(self, now: float) -> int:
+        while self._log and self._log[0][0] <= now - self.window_seconds:
+            self._log.popleft()
+        return sum(weight for _, weight in self._log)
+
+    def acquire(self, weight: int):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._used(now) + weight <= self.limit or not self._log:
+                    self._log.append((now, weight))
+                    self.used_weight += weight
+                    return
+                wait = self._log[0][0] + self.window_seconds - now
+            time.sleep(max(wait, 0.01))
+
+    def sync(self, server_used_weight: int):
+        """Accounts for weight the exchange reports beyond what this process has logged (X-MBX-USED-WEIGHT-1M)."""
+        with self._lock:
+            now = time.monotonic()
+            missing = server_used_weight - self._used(now)
+            if missing > 0:
+                self._log.append((now, missing))
+
+class KlineDownloader:
+    """
+    Downloads historical klines into a CandleStore. Ranges are paged by startTime, (symbol, interval)
+    pairs are fetched concurrently under a shared request-weight budget, and each pair resumes
+    after its last stored candle. Gaps inside the stored range are detected and refilled.
+    """
+    def __init__(self, store: Optional[CandleStore] = None, base_url: str = BINANCE_API_URL, max_workers: int = 4,
+                 weight_limit: int = 1200, timeout: float = 10.0, max_retries: int = 3):
+        self.store = store or CandleStore()
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.budget = WeightBudget(weight_limit)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests_made = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        # requests.Session is not thread-safe; each download thread keeps its own keep-alive session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def fetch_klines(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None, limit: int = KLINES_LIMIT) -> list:
+        params = {'symbol': symbol.upper(), 'interval': interval, 'startTime': start_ms, 'limit': limit}
+        if end_ms is not None:
+            params['endTime'] = end_ms
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire(KLINES_REQUEST_WEIGHT)
+            with self._lock:
+                self.requests_made += 1
+            try:
+                response = self._session().get(self.base_url + KLINES_PATH, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Kline request for {symbol} {interval} failed ({e}); retrying.")
+                time.sleep(2 ** attempt)
+                continue
+            used_weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+            if used_weight is not None:
+                self.budget.sync(int(used_weight))
+            if response.status_code in (418, 429) or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                wait = float(response.headers.get('Retry-After', 2 ** attempt))
+                logging.warning(f"Kline request for {symbol} {interval} got HTTP {response.status_code}; waiting {wait:.0f}s.")
+                time.sleep(wait)
+                continue
+            response.raise_for_status()
+            return response.json()
+        return []
+
+    def iter_pages(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None):
+        """Yields closed candles in [start_ms, end_ms] as DataFrames, one per request."""
+        step = INTERVAL_MS[interval]
+        while end_ms is None or start_ms <= end_ms:
+            klines = self.fetch_klines(symbol, interval, start_ms, end_ms)
+            if not klines:
+                return
+            page = klines_to_frame(klines)
+            last_open = int(klines[-1][0])
+            if len(page):
+                yield page
+            if len(klines) < KLINES_LIMIT or len(page) < len(klines):
+                return # Reached the newest (or a still-open) candle
+            start_ms = last_open + step
+
+    def sync(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None, fill_gaps: bool = True) -> int:
+        """
+        Brings the stored candles up to date: fetches only past the last stored candle (or from start
+        for a new dataset), appending page by page so an interrupted download resumes where it stopped.
+        Returns the number of candles added.
+        """
+        step = INTERVAL_MS[interval]
+        end_ms = to_epoch_ms(end)
+        last = self.store.last_timestamp(symbol, interval)
+        if last is None:
+            if start is None:
+                raise ValueError(f"No stored {symbol} {interval} candles; a start time is needed for the first download.")
+            start_ms = to_epoch_ms(start)
+        else:
+            start_ms = last + step
+        added = 0
+        first = self.store.meta(symbol, interval)['first'] if last is not None else None
+        pages, empty = [], []
+        if first is not None and start is not None and to_epoch_ms(start) < first:
+            # Extend the history backwards before the first stored candle; merged together with the gap fills below.
+            # Open times before the listing come back empty once and are skipped from then on.
+            backfill_start = first - (first - to_epoch_ms(start)) // step * step
+            for range_start, range_end in subtract_ranges([(backfill_start, first - step)], self.store.empty_ranges(symbol, interval), step):
+                range_pages, range_empty = self.fetch_range(symbol, interval, range_start, range_end)
+                pages.extend(range_pages)
+                empty.extend(range_empty)
+        for page in self.iter_pages(symbol, interval, start_ms, end_ms):
+            added += self.store.append(symbol, interval, page)
+        if fill_gaps and self.store.exists(symbol, interval):
+            gap_pages, gap_empty = self.gap_pages(symbol, interval)
+            pages.extend(gap_pages)
+            empty.extend(gap_empty)
+        if pages:
+            filled = self.store.merge(symbol, interval, pd.concat(pages, ignore_index=True))
+            logging.info(f"{symbol} {interval}: filled {filled} missing candles.")
+            added += filled
+        if empty:
+            # Only recorded once the fills around them are stored
+            self.store.add_empty_ranges(symbol, interval, empty)
+        logging.info(f"{symbol} {interval}: {added} new candles.")
+        return added
+
+    def find_gaps(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """
+        (first missing, last missing) open times of every hole in the stored series, leaving out
+        the ranges already confirmed empty on the exchange (see CandleStore.empty_ranges).
+        """
+        step = INTERVAL_MS[interval]
+        timestamps = self.store.load(symbol, interval, columns=[])['timestamp']
+        epoch_ms = timestamps.dt.tz_localize(None).to_numpy(dtype='datetime64[ms]').view(np.int64)
+        holes = np.flatnonzero(np.diff(epoch_ms) > step)
+        gaps = [(int(epoch_ms[i]) + step, int(epoch_ms[i + 1]) - step) for i in holes]
+        return subtract_ranges(gaps, self.store.empty_ranges(symbol, interval), step)
+
+    def gap_pages(self, symbol: str, interval: str) -> Tuple[List[pd.DataFrame], List[Tuple[int, int]]]:
+        """
+        Downloads the candles of every gap. Returns the pages and the parts of the gaps the exchange
+        has no candles for (exchange downtime), which are not worth asking for again.
+        """
+        pages, empty = [], []
+        for gap_start, gap_end in self.find_gaps(symbol, interval):
+            gap_pages, gap_empty = self.fetch_range(symbol, interval, gap_start, gap_end)
+            pages.extend(gap_pages)
+            empty.extend(gap_empty)
+        return pages, empty
+
+    def fetch_range(self, symbol: str, interval: str, first: int, last: int) -> Tuple[List[pd.DataFrame], List[Tuple[int, int]]]:
+        """Pages of the candles opening in [first, last], and the (first, last) ranges inside it that have none."""
+        step = INTERVAL_MS[interval]
+        pages = list(self.iter_pages(symbol, interval, first, last))
+        fetched = np.concatenate([page['timestamp'].to_numpy(dtype=np.int64) for page in pages]) if pages else np.empty(0, dtype=np.int64)
+        bounds = np.r_[first - step, np.sort(fetched), last + step]
+        holes = np.flatnonzero(np.diff(bounds) > step)
+        empty = [(int(bounds[i]) + step, int(bounds[i + 1]) - step) for i in holes]
+        if empty:
+            logging.debug(f"{symbol} {interval}: no candles available in {len(empty)} ranges; marking them empty.")
+        return pages, empty
+
+    def fill_gaps(self, symbol: str, interval: str) -> int:
+        """Downloads every gap and stores the candles found with a single merge."""
+        pages, empty = self.gap_pages(symbol, interval)
+        filled = self.store.merge(symbol, interval, pd.concat(pages, ignore_index=True)) if pages else 0
+        if empty:
+            self.store.add_empty_ranges(symbol, interval, empty)
+        if filled:
+            logging.info(f"{symbol} {interval}: filled {filled} missing candles.")
+        return filled
+
+    def sync_many(self, symbols: Iterable[str], intervals: Iterable[str], start: TimeLike = None,
+                  end: TimeLike = None) -> Dict[Tuple[str, str], int]:
+        """Syncs every (symbol, interval) pair concurrently; returns candles added per pair."""
+        pairs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {pair: executor.submit(self.sync, pair[0], pair[1], start, end) for pair in pairs}
+        results = {}
+        for pair, future in futures.items():
+            try:
+                results[pair] = future.result()
+            except Exception as e:
+                logging.error(f"Downloading {pair[0]} {pair[1]} klines failed: {e}")
+                results[pair] = 0
+        return results
+
+def subtract_ranges(ranges: List[Tuple[int, int]], removed: List[Tuple[int, int]], step: int) -> List[Tuple[int, int]]:
+    """The parts of the inclusive (first, last) ranges not covered by any removed range, on a grid of step."""
+    remaining = []
+    for first, last in ranges:
+        for removed_first, removed_last in sorted(removed):
+            if removed_last < first or removed_first > last:
+                continue
+            if removed_first > first:
+                remaining.append((first, removed_first - step))
+            first = removed_last + step
+            if first > last:
+                break
+        if first <= last:
+            remaining.append((first, last))
+    return remaining
+
+def klines_to_frame(klines: list, now_ms: Optional[int] = None) -> pd.DataFrame:
+    """Raw /api/v3/klines rows to a candle frame, dropping the still-open candle (close time in the future)."""
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    closed = [k for k in klines if int(k[6]) < now_ms]
+    return pd.DataFrame({
+        'timestamp': np.array([int(k[0]) for k in closed], dtype=np.int64),
+        'open': np.array([k[1] for k in closed], dtype=float),
+        'high': np.array([k[2] for k in closed], dtype=float),
+        'low': np.array([k[3] for k in closed], dtype=float),
+        'close': np.array([k[4] for k in closed], dtype=float),
+        'volume': np.array([k[5] for k in closed], dtype=float)
+    })
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Download historical klines into the candle store.")
+    parser.add_argument('--symbols', nargs='+', default=[os.getenv("TRADE_SYMBOL", "BTCUSDT")])
+    parser.add_argument('--intervals', nargs='+', default=['1m', '1h'])
+    parser.add_argument('--start', default='2021-01-01', help="First candle for symbols not stored yet (UTC).")
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    downloader = KlineDownloader(max_workers=args.workers)
+    start_time = time.perf_counter()
+    results = downloader.sync_many(args.symbols, args.intervals, args.start, args.end)
+    for (symbol, interval), added in results.items():
+        logging.info(f"{symbol} {interval}: +{added} candles ({downloader.store.rows(symbol, interval)} stored)")
+    logging.info(f"{downloader.requests_made} requests ({downloader.budget.used_weight} weight) in {time.perf_counter() - start_time:.1f}s")
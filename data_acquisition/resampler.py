@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_acquisition.candle_store import CandleStore, INTERVAL_MS, TimeLike, to_epoch_ms
+
+BASE_INTERVAL = '1m'
+# Binance weekly candles open on Monday 00:00 UTC; the epoch fell on a Thursday
+WEEK_OFFSET_MS = 4 * INTERVAL_MS['1d']
+
+def bucket_starts(epoch_ms: np.ndarray, interval: str) -> np.ndarray:
+    """Open time of the interval bucket each timestamp falls in, aligned like Binance klines."""
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == '1w' else 0
+    return (epoch_ms - offset) // step * step + offset
+
+def align_up(epoch_ms: int, interval: str) -> int:
+    """First bucket open time at or after epoch_ms."""
+    start = int(bucket_starts(np.array([epoch_ms], dtype=np.int64), interval)[0])
+    return start if start == epoch_ms else start + INTERVAL_MS[interval]
+
+def resample_ohlcv(epoch_ms: np.ndarray, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                   close: np.ndarray, volume: np.ndarray, interval: str, complete_before: Optional[int] = None) -> dict:
+    """
+    Aggregates sorted base candles into interval candles with np.*.reduceat over bucket boundaries.
+    Buckets closing after complete_before (epoch ms) are still forming and are dropped.
+    Returns a dict of column arrays.
+    """
+    buckets = bucket_starts(epoch_ms, interval)
+    if complete_before is not None:
+        keep = buckets + INTERVAL_MS[interval] <= complete_before
+        epoch_ms, open_, high, low, close, volume, buckets = (
+            values[keep] for values in (epoch_ms, open_, high, low, close, volume, buckets))
+    if len(buckets) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {'timestamp': np.empty(0, dtype=np.int64), 'open': empty, 'high': empty, 'low': empty,
+                'close': empty, 'volume': empty}
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {
+        'timestamp': buckets[starts],
+        'open': open_[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': close[ends],
+        'volume': np.add.reduceat(volume, starts)
+    }
+
+def _to_frame(columns: dict) -> pd.DataFrame:
+    frame = pd.DataFrame(columns)
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='ms', utc=True)
+    return frame
+
+class CandleResampler:
+    """
+    Builds higher-timeframe candles from the stored 1m candles, so one download serves every interval.
+    Results are cached in memory per (symbol, interval, start, end). When new 1m candles are appended,
+    a cached entry is extended by resampling only from its first incomplete bucket onwards; a rewrite
+    of the base data (gap fill or merge, which bumps the store revision) recomputes the entry.
+    """
+    def __init__(self, store: Optional[CandleStore] = None, base_interval: str = BASE_INTERVAL, max_entries: int = 32):
+        self.store = store or CandleStore()
+        self.base_interval = base_interval
+        self.max_entries = max_entries
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def can_resample(self, symbol: str, interval: str) -> bool:
+        return (interval in INTERVAL_MS and INTERVAL_MS[interval] > INTERVAL_MS[self.base_interval]
+                and INTERVAL_MS[interval] % INTERVAL_MS[self.base_interval] == 0
+                and self.store.exists(symbol, self.base_interval))
+
+    def _resample(self, symbol: str, interval: str, start_ms: Optional[int], end_ms: Optional[int], meta: dict) -> dict:
+        # Only buckets that open inside the range are built, and only once the base data covers their close
+        lo = align_up(start_ms, interval) if start_ms is not None else None
+        base = self.store.load(symbol, self.base_interval, start=lo, end=end_ms)
+        covered = meta['last'] + INTERVAL_MS[self.base_interval] if meta['last'] is not None else 0
+        complete_before = min(end_ms, covered) if end_ms is not None else covered
+        epoch_ms = base['timestamp'].dt.tz_localize(None).to_numpy(dtype='datetime64[ms]').view(np.int64)
+        return resample_ohlcv(epoch_ms, *(base[col].to_numpy() for col in ('open', 'high', 'low', 'close', 'volume')),
+                              interval, complete_before)
+
+    def load(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None,
+             columns: Optional[Iterable[str]] = None, dtype=None) -> pd.DataFrame:
+        """Candles of interval with open time in [start, end), aggregated from the base interval."""
+        if not self.can_resample(symbol, interval):
+            raise ValueError(f"Cannot build {symbol} {interval} candles from stored {self.base_interval} data.")
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        key = (symbol.upper(), interval, start_ms, end_ms)
+        meta = self.store.meta(symbol, self.base_interval)
+        state = (meta.get('revision', 0), meta['last'])
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is not None and entry['state'] == state:
+            result = entry['columns']
+            self.hits += 1
+        elif entry is not None and entry['state'][0] == state[0]:
+            # Only appends since the entry was built: resample from the first bucket it is missing
+            cached = entry['columns']
+            resume = int(cached['timestamp'][-1]) + INTERVAL_MS[interval] if len(cached['timestamp']) else start_ms
+            tail = self._resample(symbol, interval, resume, end_ms, meta)
+            result = {col: np.concatenate([cached[col], tail[col]]) for col in cached}
+            self.extensions += 1
+        else:
+            result = self._resample(symbol, interval, start_ms, end_ms, meta)
+            self.misses += 1
+        with self._lock:
+            self._cache[key] = {'state': state, 'columns': result}
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        frame = _to_frame(result)
+        if columns is not None:
+            frame = frame[['timestamp'] + [col for col in columns if col != 'timestamp']]
+        if dtype is not None:
+            frame = frame.astype({col: dtype for col in frame.columns if col != 'timestamp'})
+        logging.debug(f"Resampled {len(frame)} {symbol} {interval} candles from {self.base_interval} data.")
+        return frame
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            for key in [key for key in self._cache if symbol is None or key[0] == symbol.upper()]:
+                del self._cache[key]
+
+    def get_stats(self) -> dict:
+        return {'hits': self.hits, 'extensions': self.extensions, 'misses': self.misses, 'entries': len(self._cache)}
@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..')) # Add project root to path
+from bot.headline_cache import HEADLINE_CACHE_PATH, HeadlineScoreCache, normalize_headline
+from bot.sentiment_engines import SENTIMENT_ENGINE, get_engine
+
+HISTORICAL_SENTIMENT_CSV = "data_acquisition/historical_sentiment.csv"
+ARTICLE_CHUNK_SIZE = 20000
+# Field names the supported sources use for the headline and the publication time, in order of preference
+TITLE_FIELDS = ('title', 'headline')
+TIMESTAMP_FIELDS = ('published_at', 'publishedAt', 'published', 'timestamp', 'date')
+URL_FIELDS = ('url', 'link')
+SQLITE_MAX_VARIABLES = 900
+
+def _open_text(path: str):
+    return gzip.open(path, 'rt') if path.endswith('.gz') else open(path)
+
+def _first_field(frame: pd.DataFrame, fields) -> pd.Series:
+    present = [field for field in fields if field in frame.columns]
+    if not present:
+        return pd.Series([None] * len(frame), index=frame.index, dtype=object)
+    values = frame[present[0]]
+    for field in present[1:]:
+        values = values.fillna(frame[field])
+    return values
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """ISO 8601, RFC 822 (RSS) or epoch seconds/milliseconds to UTC; unparseable values become NaT."""
+    numeric = pd.to_numeric(values, errors='coerce')
+    if len(values) and numeric.notna().all():
+        values = numeric
+        unit = 'ms' if values.abs().median() > 1e11 else 's'
+        return pd.to_datetime(values, unit=unit, utc=True, errors='coerce')
+    return pd.to_datetime(values, utc=True, errors='coerce', format='mixed')
+
+def normalize_articles(frame: pd.DataFrame) -> pd.DataFrame:
+    """A raw article chunk reduced to non-empty titles with valid publication times (and URLs where given)."""
+    titles = _first_field(frame, TITLE_FIELDS)
+    urls = _first_field(frame, URL_FIELDS)
+    articles = pd.DataFrame({'title': titles.where(titles.notna(), '').astype(str).str.strip(),
+                             'timestamp': parse_timestamps(_first_field(frame, TIMESTAMP_FIELDS)),
+                             'url': urls.where(urls.notna(), '').astype(str).str.strip()})
+    return articles[(articles['title'] != '') & articles['timestamp'].notna()].reset_index(drop=True)
+
+def article_key(title: str, timestamp: pd.Timestamp, url: str = '') -> str:
+    """
+    Identity of an article for deduplication: its URL when known, otherwise the normalized,
+    case-folded title at its publication time, so a headline that recurs (daily recaps) still counts each time.
+    """
+    identity = f"url:{url}" if url else f"{normalize_headline(title).casefold()}|{timestamp.isoformat()}"
+    return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+def iter_article_chunks(path: str, chunk_size: int = ARTICLE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Reads a JSONL or CSV article dump (optionally gzipped) chunk_size articles at a time."""
+    if '.csv' in os.path.basename(path):
+        for frame in pd.read_csv(path, chunksize=chunk_size, dtype=str):
+            yield frame
+        return
+    with _open_text(path) as f:
+        records = []
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping malformed line in {path}.")
+                continue
+            if len(records) == chunk_size:
+                yield pd.DataFrame.from_records(records)
+                records = []
+        if records:
+            yield pd.DataFrame.from_records(records)
+
+class SeenArticles:
+    """
+    Keys (article_key) of the articles already aggregated into an output file, kept in SQLite so deduplication
+    needs no memory proportional to the archive and reruns over the same dumps add nothing.
+    New keys are only committed together with the output they were counted in.
+    """
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen_articles (key TEXT PRIMARY KEY)")
+        self._db.commit()
+
+    def add_new(self, keys: List[str]) -> np.ndarray:
+        """Marks keys seen and returns a mask of those that were not seen before (first occurrence only)."""
+        unique = list(dict.fromkeys(keys))
+        known = set()
+        for lo in range(0, len(unique), SQLITE_MAX_VARIABLES):
+            chunk = unique[lo:lo + SQLITE_MAX_VARIABLES]
+            known.update(row[0] for row in self._db.execute(
+                f"SELECT key FROM seen_articles WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        new = [key for key in unique if key not in known]
+        self._db.executemany("INSERT INTO seen_articles VALUES (?)", [(key,) for key in new])
+        first = pd.Series(keys).duplicated(keep='first').to_numpy()
+        return ~first & np.fromiter((key not in known for key in keys), dtype=bool, count=len(keys))
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+def _score_titles(engine: str, titles: List[str]) -> List[float]:
+    return get_engine(engine).score_batch(titles)
+
+class ParallelScorer:
+    """Batch scorer that splits a batch across a process pool, one engine instance per worker."""
+    def __init__(self, engine: str, workers: int):
+        self.engine = engine
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def __call__(self, titles: List[str]) -> List[float]:
+        if self._executor is None:
+            return _score_titles(self.engine, titles)
+        size = max(1, -(-len(titles) // (self.workers * 4)))
+        batches = [titles[lo:lo + size] for lo in range(0, len(titles), size)]
+        scores = []
+        for batch_scores in self._executor.map(_score_titles, [self.engine] * len(batches), batches):
+            scores.extend(batch_scores)
+        return scores
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+def hourly_totals(timestamps: pd.Series, scores) -> pd.DataFrame:
+    """Sum and count of scores per UTC hour."""
+    frame = pd.DataFrame({'timestamp': timestamps.dt.floor('1h'), 'score_sum': np.asarray(scores, dtype=float), 'article_count': 1})
+    return frame.groupby('timestamp')[['score_sum', 'article_count']].sum()
+
+def load_hourly_totals(csv_file: str) -> pd.DataFrame:
+    """
+    Hourly sums and counts of an existing sentiment CSV. Files written before article_count existed
+    count each hour as one article; hours without a score are dropped.
+    """
+    empty = pd.DataFrame({'score_sum': pd.Series(dtype=float), 'article_count': pd.Series(dtype=np.int64)},
+                         index=pd.DatetimeIndex([], tz='UTC', name='timestamp'))
+    if not os.path.exists(csv_file):
+        return empty
+    df = pd.read_csv(csv_file)
+    df = df[df['sentiment_score'].notna()]
+    if df.empty:
+        return empty
+    counts = df['article_count'].fillna(1).astype(np.int64) if 'article_count' in df.columns else pd.Series(1, index=df.index)
+    return pd.DataFrame({'score_sum': df['sentiment_score'].to_numpy() * counts.to_numpy(), 'article_count': counts.to_numpy()},
+                        index=pd.DatetimeIndex(pd.to_datetime(df['timestamp'], utc=True), name='timestamp'))
+
+def merge_hourly_totals(totals: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+    if totals.empty:
+        return other
+    return pd.concat([totals, other]).groupby(level=0).sum()
+
+def write_hourly_sentiment(totals: pd.DataFrame, csv_file: str):
+    """Writes timestamp, mean sentiment_score and article_count per hour, replacing csv_file atomically."""
+    totals = totals.sort_index()
+    out = pd.DataFrame({'timestamp': totals.index, 'sentiment_score': totals['score_sum'] / totals['article_count'],
+                        'article_count': totals['article_count'].astype(np.int64)})
+    if os.path.dirname(csv_file):
+        os.makedirs(os.path.dirname(csv_file), exist_ok=True)
+    tmp_path = f"{csv_file}.tmp"
+    out.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, csv_file)
+
+def rebuild_sentiment(paths: List[str], output_csv: str = HISTORICAL_SENTIMENT_CSV, engine: str = SENTIMENT_ENGINE,
+                      workers: Optional[int] = None, chunk_size: int = ARTICLE_CHUNK_SIZE, seen_path: Optional[str] = None,
+                      score_cache_path: Optional[str] = HEADLINE_CACHE_PATH) -> Dict[str, float]:
+    """
+    Streams article dumps chunk by chunk: drops invalid and already-seen articles, scores the new
+    titles across a process pool (through the headline score cache, so titles scored before are
+    reused) and adds the hourly score sums and counts to those already in output_csv. Memory holds
+    one chunk plus one row per hour, whatever the archive size. The output and the seen-article
+    keys (seen_path, default next to the output) are committed together at the end.
+    """
+    engine = get_engine(engine).name
+    workers = workers or os.cpu_count() or 1
+    seen = SeenArticles(seen_path or f"{output_csv}.seen.sqlite")
+    scorer = ParallelScorer(engine, workers)
+    cache = HeadlineScoreCache(score_cache_path, scorer=scorer, engine=engine)
+    stats = {'articles': 0, 'invalid': 0, 'duplicates': 0, 'scored': 0, 'hours': 0}
+    started = time.perf_counter()
+    try:
+        totals = load_hourly_totals(output_csv)
+        for path in paths:
+            for chunk in iter_article_chunks(path, chunk_size):
+                articles = normalize_articles(chunk)
+                stats['articles'] += len(chunk)
+                stats['invalid'] += len(chunk) - len(articles)
+                new = seen.add_new([article_key(title, timestamp, url) for title, timestamp, url
+                                    in zip(articles['title'], articles['timestamp'], articles['url'])])
+                articles = articles[new]
+                stats['duplicates'] += int((~new).sum())
+                if articles.empty:
+                    continue
+                scores = cache.score_batch(articles['title'].tolist())
+                totals = merge_hourly_totals(totals, hourly_totals(articles['timestamp'], scores))
+                stats['scored'] += len(articles)
+                logging.info(f"{path}: {stats['articles']} articles read, {stats['scored']} new scored so far.")
+        if stats['scored']:
+            write_hourly_sentiment(totals, output_csv)
+        seen.commit()
+    except BaseException:
+        seen.rollback()
+        raise
+    finally:
+        seen.close()
+        cache.close()
+        scorer.close()
+    stats['hours'] = len(totals)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Merge article dumps into the hourly historical sentiment CSV.")
+    parser.add_argument('paths', nargs='+', help="JSONL or CSV article dumps (optionally .gz).")
+    parser.add_argument('--output', default=HISTORICAL_SENTIMENT_CSV)
+    parser.add_argument('--engine', default=SENTIMENT_ENGINE)
+    parser.add_argument('--workers', type=int, default=None, help="Scoring processes (default: one per CPU).")
+    parser.add_argument('--chunk-size', type=int, default=ARTICLE_CHUNK_SIZE)
+    parser.add_argument('--no-score-cache', action='store_true', help="Score every new title instead of reusing cached scores.")
+    args = parser.parse_args()
+
+    stats = rebuild_sentiment(args.paths, args.output, args.engine, args.workers, args.chunk_size,
+                              score_cache_path=None if args.no_score_cache else HEADLINE_CACHE_PATH)
+    logging.info(f"📊 {stats['articles']} articles: {stats['scored']} scored, {stats['duplicates']} duplicates, "
+                 f"{stats['invalid']} invalid; {stats['hours']} hours in {args.output} ({stats['seconds']:.1f}s)")
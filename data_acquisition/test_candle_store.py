@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_acquisition.candle_store import CandleStore
+
+def make_klines(start: str = '2024-01-01', periods: int = 500, freq: str = '1min') -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 40000 + np.cumsum(rng.normal(0, 10, periods))
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=periods, freq=freq, tz='UTC'),
+        'open': close + 1, 'high': close + 5, 'low': close - 5, 'close': close,
+        'volume': rng.uniform(1, 10, periods)
+    })
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp.name)
+        self.df = make_klines()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_candles_equal(self, loaded, expected):
+        self.assertEqual(list(loaded['timestamp']), list(expected['timestamp']))
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            np.testing.assert_array_equal(loaded[col].to_numpy(), expected[col].to_numpy())
+
+    def test_round_trip_slicing_and_pruning(self):
+        self.store.write('btcusdt', '1m', self.df.sample(frac=1, random_state=1)) # Rows are sorted on write
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), self.df)
+
+        window = self.store.load('BTCUSDT', '1m', columns=['close'], start='2024-01-01 01:00', end='2024-01-01 02:00')
+        self.assertEqual(list(window.columns), ['timestamp', 'close'])
+        self.assertEqual(len(window), 60)
+        self.assertEqual(window['timestamp'].iloc[0], pd.Timestamp('2024-01-01 01:00', tz='UTC'))
+
+        downcast = self.store.load('BTCUSDT', '1m', columns=['close'], dtype=np.float32)
+        self.assertEqual(downcast['close'].dtype, np.float32)
+
+    def test_append_only_adds_newer_candles(self):
+        self.store.write('BTCUSDT', '1m', self.df.iloc[:300])
+        self.assertEqual(self.store.append('BTCUSDT', '1m', self.df.iloc[250:]), 200)
+        self.assertEqual(self.store.append('BTCUSDT', '1m', self.df.iloc[400:]), 0)
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), self.df)
+        self.assertEqual(self.store.last_timestamp('BTCUSDT', '1m'), self.df['timestamp'].iloc[-1].value // 1_000_000)
+
+    def test_interrupted_append_is_ignored(self):
+        self.store.write('BTCUSDT', '1m', self.df.iloc[:300])
+        # Simulate a crash after some column bytes were written but before meta.json was updated
+        with open(os.path.join(self.store.path('BTCUSDT', '1m'), 'close.bin'), 'ab') as f:
+            f.write(b'\x00' * 24)
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), self.df.iloc[:300])
+        self.store.append('BTCUSDT', '1m', self.df.iloc[300:])
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), self.df)
+
+    def test_merge_fills_gaps(self):
+        self.store.write('BTCUSDT', '1m', pd.concat([self.df.iloc[:100], self.df.iloc[200:]]))
+        self.assertEqual(self.store.merge('BTCUSDT', '1m', self.df.iloc[90:210]), 100)
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), self.df)
+
+    def test_rewrite_leaves_loaded_frames_intact(self):
+        self.store.write('BTCUSDT', '1m', self.df)
+        loaded = self.store.load('BTCUSDT', '1m') # Memory-mapped; truncating the files under it would SIGBUS
+        shifted = self.df.iloc[:50].assign(close=self.df['close'].iloc[:50] + 1)
+        self.store.write('BTCUSDT', '1m', shifted)
+        self.assert_candles_equal(loaded, self.df)
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1m'), shifted)
+        self.assertFalse([name for name in os.listdir(self.store.path('BTCUSDT', '1m')) if name.endswith('.tmp')])
+
+    def test_chunks_overlap_without_a_remainder_chunk(self):
+        self.store.write('BTCUSDT', '1m', self.df)
+        for chunk_size, offsets in ((100, [0, 100, 200, 300, 400]), (499, [0]), (500, [0])):
+            chunks = list(self.store.iter_chunks('BTCUSDT', '1m', chunk_size, overlap=1))
+            self.assertEqual([offset for offset, _ in chunks], offsets)
+            self.assertEqual(chunks[-1][0] + len(chunks[-1][1]), len(self.df))
+
+    def test_import_csv(self):
+        csv_file = os.path.join(self.tmp.name, 'BTCUSDT_1h.csv')
+        self.df.to_csv(csv_file, index=False)
+        self.store.import_csv('BTCUSDT', '1h', csv_file)
+        expected = pd.read_csv(csv_file)
+        expected['timestamp'] = pd.to_datetime(expected['timestamp'], utc=True)
+        self.assert_candles_equal(self.store.load('BTCUSDT', '1h'), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_acquisition.fetch_sentiment import load_historical_sentiment, align_sentiment
+
+class TestSentimentAlignment(unittest.TestCase):
+    def setUp(self):
+        self.sentiment_df = pd.DataFrame(
+            {'sentiment_score': [0.5, -0.2, 0.1]},
+            index=pd.to_datetime(['2024-01-01 01:00', '2024-01-01 02:30', '2024-01-01 08:00'], utc=True)
+        )
+        self.candles = pd.date_range('2024-01-01 00:00', periods=10, freq='1h', tz='UTC')
+
+    def test_as_of_join_uses_latest_preceding_score(self):
+        aligned = align_sentiment(self.sentiment_df, self.candles)
+        expected = [0.0, 0.5, 0.5, -0.2, -0.2, -0.2, -0.2, -0.2, 0.1, 0.1]
+        np.testing.assert_array_equal(aligned.to_numpy(), expected)
+
+    def test_stale_scores_are_neutral(self):
+        aligned = align_sentiment(self.sentiment_df, self.candles, max_staleness='2h')
+        expected = [0.0, 0.5, 0.5, -0.2, -0.2, 0.0, 0.0, 0.0, 0.1, 0.1]
+        np.testing.assert_array_equal(aligned.to_numpy(), expected)
+
+    def test_naive_candle_timestamps_are_treated_as_utc(self):
+        aligned = align_sentiment(self.sentiment_df, self.candles.tz_localize(None))
+        self.assertEqual(aligned.iloc[3], -0.2)
+
+    def test_load_returns_aligned_series(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_file = os.path.join(tmp, 'sentiment.csv')
+            self.sentiment_df.rename_axis('timestamp').reset_index().to_csv(csv_file, index=False)
+            aligned = load_historical_sentiment(csv_file, candle_index=self.candles)
+        self.assertEqual(len(aligned), len(self.candles))
+        self.assertEqual(aligned.iloc[8], 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import logging
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from data_acquisition.candle_store import CandleStore
+from data_acquisition.kline_downloader import KlineDownloader, WeightBudget, INTERVAL_MS
+
+HOUR_MS = INTERVAL_MS['1h']
+FIRST_OPEN = 1_704_067_200_000 # 2024-01-01 00:00 UTC
+CANDLES = 2500
+
+def make_kline(symbol: str, open_ms: int) -> list:
+    base = 100.0 + (open_ms - FIRST_OPEN) / HOUR_MS + (1000.0 if symbol == 'ETHUSDT' else 0.0)
+    return [open_ms, str(base), str(base + 2), str(base - 2), str(base + 1), "10.0",
+            open_ms + HOUR_MS - 1, "0", 1, "0", "0", "0"]
+
+class FakeBinanceHandler(BaseHTTPRequestHandler):
+    """Serves /api/v3/klines for CANDLES hourly candles starting at FIRST_OPEN, like Binance pages them."""
+    requests = []
+    downtime = set() # Open times the exchange has no candles for
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        FakeBinanceHandler.requests.append(query)
+        step = HOUR_MS
+        start = max(int(query.get('startTime', FIRST_OPEN)), FIRST_OPEN)
+        start = FIRST_OPEN + -(-(start - FIRST_OPEN) // step) * step # First open time at or after startTime
+        end = min(int(query.get('endTime', 2 ** 62)), FIRST_OPEN + (CANDLES - 1) * step)
+        limit = int(query.get('limit', 500))
+        klines = [make_kline(query['symbol'], open_ms) for open_ms in range(start, end + 1, step) if open_ms not in FakeBinanceHandler.downtime][:limit]
+        body = json.dumps(klines).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-MBX-USED-WEIGHT-1M', str(2 * len(FakeBinanceHandler.requests)))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestKlineDownloader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBinanceHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        FakeBinanceHandler.requests = []
+        FakeBinanceHandler.downtime = set()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp.name)
+        self.downloader = KlineDownloader(self.store, base_url=self.base_url, max_workers=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_full_sync_pages_by_start_time(self):
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h', start=FIRST_OPEN), CANDLES)
+        self.assertEqual(self.downloader.requests_made, 3) # 1000 + 1000 + 500 candles
+        df = self.store.load('BTCUSDT', '1h')
+        self.assertEqual(len(df), CANDLES)
+        self.assertEqual(df['close'].iloc[-1], 100.0 + CANDLES)
+        self.assertEqual(self.downloader.find_gaps('BTCUSDT', '1h'), [])
+
+    def test_incremental_sync_fetches_only_new_candles(self):
+        self.downloader.sync('BTCUSDT', '1h', start=FIRST_OPEN, end=FIRST_OPEN + 1999 * HOUR_MS)
+        self.assertEqual(self.store.rows('BTCUSDT', '1h'), 2000)
+        FakeBinanceHandler.requests = []
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h'), 500)
+        self.assertEqual(len(FakeBinanceHandler.requests), 1)
+        self.assertEqual(int(FakeBinanceHandler.requests[0]['startTime']), FIRST_OPEN + 2000 * HOUR_MS)
+
+    def test_gaps_are_detected_and_refilled(self):
+        self.downloader.sync('BTCUSDT', '1h', start=FIRST_OPEN, fill_gaps=False)
+        full = self.store.load('BTCUSDT', '1h').copy()
+        self.store.write('BTCUSDT', '1h', full.drop(index=range(100, 150)))
+        self.assertEqual(self.downloader.find_gaps('BTCUSDT', '1h'),
+                         [(FIRST_OPEN + 100 * HOUR_MS, FIRST_OPEN + 149 * HOUR_MS)])
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h'), 50)
+        self.assertEqual(self.store.rows('BTCUSDT', '1h'), CANDLES)
+        self.assertEqual(self.downloader.find_gaps('BTCUSDT', '1h'), [])
+
+    def test_downtime_is_recorded_and_gaps_merge_once(self):
+        downtime = [FIRST_OPEN + hour * HOUR_MS for hour in range(300, 310)]
+        FakeBinanceHandler.downtime = set(downtime)
+        self.downloader.sync('BTCUSDT', '1h', start=FIRST_OPEN, fill_gaps=False)
+        full = self.store.load('BTCUSDT', '1h').copy()
+        self.store.write('BTCUSDT', '1h', full.drop(index=list(range(100, 150)) + list(range(295, 300)) + list(range(700, 705))))
+        merges = []
+        original_merge = self.store.merge
+        with mock.patch.object(self.store, 'merge', side_effect=lambda *args: merges.append(len(args[2])) or original_merge(*args)):
+            self.assertEqual(self.downloader.sync('BTCUSDT', '1h'), 60)
+        self.assertEqual(merges, [60]) # Every filled gap in one rewrite
+        self.assertEqual(self.store.empty_ranges('BTCUSDT', '1h'), [(downtime[0], downtime[-1])])
+        self.assertEqual(self.downloader.find_gaps('BTCUSDT', '1h'), [])
+        # The next sync asks for new candles only, not for the downtime again
+        FakeBinanceHandler.requests = []
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h'), 0)
+        self.assertEqual(len(FakeBinanceHandler.requests), 1)
+        self.assertEqual(self.store.rows('BTCUSDT', '1h'), CANDLES - len(downtime))
+
+    def test_history_before_the_listing_is_requested_once(self):
+        self.downloader.sync('BTCUSDT', '1h', start=FIRST_OPEN)
+        before_listing = FIRST_OPEN - 48 * HOUR_MS
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h', start=before_listing + 1), 0) # Unaligned start
+        self.assertEqual(self.store.empty_ranges('BTCUSDT', '1h'), [(before_listing + HOUR_MS, FIRST_OPEN - HOUR_MS)])
+        FakeBinanceHandler.requests = []
+        self.assertEqual(self.downloader.sync('BTCUSDT', '1h', start=before_listing + 1), 0)
+        self.assertEqual(len(FakeBinanceHandler.requests), 1) # Only the request for newer candles
+        self.assertEqual(self.store.rows('BTCUSDT', '1h'), CANDLES)
+
+    def test_sync_many_downloads_symbols_concurrently(self):
+        results = self.downloader.sync_many(['BTCUSDT', 'ETHUSDT'], ['1h'], start=FIRST_OPEN)
+        self.assertEqual(results, {('BTCUSDT', '1h'): CANDLES, ('ETHUSDT', '1h'): CANDLES})
+        self.assertEqual(self.store.load('ETHUSDT', '1h')['open'].iloc[0], 1100.0)
+
+class TestWeightBudget(unittest.TestCase):
+    def test_acquire_blocks_until_window_frees_weight(self):
+        budget = WeightBudget(limit=4, window_seconds=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            budget.acquire(2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(budget.used_weight, 6)
+
+    def test_server_reported_weight_is_counted(self):
+        budget = WeightBudget(limit=10, window_seconds=0.2)
+        budget.sync(10)
+        start = time.monotonic()
+        budget.acquire(2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_acquisition.candle_store import CandleStore
+from data_acquisition.resampler import CandleResampler, bucket_starts
+from data_acquisition.test_candle_store import make_klines
+
+def pandas_resample(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    resampled = df.set_index('timestamp').resample(rule).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return resampled.dropna().reset_index()
+
+class TestCandleResampler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp.name)
+        self.df = make_klines(start='2024-01-01', periods=3000)
+        self.resampler = CandleResampler(self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_frames_close(self, loaded, expected):
+        self.assertEqual(list(loaded['timestamp']), list(expected['timestamp']))
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            np.testing.assert_allclose(loaded[col].to_numpy(), expected[col].to_numpy())
+
+    def test_matches_pandas_and_drops_incomplete_buckets(self):
+        # 3000 minutes = 50 full hours; drop a few minutes so one bucket has a hole in it
+        self.store.write('BTCUSDT', '1m', self.df.drop(index=range(130, 140)).iloc[:-30])
+        expected = pandas_resample(self.df.drop(index=range(130, 140)).iloc[:-30], '1h').iloc[:-1]
+        self.assert_frames_close(self.resampler.load('BTCUSDT', '1h'), expected)
+        self.assert_frames_close(self.resampler.load('BTCUSDT', '15m'), pandas_resample(self.df.drop(index=range(130, 140)).iloc[:-30], '15min'))
+
+        window = self.resampler.load('BTCUSDT', '1h', start='2024-01-01 02:30', end='2024-01-01 10:00', columns=['close'])
+        self.assertEqual(list(window.columns), ['timestamp', 'close'])
+        self.assertEqual(window['timestamp'].iloc[0], pd.Timestamp('2024-01-01 03:00', tz='UTC'))
+        self.assertEqual(len(window), 7)
+
+    def test_appends_extend_cached_entries_incrementally(self):
+        self.store.write('BTCUSDT', '1m', self.df.iloc[:1000])
+        first = self.resampler.load('BTCUSDT', '1h')
+        self.assertEqual(len(first), 16)
+        self.resampler.load('BTCUSDT', '1h')
+        self.assertEqual(self.resampler.get_stats()['hits'], 1)
+
+        self.store.append('BTCUSDT', '1m', self.df.iloc[1000:])
+        extended = self.resampler.load('BTCUSDT', '1h')
+        self.assertEqual(self.resampler.get_stats()['extensions'], 1)
+        self.assert_frames_close(extended, pandas_resample(self.df, '1h'))
+
+        # A rewrite of already-resampled history is recomputed rather than extended
+        changed = self.df.copy()
+        changed.loc[10, 'high'] += 1000
+        self.store.merge('BTCUSDT', '1m', changed.iloc[:20])
+        self.assertEqual(self.resampler.load('BTCUSDT', '1h')['high'].iloc[0], changed['high'].iloc[:60].max())
+        self.assertEqual(self.resampler.get_stats()['misses'], 2)
+
+    def test_weekly_buckets_open_on_monday(self):
+        epoch_ms = pd.to_datetime(['2024-01-03 12:00', '2024-01-08 00:00'], utc=True).as_unit('ms').asi8
+        starts = pd.to_datetime(bucket_starts(epoch_ms, '1w'), unit='ms', utc=True)
+        self.assertEqual(list(starts), [pd.Timestamp('2024-01-01', tz='UTC'), pd.Timestamp('2024-01-08', tz='UTC')])
+
+    def test_stored_intervals_are_not_resampled(self):
+        self.store.write('BTCUSDT', '1m', self.df)
+        self.assertTrue(self.resampler.can_resample('BTCUSDT', '4h'))
+        self.assertFalse(self.resampler.can_resample('ETHUSDT', '4h'))
+        self.assertFalse(self.resampler.can_resample('BTCUSDT', '1m'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+import tempfile
+import unittest
+import pandas as pd
+from bot.sentiment_engines import get_engine
+from data_acquisition.fetch_sentiment import load_historical_sentiment
+from data_acquisition.sentiment_pipeline import iter_article_chunks, rebuild_sentiment
+
+JSONL_ARTICLES = [
+    {'title': 'Bitcoin soars to a great new high', 'published_at': '2024-01-01T10:05:00Z'},
+    {'title': 'Exchange hacked, terrible losses', 'publishedAt': '2024-01-01T10:40:00Z'},
+    {'title': 'BITCOIN soars to a great  new high', 'published_at': '2024-01-01T11:05:00+01:00'}, # Duplicate: same instant
+    {'title': '', 'published_at': '2024-01-01T10:00:00Z'}, # Invalid: no title
+    {'title': 'Miners report a good quarter', 'published_at': 'not a date'}, # Invalid: no time
+    {'title': 'Ether rallies on strong demand', 'published': 'Mon, 01 Jan 2024 11:15:00 GMT'},
+]
+CSV_ARTICLES = pd.DataFrame({
+    'headline': ['Ether rallies on strong demand', 'Bad week for altcoins', 'Happy holders cheer the rally'],
+    'timestamp': ['2024-01-01T11:15:00Z', '2024-01-01T12:10:00Z', '2024-01-01T12:50:00Z'],
+})
+UNIQUE = [('Bitcoin soars to a great new high', '2024-01-01 10:00'), ('Exchange hacked, terrible losses', '2024-01-01 10:00'),
+          ('Ether rallies on strong demand', '2024-01-01 11:00'), ('Bad week for altcoins', '2024-01-01 12:00'),
+          ('Happy holders cheer the rally', '2024-01-01 12:00')]
+
+def expected_hourly(articles) -> pd.DataFrame:
+    scores = get_engine('lexicon').score_batch([title for title, _ in articles])
+    frame = pd.DataFrame({'timestamp': pd.to_datetime([hour for _, hour in articles], utc=True), 'sentiment_score': scores})
+    return frame.groupby('timestamp')['sentiment_score'].agg(['mean', 'count'])
+
+class TestSentimentPipeline(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.jsonl = os.path.join(self.tmp.name, 'articles.jsonl')
+        with open(self.jsonl, 'w') as f:
+            f.write('\n'.join(json.dumps(article) for article in JSONL_ARTICLES) + '\n{broken\n')
+        self.csv = os.path.join(self.tmp.name, 'articles.csv')
+        CSV_ARTICLES.to_csv(self.csv, index=False)
+        self.output = os.path.join(self.tmp.name, 'historical_sentiment.csv')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def rebuild(self, paths, **kwargs):
+        return rebuild_sentiment(paths, self.output, engine='lexicon', chunk_size=2, score_cache_path=None, **kwargs)
+
+    def assert_output(self, articles):
+        df = pd.read_csv(self.output, parse_dates=['timestamp'])
+        expected = expected_hourly(articles)
+        self.assertEqual(list(df['timestamp']), list(expected.index))
+        for got, want in zip(df['sentiment_score'], expected['mean']):
+            self.assertAlmostEqual(got, want)
+        self.assertEqual(list(df['article_count']), list(expected['count']))
+
+    def test_parallel_chunked_rebuild_dedupes_and_aggregates_hourly(self):
+        stats = self.rebuild([self.jsonl, self.csv], workers=2)
+        self.assertEqual((stats['articles'], stats['invalid'], stats['duplicates'], stats['scored']), (9, 2, 2, 5))
+        self.assert_output(UNIQUE)
+        self.assertEqual(load_historical_sentiment(self.output).index.tz, pd.Timestamp('2024-01-01', tz='UTC').tz)
+        self.assertTrue(all(len(chunk) <= 2 for chunk in iter_article_chunks(self.jsonl, 2)))
+
+    def test_incremental_merges_match_a_single_run_and_reruns_add_nothing(self):
+        self.rebuild([self.jsonl], workers=1)
+        self.assert_output(UNIQUE[:3])
+        self.rebuild([self.csv], workers=1)
+        self.assert_output(UNIQUE)
+        stats = self.rebuild([self.jsonl, self.csv], workers=1)
+        self.assertEqual(stats['scored'], 0)
+        self.assert_output(UNIQUE)
+
+    def test_recurring_headlines_count_once_per_publication(self):
+        recaps = os.path.join(self.tmp.name, 'recaps.jsonl')
+        times = ['2024-01-01T08:00:00Z', '2024-01-02T08:00:00Z', '2024-02-15T08:00:00Z']
+        with open(recaps, 'w') as f:
+            for published_at in times + times[:1]: # The last line repeats the first publication
+                f.write(json.dumps({'title': 'Daily recap: a great day for Bitcoin', 'published_at': published_at}) + '\n')
+            # The same URL republished with a new time is one article; another URL with that title is not
+            for url, published_at in (('https://a.example/1', '2024-01-03T08:00:00Z'), ('https://a.example/1', '2024-01-03T08:30:00Z'),
+                                      ('https://a.example/2', '2024-01-03T08:10:00Z')):
+                f.write(json.dumps({'title': 'Good news for Ether', 'published_at': published_at, 'url': url}) + '\n')
+        stats = self.rebuild([recaps], workers=1)
+        self.assertEqual((stats['scored'], stats['duplicates']), (5, 2))
+        self.assertEqual(list(pd.read_csv(self.output)['article_count']), [1, 1, 2, 1])
+
+    def test_legacy_csv_hours_count_as_one_article(self):
+        pd.DataFrame({'timestamp': ['2024-01-01 09:00:00+00:00', '2024-01-01 10:00:00+00:00', '2024-01-01 13:00:00+00:00'],
+                      'sentiment_score': [0.3, 0.9, None]}).to_csv(self.output, index=False)
+        self.rebuild([self.jsonl], workers=1)
+        df = pd.read_csv(self.output).set_index('timestamp')
+        ten = expected_hourly(UNIQUE[:2])['mean'].iloc[0]
+        self.assertEqual(list(df['article_count']), [1, 3, 1])
+        self.assertAlmostEqual(df.loc['2024-01-01 10:00:00+00:00', 'sentiment_score'], (0.9 + 2 * ten) / 3)
+        self.assertAlmostEqual(df.loc['2024-01-01 09:00:00+00:00', 'sentiment_score'], 0.3)
+
+if __name__ == '__main__':
+    unittest.main()
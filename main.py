@@ -11,11 +11,15 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 from bot.grid import place_grid_orders
 from bot.trading_stats import LiveTradingStats # Import LiveTradingStats
-from bot.trading import place_market_order_with_sl_tp, calculate_trade_size
+from bot.trading import place_market_order_with_sl_tp_async, calculate_trade_size
+from bot.async_exchange import AsyncExchange
 from bot.sentiment_engine import is_market_safe
+from bot.sentiment_service import SentimentService
 from bot.strategy_scheduler import StrategyScheduler
 from bot.position_manager import PositionManager
-from bot.strategy import get_data, generate_signal, calculate_atr, calculate_rsi, calculate_macd, calculate_bollinger_bands
+from bot.strategy import generate_signal
+from bot.exchange_info import SymbolInfoCache, get_exchange_filters
+from bot.market_data import KlineCache, KlineStreamService, MarketSnapshot
 import time
 
 load_dotenv()
@@ -46,21 +50,24 @@ USE_BOLLINGER_BANDS = os.getenv("USE_BOLLINGER_BANDS", "False").lower() == "true
 BB_WINDOW = int(os.getenv("BB_WINDOW", "20"))
 BB_WINDOW_DEV = float(os.getenv("BB_WINDOW_DEV", "2.0"))
 FEAR_GREED_THRESHOLD = int(os.getenv("FEAR_GREED_THRESHOLD", "50"))
+SYMBOL_INFO_TTL_SECONDS = float(os.getenv("SYMBOL_INFO_TTL_SECONDS", "3600"))
 
 class BotState:
-    def __init__(self, client):
+    def __init__(self, client, exchange: AsyncExchange | None = None):
         self.last_run_time: datetime | None = None
         self.total_trades = 0
         self.active = True
         self.client = client
+        self.exchange = exchange # Non-blocking adapter the strategies place orders through
+        self.market_data: KlineStreamService | None = None
 
 position_manager = PositionManager()
 scheduler = StrategyScheduler()
 trading_stats = LiveTradingStats() # Get the singleton instance
 
-def get_account_balance(client: Client, quote_asset: str = 'USDT') -> float:
+async def get_account_balance(exchange: AsyncExchange, quote_asset: str = 'USDT') -> float:
     try:
-        balance = client.get_asset_balance(asset=quote_asset)
+        balance = await exchange.get_asset_balance(asset=quote_asset)
         return float(balance['free'])
     except Exception as e:
         logging.error(f"Error getting account balance: {e}")
@@ -68,56 +75,55 @@ def get_account_balance(client: Client, quote_asset: str = 'USDT') -> float:
 
 
 
-def grid_strategy(bot_state):
-    balance = get_account_balance(bot_state.client)
+async def grid_strategy(bot_state, snapshot: MarketSnapshot):
+    balance = await get_account_balance(bot_state.exchange)
     sentiment = trading_stats.get_sentiment() # Retrieve the sentiment that was just updated
     amount_to_risk = calculate_trade_size(balance, TRADE_MODE, RISK_PER_TRADE_PERCENT, sentiment, FIXED_TRADE_AMOUNT_USDT, SENTIMENT_SIZING_MULTIPLIER)
-    return place_grid_orders(
-        bot_state.client,
+    return await place_grid_orders(
+        bot_state.exchange,
         SYMBOL,
         base_qty=amount_to_risk,
         levels=GRID_LEVELS,
         step_pct=GRID_STEP_PERCENT,
         profit_target_pct=GRID_PROFIT_TARGET_PERCENT,
-        invalidation_pct=GRID_INVALIDATION_PERCENT
+        invalidation_pct=GRID_INVALIDATION_PERCENT,
+        exchange_filters=get_exchange_filters(bot_state.client, SYMBOL) # Served from SymbolInfoCache
     )
 
-def breakout_strategy(bot_state):
-    df = get_data(bot_state.client, SYMBOL, INTERVAL)
-    
-    # Calculate indicators
-    df['RSI'] = calculate_rsi(df)
-    df = calculate_macd(df)
-    if USE_BOLLINGER_BANDS:
-        df = calculate_bollinger_bands(df, window=BB_WINDOW, window_dev=BB_WINDOW_DEV)
+async def breakout_strategy(bot_state, snapshot: MarketSnapshot):
+    # Same indicator values the regime check used this cycle
+    latest = snapshot.latest_indicators(SYMBOL, INTERVAL, atr_period=ATR_PERIOD, use_bollinger_bands=USE_BOLLINGER_BANDS,
+                                        bb_window=BB_WINDOW, bb_window_dev=BB_WINDOW_DEV)
 
     # Get live sentiment from sentiment_engine
     sentiment = trading_stats.get_sentiment() # Retrieve the sentiment that was just updated
 
     signal = generate_signal(
-        rsi=df['RSI'].iloc[-1],
-        macd=df['macd'].iloc[-1],
-        macd_signal=df['macd_signal'].iloc[-1],
+        rsi=latest['RSI'],
+        macd=latest['macd'],
+        macd_signal=latest['macd_signal'],
         sentiment=sentiment,
         sentiment_threshold_positive=SENTIMENT_THRESHOLD_POSITIVE,
         sentiment_threshold_negative=SENTIMENT_THRESHOLD_NEGATIVE,
         base_rsi_oversold=BASE_RSI_OVERSOLD,
         base_rsi_overbought=BASE_RSI_OVERBOUGHT,
         use_bollinger_bands=USE_BOLLINGER_BANDS,
-        bb_bbl=df.get('bb_bbl').iloc[-1] if USE_BOLLINGER_BANDS else None,
-        bb_bbh=df.get('bb_bbh').iloc[-1] if USE_BOLLINGER_BANDS else None,
-        current_close=df['close'].iloc[-1]
+        bb_bbl=latest['bb_bbl'] if USE_BOLLINGER_BANDS else None,
+        bb_bbh=latest['bb_bbh'] if USE_BOLLINGER_BANDS else None,
+        current_close=latest['close']
     )
     if signal:
-        balance = get_account_balance(bot_state.client)
+        balance = await get_account_balance(bot_state.exchange)
         amount_to_risk = calculate_trade_size(balance, TRADE_MODE, RISK_PER_TRADE_PERCENT, sentiment, FIXED_TRADE_AMOUNT_USDT, SENTIMENT_SIZING_MULTIPLIER) # Pass current risk and sentiment
-        return place_market_order_with_sl_tp(
-            bot_state.client,
+        return await place_market_order_with_sl_tp_async(
+            bot_state.exchange,
             SYMBOL,
             signal,
             amount_to_risk,
             rr_ratio=BREAKOUT_RR_RATIO,
-            atr_period=ATR_PERIOD
+            atr_period=ATR_PERIOD,
+            exchange_filters=get_exchange_filters(bot_state.client, SYMBOL),
+            snapshot=snapshot
         )
     return None
 
@@ -135,6 +141,7 @@ async def run_bot(bot_state):
 
     logging.info(f"\nRunning bot at {now.strftime('%Y-%m-%d %H:%M:%S')}")
 
+    # Cached readings from SentimentService; no network I/O in the trading loop
     if not is_market_safe(min_sentiment=SENTIMENT_THRESHOLD_POSITIVE, min_fear_greed=FEAR_GREED_THRESHOLD):
         logging.warning("Market conditions not safe. Skipping trade.")
         return
@@ -152,9 +159,12 @@ async def run_bot(bot_state):
         logging.info(f"📈 No recent losses. Increasing RISK_PER_TRADE_PERCENT to {RISK_PER_TRADE_PERCENT:.2f}%")
     # --- End Adaptive Risk Management Logic ---
 
-    df = get_data(bot_state.client, SYMBOL, INTERVAL)
-    atr = calculate_atr(df, period=ATR_PERIOD).iloc[-1]
-    price = df['close'].iloc[-1]
+    snapshot = MarketSnapshot(bot_state.client)
+    # In a worker thread: a REST fallback must not block the event loop
+    latest = await asyncio.to_thread(snapshot.latest_indicators, SYMBOL, INTERVAL, atr_period=ATR_PERIOD, use_bollinger_bands=USE_BOLLINGER_BANDS,
+                                     bb_window=BB_WINDOW, bb_window_dev=BB_WINDOW_DEV)
+    atr = latest['ATR']
+    price = latest['close']
 
     # Check for grid invalidation
     active_position = position_manager.get_position(SYMBOL)
@@ -174,16 +184,28 @@ async def run_bot(bot_state):
 
     selected = scheduler.select_strategy(market_context)
     if selected:
-        await selected(bot_state)
+        await selected(bot_state, snapshot)
 
     bot_state.total_trades += 1
     bot_state.last_run_time = now
     logging.info(f"Total trades executed: {bot_state.total_trades}")
+    logging.info(f"Symbol info cache: {SymbolInfoCache().get_stats()}")
+    logging.info(f"Market snapshot: {snapshot.get_stats()}")
+    logging.info(f"Sentiment service: {SentimentService().get_stats()}")
+    if bot_state.exchange is not None:
+        logging.info(f"Async exchange: {bot_state.exchange.get_stats()}")
+    if bot_state.market_data is not None:
+        bot_state.market_data.save_cache()
+        logging.info(f"Kline stream: {bot_state.market_data.get_stats()}")
 
 async def run_scheduler(bot_state):
-    while True:
-        await run_bot(bot_state)
-        await asyncio.sleep(TRADE_INTERVAL_SECONDS)
+    try:
+        while True:
+            await run_bot(bot_state)
+            await asyncio.sleep(TRADE_INTERVAL_SECONDS)
+    finally:
+        if bot_state.exchange is not None:
+            await bot_state.exchange.close()
 
 if __name__ == "__main__":
     try:
@@ -193,7 +215,19 @@ if __name__ == "__main__":
         client.timestamp_offset = time_offset
         logging.info(f"Time offset with Binance server is {time_offset}ms.")
 
-        bot_state = BotState(client)
+        # Warm the symbol filter cache and keep it fresh in the background
+        get_exchange_filters(client, SYMBOL)
+        SymbolInfoCache().start_refresh(ttl_seconds=SYMBOL_INFO_TTL_SECONDS)
+        # Sentiment sources refresh in the background; the first readings usually arrive before the first cycle
+        SentimentService().start(wait_seconds=15)
+
+        bot_state = BotState(client, AsyncExchange(BINANCE_API_KEY, BINANCE_API_SECRET, timestamp_offset=time_offset))
+        # Stream the candles every cycle reads so the loop does not poll klines over REST
+        # Cached candles and indicator state from the last run mean only the missing candles are fetched
+        bot_state.market_data = KlineStreamService(
+            client, [(SYMBOL, INTERVAL), (SYMBOL, '1m')], cache=KlineCache(),
+            indicator_params=dict(atr_period=ATR_PERIOD, use_bollinger_bands=USE_BOLLINGER_BANDS, bb_window=BB_WINDOW, bb_window_dev=BB_WINDOW_DEV)
+        ).start()
         scheduler.add_strategy('grid', grid_strategy, lambda ctx: ctx.get('market') == 'sideways')
         scheduler.add_strategy('breakout', breakout_strategy, lambda ctx: ctx.get('market') == 'trending')
 